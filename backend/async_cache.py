@@ -0,0 +1,151 @@
+"""
+Bounded LRU/TTL cache with single-flight loading for async lookups.
+
+    cache = AsyncCache("job_configs", max_size=512, ttl=3600, negative_ttl=60)
+    config = await cache.get_or_load(job_id, lambda: load_config(job_id),
+                                     is_negative=lambda c: c is None)
+
+Concurrent misses for the same key share one load. Values the caller marks
+as negative (fallbacks, "not found") are cached for the shorter
+negative_ttl so they are retried soon. Loader exceptions are not cached.
+Every cache registers itself so /metrics can report all of them.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+# name -> AsyncCache, for cache_metrics()
+_caches: dict = {}
+
+
+class AsyncCache:
+    """LRU cache with per-entry expiry and single-flight misses"""
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int = 1024,
+        ttl: float | None = None,
+        negative_ttl: float | None = None,
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl if negative_ttl is not None else ttl
+
+        # key -> (expires_at or None, value, negative)
+        self._entries: OrderedDict = OrderedDict()
+        # key -> task loading it
+        self._in_flight: dict = {}
+
+        self._metrics = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "loads": 0,
+            "load_errors": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        _caches[name] = self
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value, negative = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            self._metrics["expirations"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key, default=None):
+        """Cached value (without loading), or default"""
+        entry = self._lookup(key)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def set(self, key, value, negative: bool = False) -> None:
+        ttl = self.negative_ttl if negative else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        self._entries[key] = (expires_at, value, negative)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._metrics["evictions"] += 1
+
+    def invalidate(self, key) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __contains__(self, key) -> bool:
+        return self._lookup(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_load(
+        self,
+        key,
+        loader: Callable[[], Awaitable[Any]],
+        is_negative: Callable[[Any], bool] | None = None,
+    ):
+        """
+        Return the cached value for key, or run loader() once for all
+        concurrent callers and cache its result.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            self._metrics["negative_hits" if entry[2] else "hits"] += 1
+            return entry[1]
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._metrics["coalesced"] += 1
+        else:
+            self._metrics["misses"] += 1
+            task = asyncio.ensure_future(self._load(key, loader, is_negative))
+            self._in_flight[key] = task
+
+        # A cancelled caller must not cancel the load other callers wait on
+        return await asyncio.shield(task)
+
+    async def _load(self, key, loader, is_negative):
+        try:
+            self._metrics["loads"] += 1
+            value = await loader()
+            self.set(key, value, negative=bool(is_negative and is_negative(value)))
+            return value
+        except Exception:
+            self._metrics["load_errors"] += 1
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    def metrics(self) -> dict:
+        lookups = self._metrics["hits"] + self._metrics["negative_hits"] + self._metrics["misses"] + self._metrics["coalesced"]
+        hits = self._metrics["hits"] + self._metrics["negative_hits"]
+        return {
+            **self._metrics,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "in_flight": len(self._in_flight),
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def cache_metrics() -> dict:
+    """Counters for every AsyncCache, keyed by name (for /metrics)"""
+    return {name: cache.metrics() for name, cache in _caches.items()}
@@ -0,0 +1,55 @@
+"""Shared PostgreSQL connection pool for request-path queries"""
+
+import os
+from psycopg_pool import AsyncConnectionPool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+
+_pool: AsyncConnectionPool | None = None
+
+
+async def open_pool() -> AsyncConnectionPool:
+    """
+    Open the shared pool. Call this once at app startup (from lifespan in main.py).
+    The LangGraph checkpointer keeps its own dedicated connection.
+    """
+    global _pool
+
+    if _pool is not None:
+        return _pool
+
+    connection_string = os.getenv("POSTGRES_CONNECTION_STRING")
+    if not connection_string:
+        raise ValueError("POSTGRES_CONNECTION_STRING not set")
+
+    _pool = AsyncConnectionPool(
+        connection_string,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        kwargs={"autocommit": True},
+        open=False,
+    )
+    await _pool.open()
+    print(f"[DB] Connection pool opened (min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE})")
+    return _pool
+
+
+async def close_pool() -> None:
+    """Close the shared pool on shutdown"""
+    global _pool
+
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+        print("[DB] Connection pool closed")
+
+
+def get_pool() -> AsyncConnectionPool:
+    """Return the shared pool (raises if open_pool() was not called)"""
+    if _pool is None:
+        raise RuntimeError("Database pool not opened - call open_pool() first")
+    return _pool
@@ -0,0 +1,196 @@
+"""
+Two-tier cache for Google geocoding results.
+
+Tier 1 is an in-process AsyncCache (LRU + TTL, single-flight), tier 2 is the
+geocode_cache table shared by every worker and surviving restarts. Only when
+both miss is Google called, and the result is written back to both.
+
+Keys:
+    fwd:<normalized address>     - lowercased, punctuation stripped, whitespace collapsed
+    rev:<grid>:<lat cell>:<lng cell> - GPS point snapped to a GEOCODE_GRID_METERS grid,
+                                   so nearby points from one neighbourhood share an entry
+
+Failed lookups (None) are only cached in memory, for GEOCODE_NEGATIVE_TTL_SECONDS.
+"""
+
+import math
+import os
+import re
+from psycopg.types.json import Jsonb
+from dotenv import load_dotenv
+
+from async_cache import AsyncCache
+from db import get_pool
+
+load_dotenv()
+
+GEOCODE_GRID_METERS = float(os.getenv("GEOCODE_GRID_METERS", "100"))
+GEOCODE_TTL_SECONDS = float(os.getenv("GEOCODE_TTL_SECONDS", str(30 * 24 * 3600)))
+REVERSE_GEOCODE_TTL_SECONDS = float(os.getenv("REVERSE_GEOCODE_TTL_SECONDS", str(30 * 24 * 3600)))
+GEOCODE_NEGATIVE_TTL_SECONDS = float(os.getenv("GEOCODE_NEGATIVE_TTL_SECONDS", "300"))
+GEOCODE_MEMORY_CACHE_SIZE = int(os.getenv("GEOCODE_MEMORY_CACHE_SIZE", "4096"))
+
+METERS_PER_DEGREE_LAT = 111_320.0
+
+_forward = AsyncCache(
+    "geocode",
+    max_size=GEOCODE_MEMORY_CACHE_SIZE,
+    ttl=GEOCODE_TTL_SECONDS,
+    negative_ttl=GEOCODE_NEGATIVE_TTL_SECONDS,
+)
+_reverse = AsyncCache(
+    "reverse_geocode",
+    max_size=GEOCODE_MEMORY_CACHE_SIZE,
+    ttl=REVERSE_GEOCODE_TTL_SECONDS,
+    negative_ttl=GEOCODE_NEGATIVE_TTL_SECONDS,
+)
+
+_metrics = {
+    "db_hits": 0,
+    "db_errors": 0,
+    "google_calls": 0,
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s#-]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+async def setup_geocode_table() -> None:
+    """
+    Create the geocode_cache table if it doesn't exist.
+    Call this once at app startup (from lifespan in main.py).
+    """
+    async with get_pool().connection() as conn:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                cache_key  TEXT        PRIMARY KEY,
+                result     JSONB       NOT NULL,
+                expires_at TIMESTAMPTZ NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """)
+        # Expired rows are ignored on read; prune them at startup
+        await conn.execute("DELETE FROM geocode_cache WHERE expires_at < NOW()")
+    print("[GEOCODE] geocode_cache table ready")
+
+
+def normalize_address(address: str) -> str:
+    """Cache key text for an address: case, punctuation and spacing insensitive"""
+    text = _PUNCTUATION.sub(" ", address.lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def address_key(address: str) -> str:
+    return f"fwd:{normalize_address(address)}"
+
+
+def coordinate_key(lat: float, lng: float, grid_meters: float = None) -> str:
+    """
+    Snap a point to a roughly square grid of grid_meters cells.
+    Longitude cells are widened by 1/cos(latitude) of the cell's row.
+    """
+    grid = grid_meters or GEOCODE_GRID_METERS
+    lat_step = grid / METERS_PER_DEGREE_LAT
+    lat_cell = math.floor(lat / lat_step)
+
+    row_lat = math.radians((lat_cell + 0.5) * lat_step)
+    lng_step = lat_step / max(math.cos(row_lat), 0.01)
+    lng_cell = math.floor(lng / lng_step)
+
+    return f"rev:{grid:g}:{lat_cell}:{lng_cell}"
+
+
+async def _db_get(cache_key: str) -> dict | None:
+    try:
+        async with get_pool().connection() as conn:
+            cur = await conn.execute(
+                "SELECT result FROM geocode_cache WHERE cache_key = %s AND expires_at > NOW()",
+                (cache_key,)
+            )
+            row = await cur.fetchone()
+    except Exception as e:
+        # The cache must never fail a lookup; fall through to Google
+        _metrics["db_errors"] += 1
+        print(f"[GEOCODE] Cache read failed: {e}")
+        return None
+
+    if row is None:
+        return None
+    _metrics["db_hits"] += 1
+    return row[0]
+
+
+async def _db_put(cache_key: str, result: dict, ttl: float) -> None:
+    try:
+        async with get_pool().connection() as conn:
+            await conn.execute("""
+                INSERT INTO geocode_cache (cache_key, result, expires_at)
+                VALUES (%s, %s, NOW() + make_interval(secs => %s))
+                ON CONFLICT (cache_key) DO UPDATE
+                SET result = EXCLUDED.result, expires_at = EXCLUDED.expires_at, created_at = NOW()
+            """, (cache_key, Jsonb(result), ttl))
+    except Exception as e:
+        _metrics["db_errors"] += 1
+        print(f"[GEOCODE] Cache write failed: {e}")
+
+
+async def _load(cache_key: str, fetch, ttl: float) -> dict | None:
+    """Tier 2, then Google; successful Google results are written to tier 2"""
+    result = await _db_get(cache_key)
+    if result is not None:
+        return result
+
+    _metrics["google_calls"] += 1
+    result = await fetch()
+    if result is not None:
+        await _db_put(cache_key, result, ttl)
+    return result
+
+
+async def cached_geocode(address: str, fetch) -> dict | None:
+    """
+    Forward geocode through the cache.
+
+    Args:
+        address: Address as typed / selected
+        fetch: Coroutine function calling Google (used on a full miss)
+    """
+    cache_key = address_key(address)
+    return await _forward.get_or_load(
+        cache_key,
+        lambda: _load(cache_key, fetch, GEOCODE_TTL_SECONDS),
+        is_negative=lambda result: result is None,
+    )
+
+
+async def cached_reverse_geocode(lat: float, lng: float, fetch) -> dict | None:
+    """
+    Reverse geocode through the cache, keyed by the point's grid cell.
+    The first point seen in a cell is the one sent to Google.
+    """
+    cache_key = coordinate_key(lat, lng)
+    return await _reverse.get_or_load(
+        cache_key,
+        lambda: _load(cache_key, fetch, REVERSE_GEOCODE_TTL_SECONDS),
+        is_negative=lambda result: result is None,
+    )
+
+
+def geocode_cache_metrics() -> dict:
+    """Hit ratio across both tiers and Google calls avoided (for /metrics)"""
+    lookups = 0
+    memory_hits = 0
+    for cache in (_forward, _reverse):
+        m = cache.metrics()
+        lookups += m["hits"] + m["negative_hits"] + m["misses"] + m["coalesced"]
+        memory_hits += m["hits"] + m["negative_hits"] + m["coalesced"]
+
+    avoided = lookups - _metrics["google_calls"]
+    return {
+        **_metrics,
+        "lookups": lookups,
+        "memory_hits": memory_hits,
+        "google_calls_avoided": avoided,
+        "hit_ratio": round(avoided / lookups, 3) if lookups else 0.0,
+        "grid_meters": GEOCODE_GRID_METERS,
+    }
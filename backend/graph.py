@@ -4,10 +4,11 @@
 import asyncio
 from datetime import datetime
 import json
-from typing import Literal, List, Dict
+from typing import Any, Literal, List, Dict
 from urllib import response
 from langgraph.graph import StateGraph, END, MessagesState
 from langgraph.types import interrupt
+from langchain_core.runnables import RunnableConfig
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage, AIMessage
 from prompts1 import *
@@ -15,10 +16,15 @@ import os
 from dotenv import load_dotenv
 from langchain.prompts import ChatPromptTemplate
 import time
-from xano import send_applicant_to_xano
+from xano import applicant_report_fields
+from xano_outbox import enqueue_applicant_submission
+from pdf_reports import save_report_fields
 from location_services import verify_location
 import phonenumbers
 from id_verification import create_id_verify_session, save_session_mapping    
+from widget_inputs import format_work_experience
+from transcript_store import full_transcript
+from job_config_registry import get_compiled_config
 
 
 from otp_verification import (
@@ -73,17 +79,18 @@ def validate_phone(phone: str) -> bool:
 
 class ChatbotState(MessagesState):
     """State for the screening chatbot"""
+    # Questions, knockout questions and scoring model live in the compiled
+    # config (job_config_registry); state only references it
+    job_config_id: str = ""
+
     current_question_index: int = 0
-    questions: List[str] = []
     answers: Dict[str, str] = {}
     
     current_knockout_question_index: int = 0
-    knockout_questions: List[str] = []
     knockout_answers: Dict[str, str] = {}
     knockout_passed: bool = False
     current_knockout_failed: bool = False
     
-    scoring_model: Dict[str, Dict] = {}
     scores: Dict[str, float] = {}
     score: float = 0
     total_score: float = 0
@@ -144,7 +151,7 @@ class ChatbotState(MessagesState):
     show_education_ui: bool = False
 
     # Address fields
-    address: Dict[str, str] = {}          # { street, city, state, zip, full }
+    address: Dict[str, Any] = {}          # { street, city, state, zip, full, lat, lng }
     show_address_ui: bool = False
 
     # GPS verification fields
@@ -156,6 +163,9 @@ class ChatbotState(MessagesState):
     gps_distance_miles: float = 0.0
     show_gps_ui: bool = False
 
+    # Cursor into conversation_events (seq of the last message written to the log)
+    transcript_seq: int = 0
+
 
 # ==================== Acknowledgement ====================
 def acknowledge_node(state: ChatbotState) -> ChatbotState:
@@ -287,7 +297,7 @@ def ask_knockout_question_node(state: ChatbotState) -> ChatbotState:
     print("ask_knockout_question_node called")
     
     idx = state["current_knockout_question_index"]
-    knockout_questions = state["knockout_questions"]
+    knockout_questions = get_compiled_config(state["job_config_id"]).knockout_questions
     
     if idx < len(knockout_questions):
         knockout_question = knockout_questions[idx]
@@ -325,8 +335,9 @@ def store_kq_answer_node(state: ChatbotState) -> ChatbotState:
     
     if isinstance(last_message, HumanMessage):
         idx = state["current_knockout_question_index"]
-        if idx < len(state["knockout_questions"]):
-            knockout_question = state["knockout_questions"][idx]
+        knockout_questions = get_compiled_config(state["job_config_id"]).knockout_questions
+        if idx < len(knockout_questions):
+            knockout_question = knockout_questions[idx]
             
             if idx == 1:
                 age = extract_age_from_text(last_message.content)
@@ -360,7 +371,7 @@ def evaluate_single_knockout_node(state: ChatbotState) -> ChatbotState:
     
     print("evaluate_single_knockout_node called")
     
-    knockout_questions = state["knockout_questions"]
+    knockout_questions = get_compiled_config(state["job_config_id"]).knockout_questions
     knockout_answers = state["knockout_answers"]
     current_index = state["current_knockout_question_index"] - 1
     
@@ -461,7 +472,8 @@ def single_knockout_router(state: ChatbotState) -> Literal["ask_knockout_questio
         return "__end__"  # End conversation
     
     # Check if more questions remain
-    if state["current_knockout_question_index"] < len(state["knockout_questions"]):
+    knockout_questions = get_compiled_config(state["job_config_id"]).knockout_questions
+    if state["current_knockout_question_index"] < len(knockout_questions):
         return "ask_knockout_question"  # Ask next question
     
     # All questions passed
@@ -487,20 +499,13 @@ def store_address_node(state: ChatbotState) -> ChatbotState:
 
     print("store_address_node called")
 
-    messages = state["messages"]
-    last_message = messages[-1] if messages else None
+    # Pauses until the socket resumes with a validated AddressInput
+    address_data = interrupt({"widget": "address"})
 
-    if isinstance(last_message, HumanMessage):
-        # Address data arrives as JSON string: '{"street":...,"city":...}'
-        try:
-            import json as _json
-            address_data = _json.loads(last_message.content)
-            state["address"] = address_data
-            print(f"Stored address: {address_data}")
-        except Exception:
-            # Fallback: plain text address
-            state["address"] = {"full": last_message.content}
-            print(f"Stored plain address: {last_message.content}")
+    state["address"] = address_data
+    state["show_address_ui"] = False
+    state["messages"].append(HumanMessage(content=address_data.get("full") or address_data.get("street") or "Address provided"))
+    print(f"Stored address: {address_data}")
 
     return state
 
@@ -518,73 +523,75 @@ def ask_gps_verification_node(state: ChatbotState) -> ChatbotState:
     return state
 
 
-def process_gps_node(state: ChatbotState) -> ChatbotState:
+async def process_gps_node(state: ChatbotState) -> ChatbotState:
     """Receive GPS coordinates and cross-verify against typed address"""
 
     print("process_gps_node called")
 
-    messages = state["messages"]
-    last_message = messages[-1] if messages else None
+    # Pauses until the socket resumes with a validated GpsInput
+    gps_data = interrupt({"widget": "gps"})
 
-    if isinstance(last_message, HumanMessage):
-        try:
-            import json as _json
-            gps_data = _json.loads(last_message.content)
-            
-            lat = gps_data.get("lat")
-            lng = gps_data.get("lng")
-            skipped = gps_data.get("skipped", False)
-
-            # Handle skip case immediately
-            if skipped or lat is None or lng is None:
-                state["gps_verified"] = False
-                state["gps_flagged"] = False
-                state["messages"].append(AIMessage(
-                    content="No problem! We'll proceed with the address you provided."
-                ))
-                return state
+    state["show_gps_ui"] = False
 
-            # convert now
-            lat = float(lat)
-            lng = float(lng)
+    lat = gps_data.get("lat")
+    lng = gps_data.get("lng")
+    skipped = gps_data.get("skipped", False)
 
-            state["gps_lat"] = lat
-            state["gps_lng"] = lng
+    # Handle skip case immediately
+    if skipped or lat is None or lng is None:
+        state["messages"].append(HumanMessage(content="Location sharing skipped"))
+        state["gps_verified"] = False
+        state["gps_flagged"] = False
+        state["messages"].append(AIMessage(
+            content="No problem! We'll proceed with the address you provided."
+        ))
+        return state
 
-            typed_address = state.get("address", {}).get("full", "")
+    state["gps_lat"] = lat
+    state["gps_lng"] = lng
+    state["messages"].append(HumanMessage(content=f"Location shared: {lat:.4f}, {lng:.4f}"))
 
-            if typed_address and lat and lng:
-                result = verify_location(typed_address, lat, lng)
+    try:
+        address = state.get("address", {})
+        typed_address = address.get("full", "")
+
+        if typed_address and lat and lng:
+            # Reuse the place-details coordinates instead of geocoding the address again
+            result = await verify_location(
+                typed_address, lat, lng,
+                typed_lat=address.get("lat"),
+                typed_lng=address.get("lng"),
+            )
 
-                state["gps_verified"] = result["verified"]
-                state["gps_flagged"] = result["flag"]
-                state["gps_flag_reason"] = result.get("flag_reason", "")
-                state["gps_distance_miles"] = result.get("distance_miles", 0.0)
+            state["gps_verified"] = result["verified"]
+            state["gps_flagged"] = result["flag"]
+            state["gps_flag_reason"] = result.get("flag_reason", "")
+            state["gps_distance_miles"] = result.get("distance_miles", 0.0)
 
-                print(f"GPS verification result: {result}")
+            print(f"GPS verification result: {result}")
 
-                if result["flag"]:
-                    # Soft flag - ask clarifying question, don't hard-stop
-                    state["messages"].append(AIMessage(
-                        content=f"Thanks for sharing! We noticed your current location appears to be about {result['distance_miles']:.1f} mile(s) from the address you provided. Can you confirm that {typed_address} is your correct home address?"
-                    ))
-                else:
-                    state["messages"].append(AIMessage(
-                        content="Verified! ✅ You're definitely within range."
-                    ))
+            if result["flag"]:
+                # Soft flag - ask clarifying question, don't hard-stop
+                state["messages"].append(AIMessage(
+                    content=f"Thanks for sharing! We noticed your current location appears to be about {result['distance_miles']:.1f} mile(s) from the address you provided. Can you confirm that {typed_address} is your correct home address?"
+                ))
             else:
-                # No address to compare, just accept GPS
-                state["gps_verified"] = False
                 state["messages"].append(AIMessage(
-                    content="GPS Location received, We'll proceed with this"
+                    content="Verified! ✅ You're definitely within range."
                 ))
-
-        except Exception as e:
-            print(f"GPS processing error: {e}")
-            # GPS failed gracefully - don't block flow
+        else:
+            # No address to compare, just accept GPS
             state["gps_verified"] = False
-            state["gps_flagged"] = False
-            state["gps_flag_reason"] = "GPS data could not be processed"
+            state["messages"].append(AIMessage(
+                content="GPS Location received, We'll proceed with this"
+            ))
+
+    except Exception as e:
+        print(f"GPS processing error: {e}")
+        # GPS failed gracefully - don't block flow
+        state["gps_verified"] = False
+        state["gps_flagged"] = False
+        state["gps_flag_reason"] = "GPS data could not be processed"
 
     return state
 
@@ -671,6 +678,33 @@ def store_work_experience_response_node(state: ChatbotState) -> ChatbotState:
     
     return state
 
+def work_experience_router(state: ChatbotState) -> Literal["store_work_experience", "ask_education"]:
+    """Wait for the work experience widget only when it was shown"""
+
+    print("work_experience_router called")
+
+    if state.get("show_work_experience_ui"):
+        return "store_work_experience"
+    return "ask_education"
+
+
+def store_work_experience_node(state: ChatbotState) -> ChatbotState:
+    """Store work experiences submitted from the widget"""
+
+    print("store_work_experience_node called")
+
+    # Pauses until the socket resumes with a validated WorkExperienceInput
+    work_exp_data = interrupt({"widget": "work_experience"})
+
+    experiences = work_exp_data.get("experiences", [])
+    state["work_experience"] = experiences
+    state["show_work_experience_ui"] = False
+    state["messages"].append(HumanMessage(content=f"Work experience: {format_work_experience(experiences)}"))
+
+    print(f"Stored work experiences: {experiences}")
+
+    return state
+
 # ==================== EDUCATION COLLECTION ====================
 
 def ask_education_node(state: ChatbotState) -> ChatbotState:
@@ -946,7 +980,7 @@ def phone_router(state: ChatbotState) -> Literal["ask_phone", "send_phone_otp"]:
 
 # ==================== EMAIL OTP VERIFICATION NODES ====================
 
-def send_email_otp_node(state: ChatbotState) -> ChatbotState:
+async def send_email_otp_node(state: ChatbotState) -> ChatbotState:
     """Generate and send OTP to email"""
     
     print("send_email_otp_node called")
@@ -964,7 +998,7 @@ def send_email_otp_node(state: ChatbotState) -> ChatbotState:
     brand_name = state.get("brand_name")
     
     # Send email
-    success = send_email_otp(email, otp_code, brand_name, user_name)
+    success = await send_email_otp(email, otp_code, brand_name, user_name)
     # success = True  # For testing
     
     if success:
@@ -1074,7 +1108,7 @@ def email_otp_router(state: ChatbotState) -> Literal["ask_phone", "send_email_ot
 
 # ==================== PHONE OTP VERIFICATION NODES ====================
 
-def send_phone_otp_node(state: ChatbotState) -> ChatbotState:
+async def send_phone_otp_node(state: ChatbotState) -> ChatbotState:
     """Generate and send OTP to phone via SMS"""
     
     print("send_phone_otp_node called")
@@ -1085,7 +1119,7 @@ def send_phone_otp_node(state: ChatbotState) -> ChatbotState:
     # state["phone_otp_code"] = otp_code
 
     # Create Plivo Verify session (Plivo generates + sends OTP internally)
-    session_uuid = create_phone_verify_session(phone)
+    session_uuid = await create_phone_verify_session(phone)
 
     if session_uuid:
         state["phone_verify_session_uuid"] = session_uuid
@@ -1114,7 +1148,7 @@ def ask_phone_otp_node(state: ChatbotState) -> ChatbotState:
     return state
 
 
-def verify_phone_otp_node(state: ChatbotState) -> ChatbotState:
+async def verify_phone_otp_node(state: ChatbotState) -> ChatbotState:
     """Verify the phone OTP code entered by user"""
     
     print("verify_phone_otp_node called")
@@ -1146,7 +1180,7 @@ def verify_phone_otp_node(state: ChatbotState) -> ChatbotState:
             state["messages"].append(AIMessage(content="Please enter a 6-digit code (numbers only)."))
             return state
 
-        is_valid, error = validate_phone_otp(session_uuid, otp_input)
+        is_valid, error = await validate_phone_otp(session_uuid, otp_input)
 
         print(f"Phone OTP verification result: is_valid={is_valid}, error={error}")
 
@@ -1213,7 +1247,7 @@ def phone_otp_router(state: ChatbotState) -> Literal["acknowledgement", "ask_id_
 
 
 # ==================== ID VERIFICATION NODES ====================
-async def ask_id_verification_node(state: ChatbotState) -> ChatbotState:
+async def ask_id_verification_node(state: ChatbotState, config: RunnableConfig) -> ChatbotState:
     """Send ID verification messages and create Simplici session"""
 
     print("ask_id_verification_node called")
@@ -1223,8 +1257,8 @@ async def ask_id_verification_node(state: ChatbotState) -> ChatbotState:
     cleo_session_id = state.get("session_id", "")
 
     # Create session — dev returns fixed link, prod calls Simplici API
-    verify_link, simplici_session_id = create_id_verify_session(
-        cleo_session_id, applicant_name, phone
+    verify_link, simplici_session_id = await create_id_verify_session(
+        cleo_session_id, config["configurable"]["thread_id"], applicant_name, phone
     )
 
     if not verify_link:
@@ -1238,7 +1272,9 @@ async def ask_id_verification_node(state: ChatbotState) -> ChatbotState:
     state["id_verify_link"] = verify_link
     state["id_verify_session_id"] = simplici_session_id
 
-    await save_session_mapping(simplici_session_id, cleo_session_id)
+    # Prod knows Simplici's session id up front; dev learns it from the webhook
+    if simplici_session_id:
+        await save_session_mapping(simplici_session_id, cleo_session_id)
 
     # 3-message "sandwich" approach
     state["messages"].append(AIMessage(
@@ -1261,6 +1297,13 @@ def process_id_result_node(state: ChatbotState) -> ChatbotState:
 
     print("process_id_result_node called")
 
+    # Only wait for the user's confirmation if the verification link was shown
+    if state.get("show_id_verify_ui"):
+        confirmation = interrupt({"widget": "id_verification"})
+        state["id_verified"] = confirmation["verified"]
+        state["id_verify_failed"] = not confirmation["verified"]
+        state["show_id_verify_ui"] = False
+
     if state.get("id_verified"):
         state["messages"].append(AIMessage(
             content="Awesome news! Your identity verification is all set. 🛡️"
@@ -1289,7 +1332,7 @@ def ask_question_node(state: ChatbotState) -> ChatbotState:
     print("ask_question_node called")
     
     idx = state["current_question_index"]
-    questions = state["questions"] 
+    questions = get_compiled_config(state["job_config_id"]).questions
     
     if idx < len(questions):
         question = questions[idx]        
@@ -1316,8 +1359,9 @@ def store_answer_node(state: ChatbotState) -> ChatbotState:
     
     if isinstance(last_message, HumanMessage):
         idx = state["current_question_index"]
-        if idx < len(state["questions"]):
-            question = state["questions"][idx]
+        questions = get_compiled_config(state["job_config_id"]).questions
+        if idx < len(questions):
+            question = questions[idx]
             state["answers"][question] = last_message.content
             state["current_question_index"] += 1
     
@@ -1329,7 +1373,7 @@ def question_router(state: ChatbotState) -> Literal["ask_question", "score"]:
     
     print("question_router called")
     
-    if state["current_question_index"] < len(state["questions"]):
+    if state["current_question_index"] < len(get_compiled_config(state["job_config_id"]).questions):
         return "ask_question"
     return "score"
 
@@ -1342,13 +1386,13 @@ def score_node(state: ChatbotState) -> ChatbotState:
     print("score_node called")
     
     answers = state["answers"]
-    scoring_model = state["scoring_model"]
+    job_config = get_compiled_config(state["job_config_id"])
 
     print("Answers:", answers)
-    print("Scoring Model:", scoring_model)
+    print("Scoring Model:", job_config.config_id)
     
     answers_str = json.dumps(answers, indent=2)
-    scoring_str = json.dumps(scoring_model, indent=2)
+    scoring_str = job_config.scoring_model_json
     
     prompt = SCORING_PROMPT.format(
         answers=answers_str,
@@ -1384,7 +1428,7 @@ def score_node(state: ChatbotState) -> ChatbotState:
 
 
 
-def summary_node(state: ChatbotState) -> ChatbotState:
+async def summary_node(state: ChatbotState) -> ChatbotState:
     """Generate comprehensive JSON report and send to XANO"""
     
     print("summary_node called")
@@ -1438,21 +1482,11 @@ def summary_node(state: ChatbotState) -> ChatbotState:
     print(f"Work Experience in state variable: {work_experiences}") 
     print(f"Work Experience formatted text:\n{work_exp_text}")
 
-    # Extract all conversation messages
-    all_messages = state.get("messages", [])
-    conversation_history = []
-    
-    for msg in all_messages:
-        if isinstance(msg, HumanMessage):
-            conversation_history.append({
-                "role": "user",
-                "content": msg.content
-            })
-        elif isinstance(msg, AIMessage):
-            conversation_history.append({
-                "role": "ai",
-                "content": msg.content
-            })
+    # Transcript comes from the append-only log, plus the messages of this run
+    # (final answers, score) that are still only in state
+    conversation_history = await full_transcript(
+        session_id, state["messages"], state.get("transcript_seq", 0)
+    )
     
     print(f"Conversation history length: {len(conversation_history)}")
     
@@ -1472,22 +1506,32 @@ def summary_node(state: ChatbotState) -> ChatbotState:
         "address": address
     }
 
-    json_report = generate_json_report(data)
-    
-    # Send to XANO
-    send_applicant_to_xano(
-        name=name,
-        email=email,
-        phone=phone,
-        age = age,
-        score=score,
-        total_score=total_score,
-        json_report=json_report,
-        answers=answers,
-        session_id=session_id,
-        job_id=job_id,
-        company_id=company_id,
-        conversation_history=conversation_history
+    # Blocking LLM / HTTP calls run off the event loop now that this node is async
+    json_report = await asyncio.to_thread(generate_json_report, data)
+    
+    # Inputs for the PDF report, rendered at submission or on first download
+    await save_report_fields(
+        session_id,
+        applicant_report_fields(name, email, phone, score, total_score, json_report, answers),
+    )
+
+    # Queue for XANO; the outbox worker delivers and retries
+    await enqueue_applicant_submission(
+        idempotency_key=f"applicant:{session_id}:{job_id}",
+        payload=dict(
+            name=name,
+            email=email,
+            phone=phone,
+            age = age,
+            score=score,
+            total_score=total_score,
+            json_report=json_report,
+            answers=answers,
+            session_id=session_id,
+            job_id=job_id,
+            company_id=company_id,
+            conversation_history=conversation_history
+        ),
     )
     
     return state
@@ -1530,6 +1574,7 @@ def build_graph(checkpointer):
     
     workflow.add_node("ask_work_experience", ask_work_experience_node)
     workflow.add_node("store_work_experience_response", store_work_experience_response_node)
+    workflow.add_node("store_work_experience", store_work_experience_node)
     
     workflow.add_node("ask_education", ask_education_node)
     workflow.add_node("store_education", store_education_node)
@@ -1579,6 +1624,7 @@ def build_graph(checkpointer):
     workflow.add_conditional_edges("evaluate_single_knockout", single_knockout_router)
 
     # Address + GPS flow (between phone verification and questions)
+    # store_address / process_gps pause on interrupt() for their widget input
     workflow.add_edge("ask_address", "store_address")
     workflow.add_edge("store_address", "ask_gps_verification")
     workflow.add_edge("ask_gps_verification", "process_gps")
@@ -1586,7 +1632,8 @@ def build_graph(checkpointer):
     
     # Work experience flow
     workflow.add_edge("ask_work_experience", "store_work_experience_response")
-    workflow.add_edge("store_work_experience_response", "ask_education")
+    workflow.add_conditional_edges("store_work_experience_response", work_experience_router)
+    workflow.add_edge("store_work_experience", "ask_education")
 
     # Education flow
     workflow.add_edge("ask_education", "store_education")
@@ -1611,7 +1658,7 @@ def build_graph(checkpointer):
     workflow.add_edge("ask_phone_otp", "verify_phone_otp")
     workflow.add_conditional_edges("verify_phone_otp", phone_otp_router)
 
-    # ID Verification flow
+    # ID Verification flow (process_id_result pauses on interrupt() for confirmation)
     workflow.add_edge("ask_id_verification", "process_id_result")
     workflow.add_edge("process_id_result",   "ask_question")
  
@@ -1626,7 +1673,7 @@ def build_graph(checkpointer):
     
     app = workflow.compile(
         checkpointer=checkpointer,
-        interrupt_after=["delay_messages", "ask_knockout_question",  "ask_address", "ask_gps_verification", "ask_work_experience", "store_work_experience_response", "ask_education", "ask_name", "ask_email", "ask_email_otp", "ask_phone", "ask_phone_otp", "ask_id_verification", "ask_question"]
+        interrupt_after=["delay_messages", "ask_knockout_question", "ask_work_experience", "ask_education", "ask_name", "ask_email", "ask_email_otp", "ask_phone", "ask_phone_otp", "ask_question"]
     )
     
     return app
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+Shared async HTTP layer for outbound integrations (Google, Brevo, Simplici, Xano).
+
+One httpx.AsyncClient per host keeps TLS connections alive between calls.
+Every request gets the default timeouts, the retry policy below and is
+counted in per-endpoint latency metrics (exposed on /metrics).
+
+Retry policy:
+    - transport errors and 429/502/503/504 are retried with exponential
+      backoff (Retry-After is honoured) for idempotent methods
+    - POST is only retried when the connection could not be established,
+      unless the caller passes retry_unsafe=True
+HTTP error statuses are returned to the caller, not raised.
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_MAX_KEEPALIVE_PER_HOST = int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "10"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_RETRY_BACKOFF_SECONDS = float(os.getenv("HTTP_RETRY_BACKOFF_SECONDS", "0.5"))
+
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+# Errors raised before the request reached the server: safe to retry for any method
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Latency samples kept per endpoint for percentiles
+LATENCY_SAMPLES = 512
+
+# host -> (event loop, client); clients can't be shared across event loops
+_clients: dict = {}
+
+# endpoint -> counters and recent latencies
+_metrics: dict = {}
+
+
+def _get_client(url: str) -> httpx.AsyncClient:
+    """Keep-alive client for the URL's host, created on first use"""
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    loop = asyncio.get_running_loop()
+
+    entry = _clients.get(host)
+    if entry is not None:
+        client_loop, client = entry
+        if client_loop is loop and not client.is_closed:
+            return client
+
+    client = httpx.AsyncClient(
+        timeout=httpx.Timeout(HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_PER_HOST,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    )
+    _clients[host] = (loop, client)
+    print(f"[HTTP] Client created for {host}")
+    return client
+
+
+def _endpoint_stats(endpoint: str) -> dict:
+    stats = _metrics.get(endpoint)
+    if stats is None:
+        stats = {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "latencies": deque(maxlen=LATENCY_SAMPLES),
+            "max_ms": 0.0,
+        }
+        _metrics[endpoint] = stats
+    return stats
+
+
+def _record(stats: dict, started: float, error: bool) -> None:
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    stats["requests"] += 1
+    stats["latencies"].append(elapsed_ms)
+    stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+    if error:
+        stats["errors"] += 1
+
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with jitter for the given retry number (0-based)"""
+    return HTTP_RETRY_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random())
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    try:
+        return min(float(value), 30.0) if value else None
+    except ValueError:
+        return None
+
+
+async def request(
+    method: str,
+    url: str,
+    *,
+    endpoint: str = None,
+    retries: int = None,
+    retry_unsafe: bool = False,
+    **kwargs,
+) -> httpx.Response:
+    """
+    Send a request through the shared per-host client.
+
+    Args:
+        method: HTTP method
+        url: Full URL
+        endpoint: Metrics label (defaults to "METHOD host/path")
+        retries: Retry budget (defaults to HTTP_MAX_RETRIES)
+        retry_unsafe: Also retry non-idempotent methods after the request was sent
+        **kwargs: Passed to httpx (params, json, data, files, headers, timeout)
+
+    Returns:
+        httpx.Response: Final response (any status)
+
+    Raises:
+        httpx.HTTPError: If the last attempt failed with a transport error
+    """
+    method = method.upper()
+    if endpoint is None:
+        parts = urlsplit(url)
+        endpoint = f"{method} {parts.netloc}{parts.path}"
+
+    retries = HTTP_MAX_RETRIES if retries is None else retries
+    can_retry = method in IDEMPOTENT_METHODS or retry_unsafe
+    stats = _endpoint_stats(endpoint)
+    client = _get_client(url)
+
+    attempt = 0
+    while True:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            _record(stats, started, error=True)
+            if attempt >= retries or not (can_retry or isinstance(e, CONNECT_ERRORS)):
+                raise
+            delay = _backoff(attempt)
+            reason = type(e).__name__
+        else:
+            _record(stats, started, error=response.status_code >= 500)
+            if attempt >= retries or not can_retry or response.status_code not in RETRY_STATUS_CODES:
+                return response
+            delay = _retry_after(response) or _backoff(attempt)
+            reason = response.status_code
+
+        attempt += 1
+        stats["retries"] += 1
+        print(f"[HTTP] {endpoint} failed ({reason}), retry {attempt}/{retries} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    return await request("GET", url, **kwargs)
+
+
+async def post(url: str, **kwargs) -> httpx.Response:
+    return await request("POST", url, **kwargs)
+
+
+async def close_clients() -> None:
+    """Close every client created on the current loop (call on shutdown)"""
+    loop = asyncio.get_running_loop()
+    for host, (client_loop, client) in list(_clients.items()):
+        if client_loop is loop:
+            await client.aclose()
+            del _clients[host]
+    print("[HTTP] Clients closed")
+
+
+def http_metrics() -> dict:
+    """Per-endpoint request counts and latency for the /metrics endpoint"""
+    result = {}
+    for endpoint, stats in _metrics.items():
+        samples = sorted(stats["latencies"])
+        result[endpoint] = {
+            "requests": stats["requests"],
+            "errors": stats["errors"],
+            "retries": stats["retries"],
+            "avg_ms": round(sum(samples) / len(samples), 1) if samples else 0.0,
+            "p50_ms": round(samples[len(samples) // 2], 1) if samples else 0.0,
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1) if samples else 0.0,
+            "max_ms": round(stats["max_ms"], 1),
+        }
+    return result
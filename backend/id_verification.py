@@ -5,13 +5,17 @@ Switch via environment variable: ID_VERIFY_MODE=dev|prod
 """
 
 import os
-import requests
+import secrets
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from dotenv import load_dotenv
-from psycopg import AsyncConnection
+
+import http_client
+from async_cache import AsyncCache
+from db import get_pool
 
 load_dotenv()
 
-ID_VERIFY_MODE = "dev"
+ID_VERIFY_MODE = os.getenv("ID_VERIFY_MODE", "dev")
 
 # ── Simplici credentials ──────────────────────────────────────────────────────
 SIMPLICI_API_KEY        = os.getenv("SIMPLICI_API_KEY", "")
@@ -22,24 +26,66 @@ SIMPLICI_API_BASE       = "https://api.simplici.io/v1"
 # ── Dev test link (used when ID_VERIFY_MODE=dev) ──────────────────────────────
 SIMPLICI_DEV_LINK = "https://secure.beta.simplici.io/697248f9f43e4e9ae660479c?type=qr"
 
+# ── Correlation ───────────────────────────────────────────────────────────────
+# Every verification gets a random correlation key, stored against the Cleo
+# session before the link is handed out and carried in the link (and the
+# session metadata in prod). Webhooks are resolved from that key, never from
+# "whichever session started last".
+CORRELATION_PARAM = "ref"
+
+# Until Simplici is confirmed to echo the key, a sessionInitiate webhook
+# without one is mapped to the latest link handed out in this window that no
+# webhook has claimed yet (the old current_session_id behaviour, persisted).
+ID_VERIFY_FALLBACK_MINUTES = float(os.getenv("ID_VERIFY_FALLBACK_MINUTES", "30"))
+
+ID_VERIFY_CACHE_SIZE = int(os.getenv("ID_VERIFY_CACHE_SIZE", "10000"))
+ID_VERIFY_CACHE_TTL  = float(os.getenv("ID_VERIFY_CACHE_TTL", "86400"))
+
+# Write-through caches over the tables below. A worker resolves sessions it
+# created without a query; other workers load from the table once. Misses are
+# not cached, the row may be written by another worker a moment later.
+_correlations = AsyncCache("id_verify_correlations", max_size=ID_VERIFY_CACHE_SIZE,
+                           ttl=ID_VERIFY_CACHE_TTL, negative_ttl=0)
+_sessions     = AsyncCache("id_verify_sessions", max_size=ID_VERIFY_CACHE_SIZE,
+                           ttl=ID_VERIFY_CACHE_TTL, negative_ttl=0)
+
+
+def _with_correlation_key(link: str, correlation_key: str) -> str:
+    """Add the correlation key to the verification link's query string."""
+    parts = urlsplit(link)
+    query = parse_qsl(parts.query) + [(CORRELATION_PARAM, correlation_key)]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
 
 # ── Session creation ──────────────────────────────────────────────────────────
 
-def create_id_verify_session(cleo_session_id: str, applicant_name: str, phone: str) -> tuple[str, str]:
+async def create_id_verify_session(cleo_session_id: str, thread_id: str, applicant_name: str, phone: str) -> tuple[str, str]:
     """
     Create an ID verification session for the applicant.
 
-    DEV  mode: returns the fixed test link + a fake session id. No API call.
+    A new correlation key is registered for cleo_session_id first and added
+    to the link, so the webhooks can be traced back to this session. The
+    LangGraph thread_id is stored with it, so the result can be applied to the
+    checkpointed state from any worker.
+
+    DEV  mode: returns the fixed test link. No API call; the Simplici session
+               id is only learned from the sessionInitiate webhook.
     PROD mode: calls Simplici API to generate a unique per-applicant link.
 
     Returns:
-        (verify_link, simplici_session_id)
+        (verify_link, simplici_session_id)   simplici_session_id is "" in dev
         On failure returns ("", "")
     """
+    correlation_key = secrets.token_urlsafe(16)
+    try:
+        await save_correlation(correlation_key, cleo_session_id, thread_id)
+    except Exception as e:
+        print(f"[ID_VERIFY] Error registering correlation key: {e}")
+        return "", ""
+
     if ID_VERIFY_MODE == "dev":
-        session_id = "123456"
-        print(f"[ID_VERIFY] DEV mode — fixed link, static session id: {session_id}")
-        return SIMPLICI_DEV_LINK, session_id
+        print(f"[ID_VERIFY] DEV mode — fixed link, correlation key {correlation_key}")
+        return _with_correlation_key(SIMPLICI_DEV_LINK, correlation_key), ""
 
     # ── PROD: call Simplici API ───────────────────────────────────────────────
     try:
@@ -47,8 +93,9 @@ def create_id_verify_session(cleo_session_id: str, applicant_name: str, phone: s
             print("[ID_VERIFY] ERROR: SIMPLICI_API_KEY or SIMPLICI_APP_ID not set")
             return "", ""
 
-        response = requests.post(
+        response = await http_client.post(
             f"{SIMPLICI_API_BASE}/sessions",
+            endpoint="simplici.create_session",
             headers={
                 "Authorization": f"Bearer {SIMPLICI_API_KEY}",
                 "Content-Type": "application/json"
@@ -56,6 +103,7 @@ def create_id_verify_session(cleo_session_id: str, applicant_name: str, phone: s
             json={
                 "appId": SIMPLICI_APP_ID,
                 "metadata": {
+                    "correlation_key": correlation_key,
                     "cleo_session_id": cleo_session_id,
                     "applicant_name":  applicant_name,
                     "phone":           phone
@@ -71,7 +119,7 @@ def create_id_verify_session(cleo_session_id: str, applicant_name: str, phone: s
         verify_link         = data["verifyUrl"]
 
         print(f"[ID_VERIFY] PROD — created session {simplici_session_id} for {applicant_name}")
-        return verify_link, simplici_session_id
+        return _with_correlation_key(verify_link, correlation_key), simplici_session_id
 
     except Exception as e:
         print(f"[ID_VERIFY] Error creating Simplici session: {e}")
@@ -79,22 +127,15 @@ def create_id_verify_session(cleo_session_id: str, applicant_name: str, phone: s
 
 
 # ── PostgreSQL mapping helpers ────────────────────────────────────────────────
-# Each function opens its own short-lived connection so it doesn't interfere
-# with the AsyncPostgresSaver connection used by LangGraph.
-
-async def _get_conn() -> AsyncConnection:
-    """Open a fresh PostgreSQL connection using the same connection string."""
-    conn_str = os.getenv("POSTGRES_CONNECTION_STRING")
-    return await AsyncConnection.connect(conn_str, autocommit=True)
-
+# Connections come from the shared app pool (db.py), separate from the
+# AsyncPostgresSaver connection used by LangGraph.
 
 async def setup_mapping_table() -> None:
     """
-    Create the id_verify_sessions table if it doesn't exist.
-    Call this once at app startup (from lifespan in main.py).
+    Create the id_verify_sessions and id_verify_correlations tables if they don't exist.
+    Call this once at app startup (from lifespan in main.py), after open_pool().
     """
-    conn = await _get_conn()
-    try:
+    async with get_pool().connection() as conn:
         await conn.execute("""
             CREATE TABLE IF NOT EXISTS id_verify_sessions (
                 simplici_session_id TEXT PRIMARY KEY,
@@ -102,49 +143,194 @@ async def setup_mapping_table() -> None:
                 created_at          TIMESTAMPTZ DEFAULT NOW()
             )
         """)
-        print("[ID_VERIFY] id_verify_sessions table ready")
-    finally:
-        await conn.close()
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS id_verify_correlations (
+                correlation_key TEXT PRIMARY KEY,
+                cleo_session_id TEXT NOT NULL,
+                created_at      TIMESTAMPTZ DEFAULT NOW()
+            )
+        """)
+        await conn.execute("ALTER TABLE id_verify_correlations ADD COLUMN IF NOT EXISTS thread_id TEXT")
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS id_verify_correlations_session_idx
+            ON id_verify_correlations (cleo_session_id)
+        """)
+    print("[ID_VERIFY] id_verify_sessions / id_verify_correlations tables ready")
+
+
+async def save_correlation(correlation_key: str, cleo_session_id: str, thread_id: str) -> None:
+    """Persist correlation_key → cleo_session_id (and its thread_id) and cache it (write-through)."""
+    async with get_pool().connection() as conn:
+        await conn.execute("""
+            INSERT INTO id_verify_correlations (correlation_key, cleo_session_id, thread_id)
+            VALUES (%s, %s, %s)
+        """, (correlation_key, cleo_session_id, thread_id))
+    _correlations.set(correlation_key, cleo_session_id)
+
+
+async def get_thread_id(cleo_session_id: str) -> str | None:
+    """
+    LangGraph thread_id of a Cleo session, from its latest correlation key.
+    Lets a webhook update the checkpointed state when the session isn't held
+    in this process's memory. Returns None if not found.
+    """
+    async with get_pool().connection() as conn:
+        cur = await conn.execute("""
+            SELECT thread_id FROM id_verify_correlations
+            WHERE cleo_session_id = %s AND thread_id IS NOT NULL
+            ORDER BY created_at DESC
+            LIMIT 1
+        """, (cleo_session_id,))
+        row = await cur.fetchone()
+    return row[0] if row else None
 
 
 async def save_session_mapping(simplici_session_id: str, cleo_session_id: str) -> None:
     """
-    Persist the simplici_session_id → cleo_session_id mapping to PostgreSQL.
-    Called right after create_id_verify_session() in ask_id_verification_node.
+    Persist the simplici_session_id → cleo_session_id mapping to PostgreSQL
+    and cache it (write-through).
+    Called after create_id_verify_session() in ask_id_verification_node (prod)
+    and when a webhook is first resolved by correlation key.
     """
-    # simplici_session_id = "69b316bc1c27852451484f30"
-    
-    print(f"[ID_VERIFY] save_session_mapping: "
-          f"{simplici_session_id} → {cleo_session_id}")
-    
-    conn = await _get_conn()
-    try:
-        await conn.execute("""
+    async with get_pool().connection() as conn:
+        cur = await conn.execute("""
             INSERT INTO id_verify_sessions (simplici_session_id, cleo_session_id)
             VALUES (%s, %s)
             ON CONFLICT (simplici_session_id) DO NOTHING
         """, (simplici_session_id, cleo_session_id))
+        inserted = cur.rowcount == 1
+
+    if inserted:
+        _sessions.set(simplici_session_id, cleo_session_id)
         print(f"[ID_VERIFY] Saved mapping: {simplici_session_id} → {cleo_session_id}")
-    finally:
-        await conn.close()
+    else:
+        # Already mapped (possibly elsewhere); the table is the source of truth
+        _sessions.invalidate(simplici_session_id)
 
 
 async def get_cleo_session_id(simplici_session_id: str) -> str | None:
     """
     Look up the cleo_session_id from a simplici_session_id.
-    Called by the webhook endpoint in main.py.
+    Served from the cache; the table is read only on a miss.
     Returns None if not found.
     """
-    conn = await _get_conn()
-    try:
-        cur = await conn.execute(
-            "SELECT cleo_session_id FROM id_verify_sessions WHERE simplici_session_id = %s",
-            (simplici_session_id,)
-        )
-        row = await cur.fetchone()
+    async def load() -> str | None:
+        async with get_pool().connection() as conn:
+            cur = await conn.execute(
+                "SELECT cleo_session_id FROM id_verify_sessions WHERE simplici_session_id = %s",
+                (simplici_session_id,)
+            )
+            row = await cur.fetchone()
+        return row[0] if row else None
+
+    return await _sessions.get_or_load(simplici_session_id, load, is_negative=lambda v: v is None)
+
+
+async def get_correlated_session_id(correlation_key: str) -> str | None:
+    """
+    Look up the cleo_session_id a correlation key was issued for.
+    Served from the cache; the table is read only on a miss.
+    Returns None if not found.
+    """
+    async def load() -> str | None:
+        async with get_pool().connection() as conn:
+            cur = await conn.execute(
+                "SELECT cleo_session_id FROM id_verify_correlations WHERE correlation_key = %s",
+                (correlation_key,)
+            )
+            row = await cur.fetchone()
         return row[0] if row else None
-    finally:
-        await conn.close()
+
+    return await _correlations.get_or_load(correlation_key, load, is_negative=lambda v: v is None)
+
+
+def correlation_key_from_webhook(payload: dict) -> str | None:
+    """
+    The correlation key echoed back in a webhook: session metadata, or the
+    link's query parameter.
+
+    ⚠️  Not yet checked against a real Simplici webhook; the places below are
+        our guess. resolve_webhook_session falls back to the latest unclaimed
+        link when none of them has the key.
+    """
+    for source in (payload, payload.get("payload") or {}):
+        metadata = source.get("metadata") or {}
+        key = (metadata.get("correlation_key") or metadata.get(CORRELATION_PARAM)
+               or source.get(CORRELATION_PARAM))
+        if key:
+            return key
+    return None
+
+
+async def latest_unclaimed_session_id() -> str | None:
+    """
+    Cleo session of the most recent link (within ID_VERIFY_FALLBACK_MINUTES)
+    that no Simplici session is mapped to yet. None if there is none.
+    """
+    async with get_pool().connection() as conn:
+        cur = await conn.execute("""
+            SELECT c.cleo_session_id FROM id_verify_correlations c
+            WHERE c.created_at > NOW() - make_interval(secs => %s)
+              AND NOT EXISTS (
+                  SELECT 1 FROM id_verify_sessions s WHERE s.cleo_session_id = c.cleo_session_id
+              )
+            ORDER BY c.created_at DESC
+            LIMIT 1
+        """, (ID_VERIFY_FALLBACK_MINUTES * 60,))
+        row = await cur.fetchone()
+    return row[0] if row else None
+
+
+async def resolve_webhook_session(simplici_session_id: str, payload: dict) -> str | None:
+    """
+    Cleo session a Simplici webhook belongs to.
+    Uses the simplici_session_id mapping if there is one, else the correlation
+    key in the payload, else (sessionInitiate only) the latest unclaimed link.
+    Records the mapping for later webhooks. Returns None if it can't be traced.
+    """
+    cleo_session_id = await get_cleo_session_id(simplici_session_id)
+    if cleo_session_id:
+        return cleo_session_id
+
+    correlation_key = correlation_key_from_webhook(payload)
+    if correlation_key:
+        cleo_session_id = await get_correlated_session_id(correlation_key)
+    elif payload.get("stepId") == "sessionInitiate":
+        print(f"[ID_VERIFY] No correlation key in webhook for Simplici session {simplici_session_id}, using latest unclaimed link")
+        cleo_session_id = await latest_unclaimed_session_id()
+    else:
+        print(f"[ID_VERIFY] No correlation key in webhook for Simplici session {simplici_session_id}")
+        return None
+
+    if cleo_session_id:
+        await save_session_mapping(simplici_session_id, cleo_session_id)
+    return cleo_session_id
+
+
+# ── KYC result ────────────────────────────────────────────────────────────────
+
+def parse_kyc_result(event_payload: dict) -> bool:
+    """
+    Pass/fail from the payload of a Simplici "kyc" webhook.
+    Verified only if the session and report completed, liveliness passed
+    and there are no rejections.
+    """
+    kyc_data      = event_payload.get("kyc", {})
+    report        = kyc_data.get("basicInfo", {}).get("report", {})
+    top_status    = event_payload.get("status", "")
+    report_status = report.get("status", "")
+    rejections    = report.get("reject", ["unknown"])  # non-empty = failed
+    liveliness    = report.get("liveliness", False)
+
+    verified = (
+        top_status    == "completed" and
+        report_status == "completed" and
+        liveliness    == True and
+        len(rejections) == 0
+    )
+
+    print(f"[ID_VERIFY] KYC result — status: {top_status}, report: {report_status}, liveliness: {liveliness}, rejections: {rejections}, verified: {verified}")
+    return verified
 
 
 # ── Webhook signature verification (production safety) ───────────────────────
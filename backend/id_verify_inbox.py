@@ -0,0 +1,222 @@
+"""
+Inbox for Simplici ID-verification webhooks.
+
+The webhook endpoint only stores the event in id_verify_webhooks (deduped on
+sessionId:stepId, so provider retries are no-ops) and returns. A background
+worker (started from lifespan in main.py) claims pending events with
+FOR UPDATE SKIP LOCKED and hands each one to the handler main.py passes in,
+which records the session mapping or applies the KYC result to graph state
+and the socket. Handler failures (including a session that can't be
+resolved yet) are retried with backoff; an event is only marked done once
+it has been applied, and dead-lettered after the last attempt.
+"""
+
+import asyncio
+import os
+from psycopg.types.json import Jsonb
+from dotenv import load_dotenv
+
+from db import get_pool
+
+load_dotenv()
+
+ID_VERIFY_INBOX_BATCH_SIZE = int(os.getenv("ID_VERIFY_INBOX_BATCH_SIZE", "20"))
+ID_VERIFY_INBOX_MAX_ATTEMPTS = int(os.getenv("ID_VERIFY_INBOX_MAX_ATTEMPTS", "5"))
+ID_VERIFY_INBOX_POLL_SECONDS = float(os.getenv("ID_VERIFY_INBOX_POLL_SECONDS", "5"))
+ID_VERIFY_INBOX_LEASE_SECONDS = int(os.getenv("ID_VERIFY_INBOX_LEASE_SECONDS", "60"))
+
+# Steps worth storing; every other intermediate step is acknowledged and dropped
+HANDLED_STEPS = {"sessionInitiate", "kyc"}
+
+# Set on ingest so the worker doesn't wait for the next poll
+_wakeup = asyncio.Event()
+
+_metrics = {
+    "received": 0,
+    "duplicates": 0,
+    "ignored": 0,
+    "processed": 0,
+    "failed_attempts": 0,
+    "dead": 0,
+    "processing_lag_ms_total": 0.0,
+}
+
+
+async def setup_inbox_table() -> None:
+    """
+    Create the id_verify_webhooks table if it doesn't exist.
+    Call this once at app startup (from lifespan in main.py).
+    """
+    async with get_pool().connection() as conn:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS id_verify_webhooks (
+                id                  BIGSERIAL   PRIMARY KEY,
+                dedupe_key          TEXT        NOT NULL UNIQUE,
+                simplici_session_id TEXT        NOT NULL,
+                step_id             TEXT        NOT NULL,
+                payload             JSONB       NOT NULL,
+                status              TEXT        NOT NULL DEFAULT 'pending',
+                outcome             TEXT,
+                attempts            INTEGER     NOT NULL DEFAULT 0,
+                next_attempt_at     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                last_error          TEXT,
+                received_at         TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                processed_at        TIMESTAMPTZ
+            )
+        """)
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_id_verify_webhooks_due
+                ON id_verify_webhooks(next_attempt_at) WHERE status = 'pending'
+        """)
+    print("[ID_VERIFY_INBOX] id_verify_webhooks table ready")
+
+
+async def ingest_webhook(payload: dict) -> str:
+    """
+    Store a webhook for the worker.
+
+    Returns:
+        str: "accepted", "duplicate" or "ignored"
+    """
+    simplici_session_id = payload.get("sessionId")
+    step_id = payload.get("stepId", "")
+
+    if not simplici_session_id or step_id not in HANDLED_STEPS:
+        _metrics["ignored"] += 1
+        return "ignored"
+
+    async with get_pool().connection() as conn:
+        cur = await conn.execute("""
+            INSERT INTO id_verify_webhooks (dedupe_key, simplici_session_id, step_id, payload)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (dedupe_key) DO NOTHING
+        """, (f"{simplici_session_id}:{step_id}", simplici_session_id, step_id, Jsonb(payload)))
+        inserted = cur.rowcount == 1
+
+    if not inserted:
+        _metrics["duplicates"] += 1
+        return "duplicate"
+
+    _metrics["received"] += 1
+    _wakeup.set()
+    return "accepted"
+
+
+def backoff_seconds(attempts: int) -> int:
+    return min(5 * 2 ** (attempts - 1), 600)
+
+
+async def _claim_batch() -> list:
+    """Lease due events, oldest first so sessionInitiate runs before its kyc"""
+    async with get_pool().connection() as conn:
+        cur = await conn.execute("""
+            UPDATE id_verify_webhooks
+            SET attempts = attempts + 1,
+                next_attempt_at = NOW() + make_interval(secs => %s)
+            WHERE id IN (
+                SELECT id FROM id_verify_webhooks
+                WHERE status = 'pending' AND next_attempt_at <= NOW()
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, simplici_session_id, step_id, payload, attempts,
+                      EXTRACT(EPOCH FROM NOW() - received_at)
+        """, (ID_VERIFY_INBOX_LEASE_SECONDS, ID_VERIFY_INBOX_BATCH_SIZE))
+        rows = await cur.fetchall()
+    return sorted(rows, key=lambda row: row[0])
+
+
+async def _process(row, handler) -> None:
+    event_id, simplici_session_id, step_id, payload, attempts, lag_seconds = row
+
+    try:
+        outcome = await handler(simplici_session_id, step_id, payload)
+    except Exception as e:
+        _metrics["failed_attempts"] += 1
+        dead = attempts >= ID_VERIFY_INBOX_MAX_ATTEMPTS
+        print(f"[ID_VERIFY_INBOX] {simplici_session_id}:{step_id} attempt {attempts} failed: {e}")
+
+        async with get_pool().connection() as conn:
+            await conn.execute("""
+                UPDATE id_verify_webhooks
+                SET status = %s, last_error = %s,
+                    next_attempt_at = NOW() + make_interval(secs => %s)
+                WHERE id = %s
+            """, ("dead" if dead else "pending", str(e), backoff_seconds(attempts), event_id))
+        if dead:
+            _metrics["dead"] += 1
+        return
+
+    async with get_pool().connection() as conn:
+        await conn.execute("""
+            UPDATE id_verify_webhooks
+            SET status = 'done', outcome = %s, processed_at = NOW(), last_error = NULL
+            WHERE id = %s
+        """, (outcome, event_id))
+
+    _metrics["processed"] += 1
+    _metrics["processing_lag_ms_total"] += float(lag_seconds) * 1000
+    print(f"[ID_VERIFY_INBOX] {simplici_session_id}:{step_id} -> {outcome}")
+
+
+async def drain_inbox(handler) -> int:
+    """Process every due event in arrival order; returns how many were handled"""
+    processed = 0
+    while True:
+        rows = await _claim_batch()
+        if not rows:
+            return processed
+
+        # Sequential: a session's kyc result depends on its sessionInitiate mapping
+        for row in rows:
+            await _process(row, handler)
+        processed += len(rows)
+
+
+async def run_inbox_worker(handler) -> None:
+    """
+    Background task: apply stored webhooks as they arrive.
+
+    Args:
+        handler: async (simplici_session_id, step_id, payload) -> outcome str;
+                 raising marks the attempt failed and schedules a retry
+    """
+    print("[ID_VERIFY_INBOX] Worker started")
+
+    while True:
+        try:
+            _wakeup.clear()
+            await drain_inbox(handler)
+        except asyncio.CancelledError:
+            print("[ID_VERIFY_INBOX] Worker cancelled")
+            raise
+        except Exception as e:
+            print(f"[ID_VERIFY_INBOX] Worker error: {e}")
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=ID_VERIFY_INBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def inbox_metrics() -> dict:
+    """Ingest counters, backlog and processing lag for the /metrics endpoint"""
+    async with get_pool().connection() as conn:
+        cur = await conn.execute("""
+            SELECT
+                COUNT(*) FILTER (WHERE status = 'pending'),
+                COUNT(*) FILTER (WHERE status = 'dead'),
+                EXTRACT(EPOCH FROM NOW() - MIN(received_at) FILTER (WHERE status = 'pending'))
+            FROM id_verify_webhooks
+        """)
+        depth, dead, oldest_age = await cur.fetchone()
+
+    processed = _metrics["processed"]
+    return {
+        **{k: v for k, v in _metrics.items() if k != "processing_lag_ms_total"},
+        "avg_processing_lag_ms": round(_metrics["processing_lag_ms_total"] / processed, 1) if processed else 0.0,
+        "queue_depth": depth,
+        "dead_letter_depth": dead,
+        "oldest_pending_age_seconds": round(float(oldest_age), 1) if oldest_age is not None else 0.0,
+    }
@@ -0,0 +1,222 @@
+"""Bulk interview scheduling initiation
+
+Hiring managers invite whole groups of applicants at once (e.g. after a job
+fair). Instead of one /api/schedule-interview call per applicant:
+
+    - every item is validated as a SchedulingRequest on its own, so one bad
+      phone number doesn't reject the batch
+    - slots are registered in the inventory once per store, and open slots
+      are looked up once per store
+    - all sessions are inserted with a single COPY
+    - initial SMS are handed to the notification dispatcher at bulk
+      priority, which rate-limits the Twilio fan-out and retries failures
+
+The batch (per-item session IDs and delivery handles) is kept in memory for
+progress polling; the last BULK_BATCHES_KEPT batches are available.
+"""
+
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from psycopg import AsyncConnection
+from pydantic import ValidationError
+from dotenv import load_dotenv
+
+from models import SchedulingRequest
+from scheduling_service import create_scheduling_sessions
+from scheduling_prompts import format_slots_for_display
+from slot_inventory import register_slots, open_slots, store_key
+from twilio_service import send_initial_scheduling_sms, PRIORITY_BULK
+
+load_dotenv()
+
+BULK_SCHEDULING_MAX_ITEMS = int(os.getenv("BULK_SCHEDULING_MAX_ITEMS", "500"))
+BULK_BATCHES_KEPT = int(os.getenv("BULK_BATCHES_KEPT", "200"))
+
+# batch_id -> batch, most recent last
+_batches: OrderedDict = OrderedDict()
+
+_metrics = {
+    "batches": 0,
+    "accepted": 0,
+    "rejected": 0,
+}
+
+
+def _validation_error(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in e.errors()
+    )
+
+
+def _validate(items: list) -> tuple:
+    """
+    Returns:
+        tuple: (valid [(index, SchedulingRequest)], results {index: item result})
+    """
+    valid = []
+    results = {}
+    seen_phones = {}
+
+    for index, item in enumerate(items):
+        try:
+            request = SchedulingRequest(**item)
+        except ValidationError as e:
+            results[index] = {"index": index, "status": "invalid", "error": _validation_error(e)}
+            continue
+
+        # Replies are matched to sessions by phone, so one session per applicant
+        if request.applicant_phone in seen_phones:
+            results[index] = {
+                "index": index,
+                "status": "invalid",
+                "error": f"applicant_phone: duplicate of item {seen_phones[request.applicant_phone]}",
+            }
+            continue
+
+        seen_phones[request.applicant_phone] = index
+        valid.append((index, request))
+
+    return valid, results
+
+
+async def _live_slots_by_store(conn: AsyncConnection, requests: list) -> dict:
+    """Register every offered slot and return the open ones, one round-trip pair per store"""
+    by_store = {}
+    for request in requests:
+        store = store_key(request.company_name, request.location)
+        group = by_store.setdefault((store, request.slot_capacity), {})
+        for date, times in request.slots.items():
+            offered = group.setdefault(date, [])
+            offered.extend(time for time in times if time not in offered)
+
+    merged = {}
+    for (store, capacity), slots in by_store.items():
+        await register_slots(conn, store, slots, capacity)
+        store_slots = merged.setdefault(store, {})
+        for date, times in slots.items():
+            offered = store_slots.setdefault(date, [])
+            offered.extend(time for time in times if time not in offered)
+
+    return {store: await open_slots(conn, store, slots) for store, slots in merged.items()}
+
+
+def _filter_slots(slots: dict, live: dict) -> dict:
+    filtered = {}
+    for date, times in slots.items():
+        open_times = [time for time in times if time in live.get(date, ())]
+        if open_times:
+            filtered[date] = open_times
+    return filtered
+
+
+async def initiate_bulk_scheduling(conn: AsyncConnection, items: list) -> dict:
+    """
+    Validate a batch, create its sessions and queue the initial SMS
+
+    Args:
+        conn: Database connection
+        items: SchedulingRequest payloads
+
+    Returns:
+        dict: { "batch_id", "accepted", "rejected", "items": [per-item result] }
+              in the shape of BulkSchedulingResponse
+    """
+    valid, results = _validate(items)
+
+    live_by_store = await _live_slots_by_store(conn, [request for _, request in valid])
+
+    to_create = []
+    for index, request in valid:
+        live = _filter_slots(request.slots, live_by_store[store_key(request.company_name, request.location)])
+        if not live:
+            results[index] = {"index": index, "status": "no_slots", "error": "All of the provided slots are already booked"}
+            continue
+        to_create.append((index, request, live))
+
+    session_ids = await create_scheduling_sessions(conn, [request.model_dump() for _, request, _ in to_create])
+
+    handles = {}
+    for session_id, (index, request, live) in zip(session_ids, to_create):
+        handles[index] = send_initial_scheduling_sms(
+            phone=request.applicant_phone,
+            name=request.applicant_name,
+            company=request.company_name,
+            slots_formatted=format_slots_for_display(live),
+            priority=PRIORITY_BULK
+        )
+        results[index] = {"index": index, "status": "queued", "session_id": session_id}
+
+    batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+    _batches[batch_id] = {
+        "created_at": datetime.now(),
+        "items": [results[index] for index in range(len(items))],
+        "handles": handles,
+    }
+    while len(_batches) > BULK_BATCHES_KEPT:
+        _batches.popitem(last=False)
+
+    _metrics["batches"] += 1
+    _metrics["accepted"] += len(handles)
+    _metrics["rejected"] += len(items) - len(handles)
+    print(f"✓ Bulk scheduling {batch_id}: {len(handles)} queued, {len(items) - len(handles)} rejected")
+
+    return {
+        "batch_id": batch_id,
+        "accepted": len(handles),
+        "rejected": len(items) - len(handles),
+        "items": _batches[batch_id]["items"],
+    }
+
+
+async def get_bulk_progress(conn: AsyncConnection, batch_id: str) -> dict | None:
+    """
+    SMS delivery and session status for every item of a batch
+
+    Returns:
+        dict: In the shape of BulkSchedulingStatusResponse, or None if the
+              batch is unknown (or no longer kept)
+    """
+    batch = _batches.get(batch_id)
+    if batch is None:
+        return None
+
+    session_ids = [item["session_id"] for item in batch["items"] if item.get("session_id")]
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            SELECT session_id, status FROM interview_scheduling_sessions
+            WHERE session_id = ANY(%s)
+        """, (session_ids,))
+        statuses = {row['session_id']: row['status'] for row in await cur.fetchall()}
+
+    sms = {}
+    sessions = {}
+    items = []
+    for item in batch["items"]:
+        item = dict(item)
+        handle = batch["handles"].get(item["index"])
+        if handle is not None:
+            item["sms_status"] = handle.status
+            item["session_status"] = statuses.get(item["session_id"])
+            sms[handle.status] = sms.get(handle.status, 0) + 1
+            if item["session_status"]:
+                sessions[item["session_status"]] = sessions.get(item["session_status"], 0) + 1
+        items.append(item)
+
+    return {
+        "batch_id": batch_id,
+        "total": len(items),
+        "accepted": len(batch["handles"]),
+        "sms": sms,
+        "sessions": sessions,
+        "done": all(handle.done() for handle in batch["handles"].values()),
+        "created_at": batch["created_at"],
+        "items": items,
+    }
+
+
+def bulk_scheduling_metrics() -> dict:
+    """Batch and item counters for the metrics endpoint"""
+    return {**_metrics, "batches_tracked": len(_batches)}
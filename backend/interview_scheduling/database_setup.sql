@@ -39,3 +39,55 @@ CREATE TRIGGER update_scheduling_sessions_updated_at
     BEFORE UPDATE ON interview_scheduling_sessions
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
+
+
+-- Inbound SMS job queue (also created at startup by inbound_sms_queue.py)
+CREATE TABLE IF NOT EXISTS inbound_sms_queue (
+    id BIGSERIAL PRIMARY KEY,
+    message_sid VARCHAR(64),
+    from_phone VARCHAR(20) NOT NULL,
+    body TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',  -- pending, processing, done, failed
+    outcome VARCHAR(50),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    received_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    processed_at TIMESTAMPTZ
+);
+
+-- Open rows only, for the recovery scan
+CREATE INDEX IF NOT EXISTS idx_inbound_sms_open ON inbound_sms_queue(id) WHERE status IN ('pending', 'processing');
+
+-- One row per Twilio MessageSid (webhook retries are dropped)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_inbound_sms_message_sid ON inbound_sms_queue(message_sid) WHERE message_sid IS NOT NULL;
+
+
+-- Shared interview slot inventory (also created at startup by slot_inventory.py)
+CREATE TABLE IF NOT EXISTS interview_slot_inventory (
+    id BIGSERIAL PRIMARY KEY,
+    store_key VARCHAR(512) NOT NULL,  -- lower(company_name)|lower(location)
+    slot_date VARCHAR(100) NOT NULL,
+    slot_time VARCHAR(50) NOT NULL,
+    capacity INTEGER NOT NULL DEFAULT 1,
+    reserved INTEGER NOT NULL DEFAULT 0,
+    confirmed INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE (store_key, slot_date, slot_time),
+    CHECK (reserved >= 0 AND confirmed >= 0 AND reserved + confirmed <= capacity)
+);
+
+CREATE TABLE IF NOT EXISTS interview_slot_reservations (
+    id BIGSERIAL PRIMARY KEY,
+    session_id VARCHAR(100) NOT NULL,
+    slot_id BIGINT NOT NULL REFERENCES interview_slot_inventory(id),
+    status VARCHAR(20) NOT NULL,  -- held, confirmed, released, expired
+    expires_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- At most one live seat per session
+CREATE UNIQUE INDEX IF NOT EXISTS idx_slot_reservations_live ON interview_slot_reservations(session_id) WHERE status IN ('held', 'confirmed');
+
+-- Held seats only, for the expiry sweep
+CREATE INDEX IF NOT EXISTS idx_slot_reservations_expiry ON interview_slot_reservations(expires_at) WHERE status = 'held';
@@ -0,0 +1,383 @@
+"""Job queue for inbound scheduling SMS (Twilio webhook)
+
+The webhook only validates the signature, stores the message in
+inbound_sms_queue and returns 200. Processing (session lookup, LLM, reply,
+Xano submission) happens on a pool of worker tasks:
+
+    - a row is claimed with a conditional UPDATE before it is processed, so a
+      message is never handled twice, even with several app processes
+    - the claim is refused while an older row from the same phone is still
+      pending or processing, so an applicant's messages are handled one at a
+      time and in arrival order across every process (including while an
+      older message waits for its retry); finishing a row hands out the
+      phone's next one
+    - a message whose handler raised is retried with exponential backoff,
+      up to INBOUND_SMS_MAX_ATTEMPTS attempts
+    - the handler records when the reply SMS went out; a row that was
+      already replied to is never handled (and answered) again
+    - a recovery loop re-queues rows left pending, due for a retry or stuck
+      mid-processing (e.g. after a restart) and purges old finished rows
+    - Twilio retries (same MessageSid) are dropped before they are stored,
+      and the original message's outcome is returned (message_sid_index.py)
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from psycopg import AsyncConnection
+from dotenv import load_dotenv
+
+from message_sid_index import MessageSidIndex
+
+load_dotenv()
+
+INBOUND_SMS_WORKERS = int(os.getenv("INBOUND_SMS_WORKERS", "4"))
+INBOUND_SMS_RECOVERY_SECONDS = float(os.getenv("INBOUND_SMS_RECOVERY_SECONDS", "30"))
+# A row processing for longer than this is assumed abandoned and re-run
+INBOUND_SMS_STALE_SECONDS = int(os.getenv("INBOUND_SMS_STALE_SECONDS", "300"))
+INBOUND_SMS_MAX_ATTEMPTS = int(os.getenv("INBOUND_SMS_MAX_ATTEMPTS", "5"))
+# Wait before the first retry, doubled for each one after
+INBOUND_SMS_RETRY_SECONDS = float(os.getenv("INBOUND_SMS_RETRY_SECONDS", "30"))
+# Finished rows (and with them the MessageSid uniqueness window) are kept this long
+INBOUND_SMS_RETENTION_DAYS = int(os.getenv("INBOUND_SMS_RETENTION_DAYS", "7"))
+
+LATENCY_SAMPLES = 512
+
+_conn: AsyncConnection | None = None
+_handler = None
+_queue: asyncio.Queue | None = None
+_tasks: list = []
+_seen_sids = MessageSidIndex()
+
+_metrics = {
+    "received": 0,
+    "duplicates": 0,
+    "processed": 0,
+    "failed": 0,
+    "retried": 0,
+    "recovered": 0,
+}
+_queue_latency_ms: deque = deque(maxlen=LATENCY_SAMPLES)
+_processing_ms: deque = deque(maxlen=LATENCY_SAMPLES)
+
+
+async def setup_inbound_sms_table(conn: AsyncConnection):
+    """
+    Create the inbound_sms_queue table if it doesn't exist
+    Call this once at app startup (from lifespan in scheduling_api.py)
+    """
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            CREATE TABLE IF NOT EXISTS inbound_sms_queue (
+                id            BIGSERIAL   PRIMARY KEY,
+                message_sid   VARCHAR(64),
+                from_phone    VARCHAR(20) NOT NULL,
+                body          TEXT        NOT NULL,
+                status        VARCHAR(20) NOT NULL DEFAULT 'pending',
+                outcome       VARCHAR(50),
+                attempts      INTEGER     NOT NULL DEFAULT 0,
+                last_error    TEXT,
+                received_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                started_at    TIMESTAMPTZ,
+                processed_at  TIMESTAMPTZ
+            )
+        """)
+        await cur.execute("""
+            ALTER TABLE inbound_sms_queue
+                ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ,
+                ADD COLUMN IF NOT EXISTS replied_at      TIMESTAMPTZ
+        """)
+        await cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_inbound_sms_open
+                ON inbound_sms_queue(id) WHERE status IN ('pending', 'processing')
+        """)
+        await cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_inbound_sms_open_phone
+                ON inbound_sms_queue(from_phone, id) WHERE status IN ('pending', 'processing')
+        """)
+        await cur.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_inbound_sms_message_sid
+                ON inbound_sms_queue(message_sid) WHERE message_sid IS NOT NULL
+        """)
+    print("✓ inbound_sms_queue table ready")
+
+
+def _submit(sms_id: int) -> None:
+    _queue.put_nowait(sms_id)
+
+
+def _duplicate(sms_id: int, outcome: str | None) -> dict:
+    _metrics["duplicates"] += 1
+    return {"id": sms_id, "duplicate": True, "outcome": outcome or "processing"}
+
+
+async def enqueue_inbound_sms(from_phone: str, body: str, message_sid: str = None) -> dict:
+    """
+    Persist an inbound SMS and hand it to the worker for its phone number
+    A MessageSid that was already received is not stored or processed again
+
+    Args:
+        from_phone: Sender phone number
+        body: Message text
+        message_sid: Twilio MessageSid
+
+    Returns:
+        dict: { "id", "duplicate", "outcome" } - outcome of the original
+              message for duplicates ("processing" until it is done)
+    """
+    if message_sid:
+        seen = _seen_sids.get(message_sid)
+        if seen is not None:
+            return _duplicate(*seen)
+
+    async with _conn.cursor() as cur:
+        await cur.execute("""
+            INSERT INTO inbound_sms_queue (message_sid, from_phone, body)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (message_sid) WHERE message_sid IS NOT NULL DO NOTHING
+            RETURNING id
+        """, (message_sid, from_phone, body))
+        row = await cur.fetchone()
+
+        if not row:
+            # Seen by another process, or before a restart
+            await cur.execute("""
+                SELECT id, outcome FROM inbound_sms_queue WHERE message_sid = %s
+            """, (message_sid,))
+            existing = await cur.fetchone()
+            _seen_sids.add(message_sid, existing['id'], existing['outcome'])
+            return _duplicate(existing['id'], existing['outcome'])
+
+    if message_sid:
+        _seen_sids.add(message_sid, row['id'])
+
+    _metrics["received"] += 1
+    _submit(row['id'])
+    return {"id": row['id'], "duplicate": False, "outcome": None}
+
+
+async def _claim(sms_id: int):
+    """
+    Mark a pending row as processing; None if another worker already has it,
+    it isn't due yet, or an older message from the same phone isn't finished
+    """
+    async with _conn.cursor() as cur:
+        await cur.execute("""
+            UPDATE inbound_sms_queue q
+            SET status = 'processing', started_at = NOW(), attempts = attempts + 1
+            WHERE id = %s AND status = 'pending'
+              AND (next_attempt_at IS NULL OR next_attempt_at <= NOW())
+              AND NOT EXISTS (
+                  SELECT 1 FROM inbound_sms_queue older
+                  WHERE older.from_phone = q.from_phone AND older.id < q.id
+                    AND older.status IN ('pending', 'processing')
+              )
+            RETURNING message_sid, from_phone, body, attempts, replied_at,
+                      EXTRACT(EPOCH FROM NOW() - received_at) AS waited
+        """, (sms_id,))
+        return await cur.fetchone()
+
+
+async def _submit_next(from_phone: str):
+    """Hand out the phone's oldest pending message once the one before it is finished"""
+    async with _conn.cursor() as cur:
+        await cur.execute("""
+            SELECT id FROM inbound_sms_queue
+            WHERE from_phone = %s AND status = 'pending'
+              AND (next_attempt_at IS NULL OR next_attempt_at <= NOW())
+            ORDER BY id
+            LIMIT 1
+        """, (from_phone,))
+        row = await cur.fetchone()
+    if row:
+        _submit(row['id'])
+
+
+async def _mark_replied(sms_id: int):
+    async with _conn.cursor() as cur:
+        await cur.execute("""
+            UPDATE inbound_sms_queue SET replied_at = NOW() WHERE id = %s
+        """, (sms_id,))
+
+
+async def _retry(sms_id: int, attempts: int, error: str):
+    """Put a failed row back to pending; the recovery loop re-queues it once it is due"""
+    delay = INBOUND_SMS_RETRY_SECONDS * 2 ** (attempts - 1)
+    async with _conn.cursor() as cur:
+        await cur.execute("""
+            UPDATE inbound_sms_queue
+            SET status = 'pending', last_error = %s,
+                next_attempt_at = NOW() + make_interval(secs => %s)
+            WHERE id = %s
+        """, (error, delay, sms_id))
+
+
+async def _finish(sms_id: int, message_sid: str | None, status: str, outcome: str = None, error: str = None):
+    if message_sid:
+        _seen_sids.set_outcome(message_sid, outcome or status)
+
+    async with _conn.cursor() as cur:
+        await cur.execute("""
+            UPDATE inbound_sms_queue
+            SET status = %s, outcome = %s, last_error = %s, processed_at = NOW()
+            WHERE id = %s
+        """, (status, outcome, error, sms_id))
+
+
+async def _process(sms_id: int):
+    row = await _claim(sms_id)
+    if not row:
+        return
+
+    if await _handle(sms_id, row):
+        await _submit_next(row['from_phone'])
+
+
+async def _handle(sms_id: int, row) -> bool:
+    """Run the handler on a claimed row; False if it was put back for a retry"""
+    if row['replied_at']:
+        # Abandoned after its reply went out; handling it again would answer twice
+        print(f"✗ Inbound SMS {sms_id} from {row['from_phone']} was already replied to, not re-run")
+        await _finish(sms_id, row['message_sid'], 'done', outcome='replied')
+        return True
+
+    _queue_latency_ms.append(float(row['waited']) * 1000)
+    started = time.perf_counter()
+    replied = False
+
+    async def on_replied():
+        nonlocal replied
+        replied = True
+        await _mark_replied(sms_id)
+
+    try:
+        outcome = await _handler(row['from_phone'], row['body'], on_replied)
+    except Exception as e:
+        if not replied and row['attempts'] < INBOUND_SMS_MAX_ATTEMPTS:
+            _metrics["retried"] += 1
+            print(f"✗ Inbound SMS {sms_id} from {row['from_phone']} failed (attempt {row['attempts']}), retrying: {e}")
+            await _retry(sms_id, row['attempts'], str(e))
+            return False
+        _metrics["failed"] += 1
+        print(f"✗ Inbound SMS {sms_id} from {row['from_phone']} failed: {e}")
+        await _finish(sms_id, row['message_sid'], 'failed', error=str(e))
+        return True
+    finally:
+        _processing_ms.append((time.perf_counter() - started) * 1000)
+
+    _metrics["processed"] += 1
+    await _finish(sms_id, row['message_sid'], 'done', outcome=outcome)
+    return True
+
+
+async def _worker(queue: asyncio.Queue):
+    while True:
+        sms_id = await queue.get()
+        try:
+            await _process(sms_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"✗ Inbound SMS worker error on {sms_id}: {e}")
+        finally:
+            queue.task_done()
+
+
+async def _recover():
+    """Re-queue rows nobody is working on (never dispatched, due for a retry, or stuck processing); purge old finished rows"""
+    async with _conn.cursor() as cur:
+        await cur.execute("""
+            DELETE FROM inbound_sms_queue
+            WHERE status IN ('done', 'failed')
+              AND processed_at < NOW() - make_interval(days => %s)
+        """, (INBOUND_SMS_RETENTION_DAYS,))
+        await cur.execute("""
+            UPDATE inbound_sms_queue
+            SET status = 'pending'
+            WHERE status = 'processing'
+              AND started_at < NOW() - make_interval(secs => %s)
+        """, (INBOUND_SMS_STALE_SECONDS,))
+        # Only each phone's oldest unfinished row can be claimed
+        await cur.execute("""
+            SELECT id FROM (
+                SELECT DISTINCT ON (from_phone) id, status, next_attempt_at, received_at
+                FROM inbound_sms_queue
+                WHERE status IN ('pending', 'processing')
+                ORDER BY from_phone, id
+            ) oldest
+            WHERE status = 'pending'
+              AND COALESCE(next_attempt_at, received_at + make_interval(secs => %s)) <= NOW()
+            ORDER BY id
+        """, (INBOUND_SMS_RECOVERY_SECONDS,))
+        rows = await cur.fetchall()
+
+    for row in rows:
+        _submit(row['id'])
+    if rows:
+        _metrics["recovered"] += len(rows)
+        print(f"✓ Re-queued {len(rows)} pending inbound SMS")
+
+
+async def _recovery_loop():
+    while True:
+        try:
+            await _recover()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"✗ Inbound SMS recovery error: {e}")
+        await asyncio.sleep(INBOUND_SMS_RECOVERY_SECONDS)
+
+
+def start_inbound_sms_workers(conn: AsyncConnection, handler, workers: int = INBOUND_SMS_WORKERS):
+    """
+    Start the worker pool and recovery loop
+    Call this once at app startup (from lifespan in scheduling_api.py)
+
+    Args:
+        conn: Database connection
+        handler: async (from_phone, body, on_replied) -> outcome str; it awaits
+                 on_replied() once its reply SMS is delivered. Raising retries the
+                 message, unless it was already replied to
+        workers: Number of workers (a phone's messages still run one at a time)
+    """
+    global _conn, _handler, _queue
+
+    _conn = conn
+    _handler = handler
+    _queue = asyncio.Queue()
+    _tasks[:] = [asyncio.create_task(_worker(_queue)) for _ in range(max(workers, 1))]
+    _tasks.append(asyncio.create_task(_recovery_loop()))
+    print(f"✓ Inbound SMS queue started ({len(_tasks) - 1} workers)")
+
+
+async def stop_inbound_sms_workers():
+    """Cancel the workers on shutdown (unfinished rows are picked up on restart)"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    print("✓ Inbound SMS queue stopped")
+
+
+def _summary(samples: deque) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {"avg_ms": 0.0, "p95_ms": 0.0}
+    return {
+        "avg_ms": round(sum(ordered) / len(ordered), 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+    }
+
+
+def inbound_sms_metrics() -> dict:
+    """Queue depth, queue latency and processing time for the metrics endpoint"""
+    return {
+        **_metrics,
+        "queue_depth": _queue.qsize() if _queue is not None else 0,
+        "workers": max(len(_tasks) - 1, 0),
+        "message_sids_tracked": len(_seen_sids),
+        "queue_latency": _summary(_queue_latency_ms),
+        "processing_time": _summary(_processing_ms),
+    }
@@ -0,0 +1,73 @@
+"""In-memory index of recently seen Twilio MessageSids
+
+Twilio retries a webhook it didn't get a timely 200 for, with the same
+MessageSid. The inbound SMS queue checks this index first so a retry is
+dropped in O(1) without touching the database, and the outcome of the
+original message is returned instead.
+
+Entries are compact (the 32 hex digits of the SID packed into 16 bytes) and
+expire after MESSAGE_SID_TTL_SECONDS. Because every entry has the same TTL,
+insertion order is expiry order and expired entries are trimmed from the
+front. The UNIQUE index on inbound_sms_queue.message_sid backs this up
+across restarts and app processes.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MESSAGE_SID_TTL_SECONDS = float(os.getenv("MESSAGE_SID_TTL_SECONDS", "86400"))
+MESSAGE_SID_MAX_ENTRIES = int(os.getenv("MESSAGE_SID_MAX_ENTRIES", "100000"))
+
+
+def _key(message_sid: str) -> bytes:
+    """SMxxxxxxxx... (34 chars) -> 16 bytes; anything else is kept as-is"""
+    if len(message_sid) == 34:
+        try:
+            return bytes.fromhex(message_sid[2:])
+        except ValueError:
+            pass
+    return message_sid.encode()
+
+
+class MessageSidIndex:
+    """MessageSid -> (queue row id, outcome) for the last ttl seconds"""
+
+    def __init__(self, ttl: float = MESSAGE_SID_TTL_SECONDS, max_entries: int = MESSAGE_SID_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expires_at, sms_id, outcome); oldest first
+        self._entries: OrderedDict = OrderedDict()
+
+    def _trim(self):
+        now = time.monotonic()
+        while self._entries:
+            key, (expires_at, _, _) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_entries:
+                break
+            del self._entries[key]
+
+    def get(self, message_sid: str) -> tuple | None:
+        """(sms_id, outcome) if this SID was seen recently; outcome is None while processing"""
+        self._trim()
+        entry = self._entries.get(_key(message_sid))
+        return entry[1:] if entry is not None else None
+
+    def add(self, message_sid: str, sms_id: int, outcome: str = None):
+        key = _key(message_sid)
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl, sms_id, outcome)
+        self._trim()
+
+    def set_outcome(self, message_sid: str, outcome: str):
+        """Record the result of a processed message (keeps its original expiry)"""
+        key = _key(message_sid)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries[key] = (entry[0], entry[1], outcome)
+
+    def __len__(self) -> int:
+        return len(self._entries)
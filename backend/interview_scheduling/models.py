@@ -18,6 +18,7 @@ class SchedulingRequest(BaseModel):
     interview_type: str = Field(..., min_length=1, max_length=50)     
     meeting_link: str = Field(default="", max_length=500)             
     slots: Dict[str, List[str]] = Field(..., description="Available interview slots by date")
+    slot_capacity: Optional[int] = Field(default=None, ge=1, description="Applicants per slot (default SLOT_CAPACITY)")
     
     @validator('applicant_phone')
     def validate_phone(cls, v):
@@ -68,6 +69,41 @@ class SchedulingStatusResponse(BaseModel):
     updated_at: datetime
 
 
+class BulkSchedulingRequest(BaseModel):
+    """Request model for initiating scheduling for many applicants at once"""
+    items: List[dict] = Field(..., min_length=1, description="SchedulingRequest payloads, validated one by one")
+
+
+class BulkSchedulingItem(BaseModel):
+    """Outcome of one item in a bulk scheduling request"""
+    index: int
+    status: str  # queued, invalid, no_slots
+    session_id: Optional[str] = None
+    error: Optional[str] = None
+    sms_status: Optional[str] = None  # queued, sending, retrying, delivered, failed
+    session_status: Optional[str] = None
+
+
+class BulkSchedulingResponse(BaseModel):
+    """Response model for bulk scheduling initiation"""
+    batch_id: str
+    accepted: int
+    rejected: int
+    items: List[BulkSchedulingItem]
+
+
+class BulkSchedulingStatusResponse(BaseModel):
+    """Progress of a bulk scheduling batch"""
+    batch_id: str
+    total: int
+    accepted: int
+    sms: Dict[str, int]
+    sessions: Dict[str, int]
+    done: bool
+    created_at: datetime
+    items: List[BulkSchedulingItem]
+
+
 class LLMAnalysis(BaseModel):
     """Analysis portion of LLM response"""
     intent: str
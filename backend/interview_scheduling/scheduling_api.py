@@ -1,6 +1,14 @@
-"""FastAPI application for interview scheduling system"""
+"""FastAPI application for interview scheduling system
+
+Runs from interview_scheduling/ with backend/ on PYTHONPATH, since it shares
+http_client and notification_dispatcher with the main app:
+
+    cd backend/interview_scheduling
+    PYTHONPATH=.. python scheduling_api.py
+"""
 
 import os
+import asyncio
 from fastapi import FastAPI, HTTPException, Request, Form, Header
 from fastapi.responses import Response, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,7 +20,10 @@ from dotenv import load_dotenv
 from models import (
     SchedulingRequest,
     SchedulingResponse,
-    SchedulingStatusResponse
+    SchedulingStatusResponse,
+    BulkSchedulingRequest,
+    BulkSchedulingResponse,
+    BulkSchedulingStatusResponse
 )
 from scheduling_service import (
     create_scheduling_session,
@@ -27,6 +38,30 @@ from twilio_service import (
     send_error_message
 )
 from scheduling_prompts import format_slots_for_display
+from inbound_sms_queue import (
+    setup_inbound_sms_table,
+    enqueue_inbound_sms,
+    start_inbound_sms_workers,
+    stop_inbound_sms_workers,
+    inbound_sms_metrics
+)
+from slot_matcher import slot_matcher_metrics
+from bulk_scheduling import (
+    BULK_SCHEDULING_MAX_ITEMS,
+    initiate_bulk_scheduling,
+    get_bulk_progress,
+    bulk_scheduling_metrics
+)
+from slot_inventory import (
+    setup_slot_inventory_tables,
+    register_slots,
+    open_slots,
+    store_key,
+    run_hold_expiry,
+    slot_inventory_metrics
+)
+from http_client import close_clients
+from notification_dispatcher import stop_dispatcher, dispatcher_metrics
 
 load_dotenv()
 
@@ -55,11 +90,24 @@ async def lifespan(app: FastAPI):
     )
     
     print("✓ Database connection established")
+
+    # Inbound SMS are acknowledged by the webhook and processed here
+    await setup_inbound_sms_table(db_conn)
+    start_inbound_sms_workers(db_conn, process_inbound_sms)
+
+    # Shared slot inventory; expired holds are released in the background
+    await setup_slot_inventory_tables(db_conn)
+    hold_expiry_task = asyncio.create_task(run_hold_expiry(db_conn))
     
     yield
     
     # Cleanup
+    hold_expiry_task.cancel()
+    await asyncio.gather(hold_expiry_task, return_exceptions=True)
+    await stop_inbound_sms_workers()
+    await stop_dispatcher()
     await db_conn.close()
+    await close_clients()
     print("✓ Database connection closed")
 
 
@@ -103,9 +151,10 @@ async def initiate_scheduling(
     
     This endpoint:
     1. Validates the request
-    2. Creates a scheduling session in database
-    3. Sends initial SMS to applicant with available slots
-    4. Returns session ID for tracking
+    2. Adds the slots to the store's shared inventory
+    3. Creates a scheduling session in database
+    4. Sends initial SMS to applicant with the slots that are still open
+    5. Returns session ID for tracking
     
     Args:
         request: SchedulingRequest with applicant details and slots
@@ -119,6 +168,17 @@ async def initiate_scheduling(
         raise HTTPException(status_code=403, detail="Invalid API key")
     
     try:
+        # Slots are shared by every applicant for the same store
+        store = store_key(request.company_name, request.location)
+        await register_slots(db_conn, store, request.slots, request.slot_capacity)
+        live_slots = await open_slots(db_conn, store, request.slots)
+        
+        if not live_slots:
+            raise HTTPException(
+                status_code=409,
+                detail="All of the provided slots are already booked"
+            )
+        
         # Create session in database
         session_id = await create_scheduling_session(
             conn=db_conn,
@@ -135,10 +195,10 @@ async def initiate_scheduling(
         )
         
         # Format slots for SMS
-        slots_formatted = format_slots_for_display(request.slots)
+        slots_formatted = format_slots_for_display(live_slots)
         
         # Send initial SMS
-        sms_sent = send_initial_scheduling_sms(
+        sms_sent = await send_initial_scheduling_sms(
             phone=request.applicant_phone,
             name=request.applicant_name,
             company=request.company_name,
@@ -157,6 +217,8 @@ async def initiate_scheduling(
             message=f"Interview scheduling initiated for {request.applicant_name}"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"✗ Error initiating scheduling: {e}")
         raise HTTPException(
@@ -165,11 +227,81 @@ async def initiate_scheduling(
         )
 
 
+@app.post("/api/schedule-interviews/bulk", response_model=BulkSchedulingResponse)
+async def initiate_bulk(
+    request: BulkSchedulingRequest,
+    x_api_key: str = Header(..., alias="X-API-Key")
+):
+    """
+    Initiate interview scheduling for many applicants at once
+    
+    This endpoint:
+    1. Validates every item (invalid items are reported, not fatal)
+    2. Creates all sessions with a single COPY
+    3. Queues the initial SMS on the rate-limited notification dispatcher
+    4. Returns a batch ID and per-item session IDs right away
+    
+    Poll /api/schedule-interviews/bulk/{batch_id} for SMS delivery and
+    session progress.
+    
+    Args:
+        request: BulkSchedulingRequest with SchedulingRequest items
+        x_api_key: API key for authentication
+        
+    Returns:
+        BulkSchedulingResponse with batch_id and per-item results
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+    
+    if len(request.items) > BULK_SCHEDULING_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BULK_SCHEDULING_MAX_ITEMS} items per batch"
+        )
+    
+    try:
+        return await initiate_bulk_scheduling(db_conn, request.items)
+        
+    except Exception as e:
+        print(f"✗ Error initiating bulk scheduling: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to initiate bulk scheduling: {str(e)}"
+        )
+
+
+@app.get("/api/schedule-interviews/bulk/{batch_id}", response_model=BulkSchedulingStatusResponse)
+async def get_bulk_status(
+    batch_id: str,
+    x_api_key: str = Header(..., alias="X-API-Key")
+):
+    """
+    Progress of a bulk scheduling batch
+    
+    Args:
+        batch_id: Batch ID from /api/schedule-interviews/bulk
+        x_api_key: API key for authentication
+        
+    Returns:
+        BulkSchedulingStatusResponse with SMS and session status counts
+    """
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+    
+    progress = await get_bulk_progress(db_conn, batch_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    return progress
+
+
 @app.post("/twilio/scheduling-webhook")
 async def handle_incoming_sms(
     request: Request,
     From: str = Form(...),
     Body: str = Form(...),
+    MessageSid: str = Form(None),
     x_twilio_signature: str = Header(None, alias="X-Twilio-Signature")
 ):
     """
@@ -177,15 +309,18 @@ async def handle_incoming_sms(
     
     This endpoint:
     1. Validates the request is from Twilio
-    2. Looks up the scheduling session by phone number
-    3. Processes the message with LLM
-    4. Sends appropriate response via SMS
-    5. Updates database with conversation and status
+    2. Stores the message in the inbound SMS queue (retries with an
+       already-seen MessageSid are dropped)
+    3. Returns 200 right away (Twilio times out slow webhooks)
+    
+    The session lookup, LLM call and reply happen on the queue workers
+    (process_inbound_sms).
     
     Args:
         request: FastAPI request object
         From: Sender phone number (from Twilio)
         Body: Message content (from Twilio)
+        MessageSid: Twilio message ID
         x_twilio_signature: Twilio signature for validation
         
     Returns:
@@ -207,40 +342,12 @@ async def handle_incoming_sms(
             print("✗ Invalid Twilio signature")
             raise HTTPException(status_code=403, detail="Invalid signature")
         
-        # Extract data
-        from_phone = From
-        message_body = Body.strip()
-        
-        print(f"\n{'='*60}")
-        print(f"INCOMING SMS")
-        print(f"From: {from_phone}")
-        print(f"Message: {message_body}")
-        print(f"{'='*60}\n")
-        
-        # Look up session by phone number
-        session_data = await get_session_by_phone(db_conn, from_phone)
-        
-        if not session_data:
-            print(f"✗ No session found for phone: {from_phone}")
-            # Send error message
-            send_error_message(from_phone)
-            return Response(status_code=200)
-        
-        # Check if session is already completed
-        if session_data.status == "confirmed":
-            print(f"Session {session_data.session_id} already confirmed")
-            return Response(status_code=200)
-        
-        # Process the message
-        success = await handle_scheduling_response(
-            conn=db_conn,
-            session_data=session_data,
-            applicant_message=message_body
-        )
-        
-        if not success:
-            print(f"✗ Failed to process message")
-            send_error_message(from_phone)
+        queued = await enqueue_inbound_sms(From, Body.strip(), MessageSid)
+        if queued["duplicate"]:
+            # Twilio retry: already stored, don't process (or reply) again
+            print(f"Duplicate inbound SMS {MessageSid} from {From} (outcome: {queued['outcome']})")
+        else:
+            print(f"✓ Queued inbound SMS {queued['id']} from {From}")
         
         return Response(status_code=200)
         
@@ -253,6 +360,73 @@ async def handle_incoming_sms(
         return Response(status_code=500)
 
 
+async def process_inbound_sms(from_phone: str, message_body: str, on_replied) -> str:
+    """
+    Process one queued inbound SMS (runs on an inbound SMS queue worker)
+    
+    Args:
+        from_phone: Sender phone number
+        message_body: Message content
+        on_replied: Marks the queue row replied once the reply SMS is delivered
+        
+    Returns:
+        str: Outcome recorded on the queue row
+        
+    Raises:
+        Exception: Failures after the reply SMS went out propagate, so the
+                   queue records them without a retry or an error SMS
+    """
+    print(f"\n{'='*60}")
+    print(f"INCOMING SMS")
+    print(f"From: {from_phone}")
+    print(f"Message: {message_body}")
+    print(f"{'='*60}\n")
+    
+    # Look up session by phone number
+    session_data = await get_session_by_phone(db_conn, from_phone)
+    
+    if not session_data:
+        print(f"✗ No session found for phone: {from_phone}")
+        # Send error message
+        send_error_message(from_phone)
+        return "session_not_found"
+    
+    # Check if session is already completed
+    if session_data.status == "confirmed":
+        print(f"Session {session_data.session_id} already confirmed")
+        return "already_confirmed"
+    
+    # Process the message
+    success = await handle_scheduling_response(
+        conn=db_conn,
+        session_data=session_data,
+        applicant_message=message_body,
+        on_replied=on_replied
+    )
+    
+    if not success:
+        print(f"✗ Failed to process message")
+        send_error_message(from_phone)
+        return "error"
+    
+    return "handled"
+
+
+@app.get("/api/metrics")
+async def get_metrics(x_api_key: str = Header(..., alias="X-API-Key")):
+    """Inbound SMS queue, slot matcher, slot inventory, bulk scheduling and outbound notification counters"""
+    if x_api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+    
+    return {
+        "inbound_sms": inbound_sms_metrics(),
+        "slot_matcher": slot_matcher_metrics(),
+        "slot_inventory": slot_inventory_metrics(),
+        "bulk_scheduling": bulk_scheduling_metrics(),
+        "notifications": dispatcher_metrics()
+    }
+
+
 @app.get("/api/scheduling-status/{session_id}", response_model=SchedulingStatusResponse)
 async def get_scheduling_status(
     session_id: str,
@@ -12,9 +12,15 @@ from langchain.schema import HumanMessage
 from scheduling_prompts import SCHEDULING_SYSTEM_PROMPT, format_slots_for_display
 from models import LLMResponse, SessionData
 from twilio_service import send_initial_scheduling_sms, send_confirmation_sms, send_sms
+from slot_matcher import match_reply, resolve_slot
+from slot_inventory import get_live_slots, reserve_slot, confirm_slot, release_slot
 from xano_integration import submit_with_retry, notify_custom_availability_request
 
 
+class ReplyNotSentError(Exception):
+    """The reply SMS was not delivered; raised so the inbound SMS is retried"""
+
+
 # Initialize LLM
 llm = ChatOpenAI(
     model="gpt-4o-mini",
@@ -85,6 +91,48 @@ async def create_scheduling_session(
     return result['session_id']
 
 
+async def create_scheduling_sessions(conn: AsyncConnection, requests: List[dict]) -> List[str]:
+    """
+    Create many scheduling sessions with a single COPY (bulk initiation)
+    
+    Args:
+        conn: Database connection
+        requests: Validated SchedulingRequest dicts; "slots" is stored as
+                  available_slots
+        
+    Returns:
+        list: Session IDs, in the same order as requests
+    """
+    session_ids = [f"sched_{uuid.uuid4().hex[:12]}" for _ in requests]
+    
+    async with conn.cursor() as cur:
+        async with cur.copy("""
+            COPY interview_scheduling_sessions
+            (session_id, applicant_name, applicant_phone, company_name, position,
+            job_id, candidate_id, location, interview_type, meeting_link,
+            available_slots, status)
+            FROM STDIN
+        """) as copy:
+            for session_id, request in zip(session_ids, requests):
+                await copy.write_row((
+                    session_id,
+                    request['applicant_name'],
+                    request['applicant_phone'],
+                    request['company_name'],
+                    request['position'],
+                    request['job_id'],
+                    request['candidate_id'],
+                    request['location'],
+                    request['interview_type'],
+                    request['meeting_link'],
+                    json.dumps(request['slots']),
+                    'pending'
+                ))
+    
+    print(f"✓ Created {len(session_ids)} scheduling sessions")
+    return session_ids
+
+
 async def get_session_by_phone(conn: AsyncConnection, phone: str) -> Optional[SessionData]:
     """
     Retrieve session by phone number
@@ -235,7 +283,7 @@ async def update_session_status(
     print(f"✓ Updated session {session_id}: status={status}, date={selected_date}, time={selected_time}")
 
 
-def process_with_llm(
+async def process_with_llm(
     applicant_name: str,
     company_name: str,
     position: str,
@@ -289,7 +337,7 @@ def process_with_llm(
     
     try:
         # Call LLM
-        response = llm.invoke([HumanMessage(content=prompt)])
+        response = await llm.ainvoke([HumanMessage(content=prompt)])
         response_text = response.content.strip()
         
         print(f"\n{'='*60}")
@@ -343,10 +391,75 @@ def process_with_llm(
         )
 
 
+def _slot_unavailable_response(live_slots: dict) -> LLMResponse:
+    """Reply when the chosen slot was taken (or isn't one we offered)"""
+    analysis = {
+        "intent": "slot_selected",
+        "selected_date": None,
+        "selected_time": None,
+        "is_valid_selection": False,
+        "confidence": "high",
+        "requires_confirmation": False
+    }
+
+    if not live_slots:
+        return LLMResponse(
+            analysis=analysis,
+            response_message="Sorry, all of our interview times have just been filled. We'll reach out with new times as soon as possible.",
+            action="mark_custom_request",
+            session_status="custom_request"
+        )
+
+    return LLMResponse(
+        analysis=analysis,
+        response_message=f"Sorry, that time is no longer available. These times are still open:\n\n{format_slots_for_display(live_slots)}\n\nWhich works for you?",
+        action="continue_conversation",
+        session_status="pending"
+    )
+
+
+async def claim_selected_slot(
+    conn: AsyncConnection,
+    session_data: SessionData,
+    llm_response: LLMResponse,
+    live_slots: dict
+) -> LLMResponse:
+    """
+    Hold (wait_for_confirmation) or book (finalize) the slot a response selects
+    
+    Args:
+        conn: Database connection
+        session_data: Current session data
+        llm_response: Response selecting or confirming a slot
+        live_slots: Slots that were open when the reply was processed
+        
+    Returns:
+        LLMResponse: The response with canonical slot labels, or a
+                     "no longer available" response if the slot is gone
+    """
+    analysis = llm_response.analysis
+    slot = resolve_slot(session_data, analysis.selected_date, analysis.selected_time)
+    
+    if slot is not None:
+        claim = reserve_slot if llm_response.action == "wait_for_confirmation" else confirm_slot
+        if await claim(conn, session_data, slot.date_label, slot.time_label):
+            analysis.selected_date = slot.date_label
+            analysis.selected_time = slot.time_label
+            return llm_response
+        
+        print(f"✗ Slot taken for {session_data.session_id}: {slot.date_label} {slot.time_label}")
+        live_slots = await get_live_slots(conn, session_data)
+    else:
+        print(f"✗ Selected slot not offered for {session_data.session_id}: {analysis.selected_date} {analysis.selected_time}")
+    
+    return _slot_unavailable_response(live_slots)
+
+
 async def handle_scheduling_response(
     conn: AsyncConnection,
     session_data: SessionData,
-    applicant_message: str
+    applicant_message: str,
+    on_replied=None
 ) -> bool:
     """
     Handle incoming message from applicant
@@ -355,33 +468,55 @@ async def handle_scheduling_response(
         conn: Database connection
         session_data: Current session data
         applicant_message: Message from applicant
+        on_replied: async () -> None, awaited once the reply SMS is delivered
         
     Returns:
         bool: True if processed successfully
+        
+    Raises:
+        ReplyNotSentError: The reply SMS failed; nothing was recorded, so the
+                           message can be handled again
+        Exception: Anything failing after the reply went out is re-raised
+                   instead of returning False, so no error SMS follows it
     """
+    replied = False
     try:
-        # Add applicant message to conversation history
+        # Only offer slots other applicants haven't taken
+        live_slots = await get_live_slots(conn, session_data)
+        
+        # Plain slot picks and "yes" are resolved locally; everything else goes to the LLM
+        llm_response = match_reply(session_data, applicant_message, live_slots)
+        if llm_response is None:
+            llm_response = await process_with_llm(
+                applicant_name=session_data.applicant_name,
+                company_name=session_data.company_name,
+                position=session_data.position,
+                available_slots=live_slots,
+                conversation_history=session_data.conversation_history,
+                latest_message=applicant_message
+            )
+        else:
+            print(f"✓ Matched reply without LLM: {llm_response.action} "
+                  f"({llm_response.analysis.selected_date} / {llm_response.analysis.selected_time})")
+        
+        # Reserve the slot before promising it to the applicant
+        if llm_response.action in ("wait_for_confirmation", "finalize"):
+            llm_response = await claim_selected_slot(conn, session_data, llm_response, live_slots)
+        
+        # Send SMS reply and wait for it, so a failed reply isn't counted as handled
+        if not await send_sms(session_data.applicant_phone, llm_response.response_message):
+            raise ReplyNotSentError(f"Reply SMS to {session_data.applicant_phone} was not sent")
+        replied = True
+        if on_replied:
+            await on_replied()
+        
+        # Add the exchange to conversation history
         await update_conversation_history(
             conn,
             session_data.session_id,
             'applicant',
             applicant_message
         )
-        
-        # Process with LLM
-        llm_response = process_with_llm(
-            applicant_name=session_data.applicant_name,
-            company_name=session_data.company_name,
-            position=session_data.position,
-            available_slots=session_data.available_slots,
-            conversation_history=session_data.conversation_history,
-            latest_message=applicant_message
-        )
-        
-        # Send SMS reply
-        send_sms(session_data.applicant_phone, llm_response.response_message)
-        
-        # Add assistant response to conversation history
         await update_conversation_history(
             conn,
             session_data.session_id,
@@ -401,7 +536,7 @@ async def handle_scheduling_response(
             )
             
             # Submit to Xano
-            submit_with_retry(
+            await submit_with_retry(
                 candidate_id=session_data.candidate_id,        
                 job_id=session_data.job_id,                   
                 interview_date=llm_response.analysis.selected_date,
@@ -412,7 +547,8 @@ async def handle_scheduling_response(
             )
             
         elif llm_response.action == "mark_custom_request":
-            # Custom availability requested
+            # Custom availability requested - give back any slot held for them
+            await release_slot(conn, session_data.session_id)
             await update_session_status(
                 conn,
                 session_data.session_id,
@@ -420,7 +556,7 @@ async def handle_scheduling_response(
             )
             
             # Notify Xano
-            # notify_custom_availability_request(
+            # await notify_custom_availability_request(
             #     applicant_name=session_data.applicant_name,
             #     applicant_phone=session_data.applicant_phone,
             #     company_name=session_data.company_name,
@@ -430,15 +566,23 @@ async def handle_scheduling_response(
             # )
             
         else:
-            # Continue conversation - update status
+            # Continue conversation - update status (keeping a proposed slot
+            # so a plain "yes" can be confirmed without the LLM)
             await update_session_status(
                 conn,
                 session_data.session_id,
-                llm_response.session_status
+                llm_response.session_status,
+                llm_response.analysis.selected_date if llm_response.action == "wait_for_confirmation" else None,
+                llm_response.analysis.selected_time if llm_response.action == "wait_for_confirmation" else None
             )
         
         return True
         
+    except ReplyNotSentError:
+        raise
     except Exception as e:
         print(f"✗ Error handling scheduling response: {e}")
+        if replied:
+            # The applicant already has their reply; an error SMS would answer twice
+            raise
         return False
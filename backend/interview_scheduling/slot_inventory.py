@@ -0,0 +1,509 @@
+"""Shared interview slot inventory with atomic reservations
+
+Sessions used to keep private copies of available_slots, so any number of
+applicants for the same store could confirm the same time. Slots now live in
+interview_slot_inventory, one row per (store, date, time) with a capacity:
+
+    reserve  - hold a seat while the applicant is asked to confirm
+               (holds expire after SLOT_HOLD_SECONDS)
+    confirm  - turn the hold into a booking (or book directly if there is none)
+    release  - give a held or confirmed seat back
+
+Picking a different slot moves the session's seat; if the new slot is full
+the seat it already has is kept.
+
+Each operation is one statement: a conditional UPDATE on the slot row
+(reserved + confirmed < capacity) chained to the reservation row. Only that
+slot's row is locked, and no explicit transactions are used, so it is safe
+on the app's shared connection. A CHECK constraint backs the capacity rule
+up, and a partial unique index allows one live seat per session.
+
+Prompts and SMS are built from get_live_slots(), i.e. the session's slots
+that still have room.
+
+    python slot_inventory.py stress [parallel] [capacity]    # needs POSTGRES_CONNECTION_STRING
+"""
+
+import asyncio
+import os
+from psycopg import AsyncConnection
+from psycopg.errors import UniqueViolation
+from dotenv import load_dotenv
+
+from models import SessionData
+
+load_dotenv()
+
+# Seats per slot unless the scheduling request says otherwise
+SLOT_CAPACITY = int(os.getenv("SLOT_CAPACITY", "1"))
+# How long a proposed slot is held for the applicant's "yes"
+SLOT_HOLD_SECONDS = int(os.getenv("SLOT_HOLD_SECONDS", "900"))
+SLOT_EXPIRY_SWEEP_SECONDS = float(os.getenv("SLOT_EXPIRY_SWEEP_SECONDS", "60"))
+
+_metrics = {
+    "reserved": 0,
+    "confirmed": 0,
+    "released": 0,
+    "expired": 0,
+    "full": 0,
+}
+
+
+def store_key(company_name: str, location: str) -> str:
+    """Inventory scope: sessions for the same company and location share slots"""
+    return f"{company_name.strip().lower()}|{(location or '').strip().lower()}"
+
+
+async def setup_slot_inventory_tables(conn: AsyncConnection):
+    """
+    Create the slot inventory and reservation tables if they don't exist
+    Call this once at app startup (from lifespan in scheduling_api.py)
+    """
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            CREATE TABLE IF NOT EXISTS interview_slot_inventory (
+                id          BIGSERIAL    PRIMARY KEY,
+                store_key   VARCHAR(512) NOT NULL,
+                slot_date   VARCHAR(100) NOT NULL,
+                slot_time   VARCHAR(50)  NOT NULL,
+                capacity    INTEGER      NOT NULL DEFAULT 1,
+                reserved    INTEGER      NOT NULL DEFAULT 0,
+                confirmed   INTEGER      NOT NULL DEFAULT 0,
+                created_at  TIMESTAMPTZ  NOT NULL DEFAULT NOW(),
+                UNIQUE (store_key, slot_date, slot_time),
+                CHECK (reserved >= 0 AND confirmed >= 0 AND reserved + confirmed <= capacity)
+            )
+        """)
+        await cur.execute("""
+            CREATE TABLE IF NOT EXISTS interview_slot_reservations (
+                id          BIGSERIAL    PRIMARY KEY,
+                session_id  VARCHAR(100) NOT NULL,
+                slot_id     BIGINT       NOT NULL REFERENCES interview_slot_inventory(id),
+                status      VARCHAR(20)  NOT NULL,
+                expires_at  TIMESTAMPTZ,
+                created_at  TIMESTAMPTZ  NOT NULL DEFAULT NOW()
+            )
+        """)
+        await cur.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_slot_reservations_live
+                ON interview_slot_reservations(session_id) WHERE status IN ('held', 'confirmed')
+        """)
+        await cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_slot_reservations_expiry
+                ON interview_slot_reservations(expires_at) WHERE status = 'held'
+        """)
+    print("✓ Slot inventory tables ready")
+
+
+async def register_slots(conn: AsyncConnection, store: str, slots: dict, capacity: int = None):
+    """
+    Add offered slots to the inventory (existing counts are kept, capacity
+    can only be raised)
+
+    Args:
+        conn: Database connection
+        store: store_key() of the company and location
+        slots: {"Tuesday, January 28, 2025": ["2:00 PM - 3:00 PM", ...], ...}
+        capacity: Seats per slot (default SLOT_CAPACITY)
+    """
+    rows = [
+        (store, date, time, capacity or SLOT_CAPACITY)
+        for date, times in slots.items()
+        for time in times
+    ]
+    async with conn.cursor() as cur:
+        await cur.executemany("""
+            INSERT INTO interview_slot_inventory (store_key, slot_date, slot_time, capacity)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (store_key, slot_date, slot_time)
+            DO UPDATE SET capacity = GREATEST(interview_slot_inventory.capacity, EXCLUDED.capacity)
+        """, rows)
+
+
+async def open_slots(conn: AsyncConnection, store: str, slots: dict, session_id: str = None) -> dict:
+    """
+    The subset of slots that still have room (or where session_id holds a seat)
+
+    Slots missing from the inventory (sessions created before it existed)
+    count as open; they are added on first reserve/confirm. Order follows
+    the slots dict.
+
+    Args:
+        conn: Database connection
+        store: store_key() of the company and location
+        slots: {"Tuesday, January 28, 2025": ["2:00 PM - 3:00 PM", ...], ...}
+        session_id: Session whose own seat counts as open (optional)
+    """
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            SELECT i.slot_date, i.slot_time
+            FROM interview_slot_inventory i
+            WHERE i.store_key = %s
+              AND i.reserved + i.confirmed >= i.capacity
+              AND NOT EXISTS (
+                  SELECT 1 FROM interview_slot_reservations r
+                  WHERE r.slot_id = i.id AND r.session_id = %s
+                    AND r.status IN ('held', 'confirmed')
+              )
+        """, (store, session_id))
+        full = {(row['slot_date'], row['slot_time']) for row in await cur.fetchall()}
+
+    live = {}
+    for date, times in slots.items():
+        open_times = [time for time in times if (date, time) not in full]
+        if open_times:
+            live[date] = open_times
+    return live
+
+
+async def get_live_slots(conn: AsyncConnection, session_data: SessionData) -> dict:
+    """The session's offered slots that still have room (plus the one it holds)"""
+    return await open_slots(
+        conn,
+        store_key(session_data.company_name, session_data.location),
+        session_data.available_slots,
+        session_data.session_id,
+    )
+
+
+async def _live_reservation(cur, session_id: str):
+    await cur.execute("""
+        SELECT i.slot_date, i.slot_time, r.status
+        FROM interview_slot_reservations r
+        JOIN interview_slot_inventory i ON i.id = r.slot_id
+        WHERE r.session_id = %s AND r.status IN ('held', 'confirmed')
+    """, (session_id,))
+    return await cur.fetchone()
+
+
+async def _take_seat(cur, session_id: str, store: str, date: str, time: str, status: str) -> bool:
+    """Conditionally take a seat and record it for the session, in one statement"""
+    # Slots offered before the inventory existed are added on demand
+    await cur.execute("""
+        INSERT INTO interview_slot_inventory (store_key, slot_date, slot_time, capacity)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (store_key, slot_date, slot_time) DO NOTHING
+    """, (store, date, time, SLOT_CAPACITY))
+
+    counter = "reserved" if status == "held" else "confirmed"
+    try:
+        await cur.execute(f"""
+            WITH slot AS (
+                UPDATE interview_slot_inventory
+                SET {counter} = {counter} + 1
+                WHERE store_key = %s AND slot_date = %s AND slot_time = %s
+                  AND reserved + confirmed < capacity
+                RETURNING id
+            )
+            INSERT INTO interview_slot_reservations (session_id, slot_id, status, expires_at)
+            SELECT %s, id, %s,
+                   CASE WHEN %s = 'held' THEN NOW() + make_interval(secs => %s) END
+            FROM slot
+            RETURNING id
+        """, (store, date, time, session_id, status, status, SLOT_HOLD_SECONDS))
+    except UniqueViolation:
+        # Same session raced itself; the whole statement (seat included) rolled back
+        return False
+
+    if await cur.fetchone() is None:
+        _metrics["full"] += 1
+        return False
+    return True
+
+
+async def _move_seat(cur, session_id: str, store: str, date: str, time: str, status: str) -> bool:
+    """
+    Move the session's live seat to another slot in one statement: take the
+    new seat, repoint the reservation, free the old seat. Nothing changes if
+    the new slot is full.
+    """
+    await cur.execute("""
+        INSERT INTO interview_slot_inventory (store_key, slot_date, slot_time, capacity)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (store_key, slot_date, slot_time) DO NOTHING
+    """, (store, date, time, SLOT_CAPACITY))
+
+    counter = "reserved" if status == "held" else "confirmed"
+    await cur.execute(f"""
+        WITH slot AS (
+            UPDATE interview_slot_inventory
+            SET {counter} = {counter} + 1
+            WHERE store_key = %s AND slot_date = %s AND slot_time = %s
+              AND reserved + confirmed < capacity
+            RETURNING id
+        ), moved AS (
+            UPDATE interview_slot_reservations r
+            SET slot_id = slot.id, status = %s,
+                expires_at = CASE WHEN %s = 'held' THEN NOW() + make_interval(secs => %s) END
+            FROM slot, interview_slot_reservations old
+            WHERE r.id = old.id
+              AND r.session_id = %s AND r.status IN ('held', 'confirmed')
+            RETURNING old.slot_id, old.status
+        ), freed AS (
+            UPDATE interview_slot_inventory i
+            SET reserved  = i.reserved  - (moved.status = 'held')::int,
+                confirmed = i.confirmed - (moved.status = 'confirmed')::int
+            FROM moved
+            WHERE i.id = moved.slot_id
+            RETURNING i.id
+        )
+        SELECT (SELECT id FROM slot) AS slot_id, (SELECT COUNT(*) FROM moved) AS moved
+    """, (store, date, time, status, status, SLOT_HOLD_SECONDS, session_id))
+    row = await cur.fetchone()
+
+    if row['slot_id'] is None:
+        _metrics["full"] += 1
+        return False
+
+    if row['moved'] == 0:
+        # The old seat expired or was released meanwhile; give this one back and take it normally
+        await cur.execute(f"""
+            UPDATE interview_slot_inventory SET {counter} = {counter} - 1 WHERE id = %s
+        """, (row['slot_id'],))
+        return await _take_seat(cur, session_id, store, date, time, status)
+
+    return True
+
+
+async def reserve_slot(conn: AsyncConnection, session_data: SessionData, date: str, time: str) -> bool:
+    """
+    Hold a seat in a slot for the session (moving any other seat it has)
+
+    Returns:
+        bool: False if the slot is full (the session keeps its current seat)
+    """
+    async with conn.cursor() as cur:
+        current = await _live_reservation(cur, session_data.session_id)
+        if current and (current['slot_date'], current['slot_time']) == (date, time):
+            return True
+
+        store = store_key(session_data.company_name, session_data.location)
+        take = _move_seat if current else _take_seat
+        if not await take(cur, session_data.session_id, store, date, time, "held"):
+            return False
+
+    _metrics["reserved"] += 1
+    return True
+
+
+async def confirm_slot(conn: AsyncConnection, session_data: SessionData, date: str, time: str) -> bool:
+    """
+    Book the slot for the session: converts its hold, or takes a free seat
+    directly if it holds a different slot or its hold has expired
+
+    Returns:
+        bool: False if the slot is full (the session keeps its current seat)
+    """
+    async with conn.cursor() as cur:
+        current = await _live_reservation(cur, session_data.session_id)
+        move = False
+
+        if current and (current['slot_date'], current['slot_time']) == (date, time):
+            if current['status'] == 'confirmed':
+                return True
+
+            await cur.execute("""
+                WITH held AS (
+                    UPDATE interview_slot_reservations
+                    SET status = 'confirmed', expires_at = NULL
+                    WHERE session_id = %s AND status = 'held'
+                    RETURNING slot_id
+                )
+                UPDATE interview_slot_inventory i
+                SET reserved = i.reserved - 1, confirmed = i.confirmed + 1
+                FROM held
+                WHERE i.id = held.slot_id
+                RETURNING i.id
+            """, (session_data.session_id,))
+            if await cur.fetchone() is not None:
+                _metrics["confirmed"] += 1
+                return True
+            # The hold expired between the two statements; book from scratch
+
+        elif current:
+            move = True
+
+        store = store_key(session_data.company_name, session_data.location)
+        take = _move_seat if move else _take_seat
+        if not await take(cur, session_data.session_id, store, date, time, "confirmed"):
+            return False
+
+    _metrics["confirmed"] += 1
+    return True
+
+
+async def release_slot(conn: AsyncConnection, session_id: str) -> bool:
+    """
+    Give back the session's held or confirmed seat
+
+    Returns:
+        bool: True if a seat was released
+    """
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            WITH released AS (
+                UPDATE interview_slot_reservations r
+                SET status = 'released', expires_at = NULL
+                FROM interview_slot_reservations old
+                WHERE r.id = old.id
+                  AND r.session_id = %s AND r.status IN ('held', 'confirmed')
+                RETURNING r.slot_id, old.status
+            )
+            UPDATE interview_slot_inventory i
+            SET reserved  = i.reserved  - (released.status = 'held')::int,
+                confirmed = i.confirmed - (released.status = 'confirmed')::int
+            FROM released
+            WHERE i.id = released.slot_id
+            RETURNING i.id
+        """, (session_id,))
+        row = await cur.fetchone()
+
+    if row:
+        _metrics["released"] += 1
+    return row is not None
+
+
+async def expire_holds(conn: AsyncConnection) -> int:
+    """Release holds past their expiry; returns how many were released"""
+    async with conn.cursor() as cur:
+        await cur.execute("""
+            WITH expired AS (
+                UPDATE interview_slot_reservations
+                SET status = 'expired'
+                WHERE status = 'held' AND expires_at < NOW()
+                RETURNING slot_id
+            ), counts AS (
+                SELECT slot_id, COUNT(*) AS n FROM expired GROUP BY slot_id
+            )
+            UPDATE interview_slot_inventory i
+            SET reserved = i.reserved - counts.n
+            FROM counts
+            WHERE i.id = counts.slot_id
+            RETURNING counts.n
+        """)
+        released = sum(row['n'] for row in await cur.fetchall())
+
+    if released:
+        _metrics["expired"] += released
+        print(f"✓ Released {released} expired slot hold(s)")
+    return released
+
+
+async def run_hold_expiry(conn: AsyncConnection):
+    """Background task: release expired holds (started from lifespan in scheduling_api.py)"""
+    while True:
+        try:
+            await expire_holds(conn)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"✗ Slot hold expiry error: {e}")
+        await asyncio.sleep(SLOT_EXPIRY_SWEEP_SECONDS)
+
+
+def slot_inventory_metrics() -> dict:
+    """Reservation counters for the metrics endpoint"""
+    return dict(_metrics)
+
+
+# ==================== STRESS TEST ====================
+
+async def _stress_test(parallel: int = 300, capacity: int = 3) -> None:
+    """
+    Hammer one slot with parallel reserve + confirm calls over a connection
+    pool (a third of the applicants switch from a hold on another slot) and
+    check that no more than `capacity` applicants get it and that every
+    slot's counters match its live reservations
+    """
+    import time
+    import uuid
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    pool = AsyncConnectionPool(
+        os.getenv("POSTGRES_CONNECTION_STRING"),
+        min_size=10, max_size=20,
+        kwargs={"autocommit": True, "row_factory": dict_row},
+        open=False,
+    )
+    await pool.open()
+
+    store = f"stress test|{uuid.uuid4().hex[:8]}"
+    date, slot_time, other_time = "Tuesday, January 28, 2025", "2:00 PM - 3:00 PM", "4:00 PM - 5:00 PM"
+    slots = {date: [slot_time, other_time]}
+
+    async with pool.connection() as conn:
+        await setup_slot_inventory_tables(conn)
+        await register_slots(conn, store, slots, capacity)
+
+    def session(i: int) -> SessionData:
+        return SessionData(
+            session_id=f"stress_{store}_{i}", applicant_name="Stress", applicant_phone="+15555550100",
+            company_name=store.split("|")[0], location=store.split("|")[1], position="Crew",
+            job_id="job", candidate_id=1, interview_type="Onsite", meeting_link="",
+            available_slots=slots, conversation_history=[], status="pending",
+        )
+
+    async def applicant(i: int) -> str:
+        async with pool.connection() as conn:
+            data = session(i)
+            if i % 3 == 1:
+                await reserve_slot(conn, data, date, other_time)
+            if not await reserve_slot(conn, data, date, slot_time):
+                return "full"
+            # A few change their mind; their seat must go back to the pool
+            if i % 10 == 0:
+                await release_slot(conn, data.session_id)
+                return "released"
+            return "confirmed" if await confirm_slot(conn, data, date, slot_time) else "lost"
+
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*[applicant(i) for i in range(parallel)])
+    elapsed = time.perf_counter() - started
+
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                SELECT reserved, confirmed, capacity FROM interview_slot_inventory
+                WHERE store_key = %s AND slot_date = %s AND slot_time = %s
+            """, (store, date, slot_time))
+            counts = await cur.fetchone()
+            await cur.execute("""
+                SELECT COUNT(*) AS n FROM interview_slot_reservations r
+                JOIN interview_slot_inventory i ON i.id = r.slot_id
+                WHERE i.store_key = %s AND r.status = 'confirmed'
+            """, (store,))
+            booked = (await cur.fetchone())['n']
+            await cur.execute("""
+                SELECT i.slot_time, i.reserved, i.confirmed,
+                       COUNT(r.id) FILTER (WHERE r.status = 'held') AS held,
+                       COUNT(r.id) FILTER (WHERE r.status = 'confirmed') AS booked
+                FROM interview_slot_inventory i
+                LEFT JOIN interview_slot_reservations r ON r.slot_id = i.id
+                WHERE i.store_key = %s
+                GROUP BY i.id
+            """, (store,))
+            drift = [row for row in await cur.fetchall()
+                     if (row['reserved'], row['confirmed']) != (row['held'], row['booked'])]
+            await cur.execute("DELETE FROM interview_slot_reservations WHERE session_id LIKE %s", (f"stress_{store}_%",))
+            await cur.execute("DELETE FROM interview_slot_inventory WHERE store_key = %s", (store,))
+    await pool.close()
+
+    summary = {outcome: outcomes.count(outcome) for outcome in sorted(set(outcomes))}
+    print(f"{parallel} parallel applicants, capacity {capacity}: {summary} in {elapsed * 1000:.0f} ms")
+    print(f"Inventory row: {counts}, confirmed reservations: {booked}")
+
+    assert summary.get("confirmed", 0) == counts['confirmed'] == booked <= capacity, "double-booked"
+    assert summary.get("lost", 0) == 0, "a held seat could not be confirmed"
+    assert counts['reserved'] == 0, "seats leaked"
+    assert not drift, f"counters out of sync with reservations: {drift}"
+    print("✓ No double-booking")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "stress":
+        asyncio.run(_stress_test(*(int(arg) for arg in sys.argv[2:4])))
+    else:
+        print("Usage: python slot_inventory.py stress [parallel] [capacity]")
@@ -0,0 +1,505 @@
+"""Deterministic slot matching for scheduling replies
+
+Most applicant replies name a slot plainly ("Tuesday 2pm", "Jan 29 at 10",
+"the first one") or confirm the slot we just proposed ("Yes"). Those are
+resolved here without an LLM call:
+
+    - the session's available_slots dict is indexed once into Slot entries
+      (parsed date, start time in minutes, display order)
+    - the reply is parsed for weekday / month+day / time / ordinal
+    - if exactly one slot matches, and every other word in the reply is
+      known filler ("I'll take", "please", "works"), it is selected with
+      high confidence
+
+Anything with negation ("can't", "cant", "busy"), questions, relative days,
+words we don't know or more than one candidate returns None and goes to
+process_with_llm as before. A pick of a slot that is
+no longer open (see slot_inventory.py) also goes to the LLM, which only sees
+the live slots. So do ordinals ("the second one") once any offered slot has
+been taken, since the applicant counted along a shorter list than
+available_slots.
+
+    python slot_matcher.py    # fast-path rate and latency on SAMPLE_REPLIES
+"""
+
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional, List
+
+from models import LLMResponse, SessionData
+
+SLOT_INDEX_CACHE_SIZE = 1024
+
+WEEKDAYS = {
+    "mon": 0, "monday": 0,
+    "tue": 1, "tues": 1, "tuesday": 1,
+    "wed": 2, "weds": 2, "wednesday": 2,
+    "thu": 3, "thur": 3, "thurs": 3, "thursday": 3,
+    "fri": 4, "friday": 4,
+    "sat": 5, "saturday": 5,
+    "sun": 6, "sunday": 6,
+}
+
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9,
+    "oct": 10, "october": 10, "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+
+ORDINALS = {
+    "first": 0, "1st": 0, "second": 1, "2nd": 1, "third": 2, "3rd": 2,
+    "fourth": 3, "4th": 3, "fifth": 4, "5th": 4, "sixth": 5, "6th": 5,
+    "last": -1,
+}
+
+AFFIRMATIVE = {
+    "yes", "y", "yeah", "yep", "yup", "ya", "sure", "ok", "okay", "k", "confirm",
+    "confirmed", "correct", "perfect", "great", "sounds good", "that works",
+    "works for me", "yes please", "yes that works", "yes confirm",
+}
+
+# Replies containing any of these need judgement - leave them to the LLM
+DEFER_PATTERN = re.compile(
+    r"\?|n't|\b(?:no|not|none|neither|either|or|but|instead|other|else|another|"
+    r"cant|cannot|dont|doesnt|didnt|wont|wouldnt|isnt|aint|never|nope|nah|"
+    r"busy|unavailable|unable|conflict|except|skip|"
+    r"reschedule|change|earlier|later|before|after|between|around|tomorrow|today|"
+    r"tonight|next|this|morning|afternoon|evening|noon|anytime|any)\b"
+)
+
+# The only words a fast-path pick may contain besides the slot itself;
+# anything else ("busy", "cant", a name, a question) goes to the LLM
+FILLER_WORDS = {
+    "i", "ill", "id", "im", "we", "me", "my", "you", "a", "an", "the", "one", "on",
+    "at", "for", "with", "is", "be", "that", "it", "please", "pls", "plz", "thanks",
+    "thank", "thx", "hi", "hello", "hey", "take", "pick", "choose", "want", "like",
+    "would", "prefer", "go", "lets", "do", "can", "could", "book", "schedule",
+    "works", "work", "good", "great", "fine", "perfect", "ok", "okay", "sure", "yes",
+    "yeah", "yep", "free", "available", "option", "number", "slot", "time", "am",
+    "pm", "oclock", "sounds",
+}
+
+MONTH_DAY_PATTERN = re.compile(r"\b(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?\s+(\d{1,2})(?:st|nd|rd|th)?\b")
+NUMERIC_DATE_PATTERN = re.compile(r"\b(\d{1,2})/(\d{1,2})(?:/\d{2,4})?\b")
+DAY_OF_MONTH_PATTERN = re.compile(r"\b(?:the\s+)?(\d{1,2})(?:st|nd|rd|th)\b")
+TIME_PATTERN = re.compile(r"(?:\b(?:at|@)\s*)?\b(\d{1,2})(?::(\d{2}))?\s*([ap])\.?\s*m?\b\.?|\b(?:at|@)\s*(\d{1,2})(?::(\d{2}))?\b|\b(\d{1,2}):(\d{2})\b")
+OPTION_PATTERN = re.compile(r"\b(?:option|number|no\.|#)\s*(\d{1,2})\b|#(\d{1,2})\b")
+SLOT_TIME_PATTERN = re.compile(r"(\d{1,2})(?::(\d{2}))?\s*([AaPp])\.?[Mm]")
+
+
+class Slot(NamedTuple):
+    """One offered interview slot"""
+    date_label: str          # key from available_slots, e.g. "Tuesday, January 28, 2025"
+    time_label: str          # value from available_slots, e.g. "2:00 PM - 3:00 PM"
+    weekday: Optional[int]
+    month: Optional[int]
+    day: Optional[int]
+    start_minutes: Optional[int]
+    order: int               # position in the SMS listing
+
+
+def _parse_slot_date(label: str) -> tuple:
+    try:
+        parsed = datetime.strptime(label.strip(), "%A, %B %d, %Y")
+        return parsed.weekday(), parsed.month, parsed.day
+    except ValueError:
+        pass
+
+    words = re.findall(r"[a-z]+|\d+", label.lower())
+    weekday = next((WEEKDAYS[w] for w in words if w in WEEKDAYS), None)
+    month = next((MONTHS[w] for w in words if w in MONTHS), None)
+    day = next((int(w) for w in words if w.isdigit() and int(w) <= 31), None)
+    return weekday, month, day
+
+
+def _parse_slot_time(label: str) -> Optional[int]:
+    """Start of the slot in minutes after midnight ("2:00 PM - 3:00 PM" -> 840)"""
+    match = SLOT_TIME_PATTERN.search(label)
+    if not match:
+        return None
+    hour = int(match.group(1)) % 12
+    if match.group(3).lower() == "p":
+        hour += 12
+    return hour * 60 + int(match.group(2) or 0)
+
+
+class SlotIndex:
+    """Parsed, ordered view of a session's available_slots"""
+
+    def __init__(self, available_slots: dict):
+        self.slots: List[Slot] = []
+        for date_label, times in available_slots.items():
+            weekday, month, day = _parse_slot_date(date_label)
+            for time_label in times:
+                self.slots.append(Slot(
+                    date_label, time_label, weekday, month, day,
+                    _parse_slot_time(time_label), len(self.slots),
+                ))
+
+    def candidates(self, weekdays: set, dates: set, times: list) -> List[Slot]:
+        """Slots consistent with every constraint given (empty constraint = any)"""
+        matches = []
+        for slot in self.slots:
+            if weekdays and slot.weekday not in weekdays:
+                continue
+            if dates and (slot.month, slot.day) not in dates and (None, slot.day) not in dates:
+                continue
+            if times and not any(_time_matches(slot.start_minutes, t) for t in times):
+                continue
+            matches.append(slot)
+        return matches
+
+
+def _time_matches(start_minutes: Optional[int], wanted: tuple) -> bool:
+    """wanted = (minutes, has_meridiem); without am/pm, 2:00 matches 2 AM or 2 PM"""
+    if start_minutes is None:
+        return False
+    minutes, has_meridiem = wanted
+    if has_meridiem:
+        return start_minutes == minutes
+    return start_minutes % 720 == minutes % 720
+
+
+# session_id -> SlotIndex, most recently used last
+_indexes: OrderedDict = OrderedDict()
+
+_metrics = {
+    "replies": 0,
+    "fast_path": 0,
+    "selections": 0,
+    "confirmations": 0,
+    "total_us": 0.0,
+}
+
+
+def get_slot_index(session_id: str, available_slots: dict) -> SlotIndex:
+    """Index for a session, built on first use (slots don't change within a session)"""
+    index = _indexes.get(session_id)
+    if index is None:
+        index = SlotIndex(available_slots)
+        _indexes[session_id] = index
+        while len(_indexes) > SLOT_INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    else:
+        _indexes.move_to_end(session_id)
+    return index
+
+
+def _normalize(message: str) -> str:
+    text = message.lower().strip()
+    text = re.sub(r"[!,;]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip(" .")
+
+
+def parse_reply(index: SlotIndex, text: str, allow_ordinals: bool = True) -> List[Slot]:
+    """
+    Slots a normalized reply could refer to
+
+    Args:
+        index: The session's slot index
+        text: Normalized reply
+        allow_ordinals: Resolve "option 2" / "the first one" against the
+                        index order (only valid if that is the order shown)
+
+    Returns:
+        list: Matching slots (exactly one = unambiguous); empty if nothing
+              slot-like was found, nothing matched or the reply says more
+              than a slot pick
+    """
+    # Ordinal / option number ("the first one", "option 2", "#3")
+    option = OPTION_PATTERN.search(text)
+    if option:
+        if not allow_ordinals or not _only_filler(OPTION_PATTERN.sub(" ", text)):
+            return []
+        number = int(option.group(1) or option.group(2))
+        return [index.slots[number - 1]] if 1 <= number <= len(index.slots) else []
+
+    words = set(re.findall(r"[a-z0-9]+", text))
+    ordinals = [ORDINALS[w] for w in words if w in ORDINALS]
+    has_slot_words = bool(words & (WEEKDAYS.keys() | MONTHS.keys())) or bool(re.search(r"\d", text))
+    if ordinals and not has_slot_words:
+        if not allow_ordinals or len(ordinals) != 1 or not index.slots or not _only_filler(text):
+            return []
+        position = ordinals[0]
+        return [index.slots[position]] if position < len(index.slots) else []
+
+    # Dates first, so "jan 28" / "1/28" / "28th" aren't read as times
+    dates = set()
+    for month_word, day in MONTH_DAY_PATTERN.findall(text):
+        dates.add((MONTHS[month_word], int(day)))
+    text = MONTH_DAY_PATTERN.sub(" ", text)
+    for month, day in NUMERIC_DATE_PATTERN.findall(text):
+        dates.add((int(month), int(day)))
+    text = NUMERIC_DATE_PATTERN.sub(" ", text)
+    for day in DAY_OF_MONTH_PATTERN.findall(text):
+        dates.add((None, int(day)))
+    text = DAY_OF_MONTH_PATTERN.sub(" ", text)
+
+    times = []
+    for match in TIME_PATTERN.finditer(text):
+        hour, minute, meridiem, at_hour, at_minute, h24, m24 = match.groups()
+        if hour is not None:
+            value = int(hour) % 12 + (12 if meridiem == "p" else 0)
+            times.append((value * 60 + int(minute or 0), True))
+        elif at_hour is not None:
+            times.append((int(at_hour) * 60 + int(at_minute or 0), False))
+        else:
+            value = int(h24)
+            times.append((value * 60 + int(m24), value >= 13))
+    text = TIME_PATTERN.sub(" ", text)
+
+    weekdays = {WEEKDAYS[w] for w in re.findall(r"[a-z]+", text) if w in WEEKDAYS}
+
+    # "wed 10": a bare hour only counts as a time next to a day
+    if not times and (weekdays or dates):
+        hours = [int(h) for h in re.findall(r"\b(\d{1,2})\b", text) if 1 <= int(h) <= 12]
+        times = [(hour * 60, False) for hour in hours]
+        text = re.sub(r"\b(?:[1-9]|1[0-2])\b", " ", text)
+
+    if not (weekdays or dates or times) or not _only_filler(text):
+        return []
+    return index.candidates(weekdays, dates, times)
+
+
+def _only_filler(text: str) -> bool:
+    """True if nothing but weekdays, ordinals and FILLER_WORDS is left of the reply"""
+    return all(
+        word in FILLER_WORDS or word in WEEKDAYS or word in ORDINALS
+        for word in re.findall(r"[a-z]+|\d+", text.replace("'", ""))
+    )
+
+
+def _selection_response(session_data: SessionData, slot: Slot) -> LLMResponse:
+    return LLMResponse(
+        analysis={
+            "intent": "slot_selected",
+            "selected_date": slot.date_label,
+            "selected_time": slot.time_label,
+            "is_valid_selection": True,
+            "confidence": "high",
+            "requires_confirmation": True
+        },
+        response_message=f"Perfect! I have you scheduled for {slot.date_label} at {slot.time_label}. Reply YES to confirm.",
+        action="wait_for_confirmation",
+        session_status="pending_confirmation"
+    )
+
+
+def _confirmation_response(session_data: SessionData) -> LLMResponse:
+    return LLMResponse(
+        analysis={
+            "intent": "confirmation",
+            "selected_date": session_data.selected_date,
+            "selected_time": session_data.selected_time,
+            "is_valid_selection": True,
+            "confidence": "high",
+            "requires_confirmation": False
+        },
+        response_message=(
+            f"Confirmed! Your interview is scheduled for {session_data.selected_date} at "
+            f"{session_data.selected_time}. We'll call you at {session_data.applicant_phone}. "
+            f"Looking forward to speaking with you!"
+        ),
+        action="finalize",
+        session_status="confirmed"
+    )
+
+
+def resolve_slot(session_data: SessionData, date: Optional[str], time_text: Optional[str]) -> Optional[Slot]:
+    """
+    Map a selected date/time (e.g. from the LLM) to the offered slot
+
+    Exact labels match directly; otherwise the date and start time are
+    compared, so "Tuesday, January 28" / "2:00 PM" still find
+    "Tuesday, January 28, 2025" / "2:00 PM - 3:00 PM".
+
+    Returns:
+        Slot, or None if it doesn't match exactly one offered slot
+    """
+    if not date or not time_text:
+        return None
+
+    index = get_slot_index(session_data.session_id, session_data.available_slots)
+    for slot in index.slots:
+        if slot.date_label == date and slot.time_label == time_text:
+            return slot
+
+    weekday, month, day = _parse_slot_date(date)
+    start_minutes = _parse_slot_time(time_text)
+    if start_minutes is None:
+        return None
+
+    matches = [
+        slot for slot in index.slots
+        if slot.start_minutes == start_minutes
+        and (day is None or slot.day == day)
+        and (month is None or slot.month == month)
+        and (weekday is None or slot.weekday == weekday)
+    ]
+    return matches[0] if len(matches) == 1 else None
+
+
+def match_reply(session_data: SessionData, applicant_message: str, live_slots: dict = None) -> Optional[LLMResponse]:
+    """
+    Resolve an applicant reply without the LLM when it is unambiguous
+
+    Args:
+        session_data: Current session data
+        applicant_message: Message from applicant
+        live_slots: Offered slots that are still open (default: all offered)
+
+    Returns:
+        LLMResponse in the same shape process_with_llm returns, or None
+        if the reply should go to the LLM
+    """
+    started = time.perf_counter()
+    _metrics["replies"] += 1
+    try:
+        response = _match(session_data, applicant_message, live_slots)
+    finally:
+        _metrics["total_us"] += (time.perf_counter() - started) * 1e6
+
+    if response is not None:
+        _metrics["fast_path"] += 1
+        _metrics["confirmations" if response.action == "finalize" else "selections"] += 1
+    return response
+
+
+def _match(session_data: SessionData, applicant_message: str, live_slots: Optional[dict] = None) -> Optional[LLMResponse]:
+    text = _normalize(applicant_message)
+    if not text:
+        return None
+
+    # "Yes" to the slot we proposed last
+    if text in AFFIRMATIVE:
+        if (session_data.status == "pending_confirmation"
+                and session_data.selected_date and session_data.selected_time):
+            return _confirmation_response(session_data)
+        return None
+
+    if DEFER_PATTERN.search(text):
+        return None
+
+    index = get_slot_index(session_data.session_id, session_data.available_slots)
+    # Listings only show live slots; positions match available_slots only while nothing is taken
+    all_live = live_slots is None or sum(map(len, live_slots.values())) == len(index.slots)
+    candidates = parse_reply(index, text, allow_ordinals=all_live)
+    if len(candidates) != 1:
+        return None
+
+    slot = candidates[0]
+    if live_slots is not None and slot.time_label not in live_slots.get(slot.date_label, ()):
+        # Taken since it was offered - let the LLM suggest what's left
+        return None
+    return _selection_response(session_data, slot)
+
+
+def slot_matcher_metrics() -> dict:
+    """Fast-path rate and matching latency for the metrics endpoint"""
+    replies = _metrics["replies"]
+    return {
+        "replies": replies,
+        "fast_path": _metrics["fast_path"],
+        "selections": _metrics["selections"],
+        "confirmations": _metrics["confirmations"],
+        "fast_path_rate": round(_metrics["fast_path"] / replies, 3) if replies else 0.0,
+        "avg_match_us": round(_metrics["total_us"] / replies, 1) if replies else 0.0,
+    }
+
+
+# ==================== BENCHMARK ====================
+
+SAMPLE_SLOTS = {
+    "Tuesday, January 28, 2025": ["9:00 AM - 10:00 AM", "11:00 AM - 12:00 PM", "2:00 PM - 3:00 PM", "4:00 PM - 5:00 PM"],
+    "Wednesday, January 29, 2025": ["10:00 AM - 11:00 AM", "1:00 PM - 2:00 PM", "3:00 PM - 4:00 PM", "5:00 PM - 6:00 PM"],
+}
+
+# (reply, session status) - representative inbound messages
+SAMPLE_REPLIES = [
+    ("Tuesday 2pm", "pending"),
+    ("tues at 2", "pending"),
+    ("Tue 9am", "pending"),
+    ("Wednesday at 1:00 PM", "pending"),
+    ("wed 10", "pending"),
+    ("Wed 3pm", "pending"),
+    ("I'll take Tuesday at 4pm", "pending"),
+    ("Jan 29 at 5pm", "pending"),
+    ("january 28th 11am", "pending"),
+    ("1/28 at 2pm", "pending"),
+    ("the 29th at 1pm", "pending"),
+    ("The first one", "pending"),
+    ("first", "pending"),
+    ("second one please", "pending"),
+    ("last one", "pending"),
+    ("option 3", "pending"),
+    ("#5", "pending"),
+    ("5pm", "pending"),
+    ("11 am works", "pending"),
+    ("3:00", "pending"),
+    ("Yes", "pending_confirmation"),
+    ("YES!", "pending_confirmation"),
+    ("yep", "pending_confirmation"),
+    ("Sounds good", "pending_confirmation"),
+    ("confirm", "pending_confirmation"),
+    ("ok", "pending_confirmation"),
+    ("Tuesday", "pending"),
+    ("2pm", "pending"),
+    ("Tuesday morning", "pending"),
+    ("Can we do Thursday instead?", "pending"),
+    ("None of these work for me", "pending"),
+    ("How long is the interview?", "pending"),
+    ("tomorrow at 2", "pending"),
+    ("Tuesday or Wednesday afternoon", "pending"),
+    ("I work until 5 most days", "pending"),
+    ("Actually can I do Wed at 1 instead", "pending_confirmation"),
+    ("yes", "pending"),
+    ("who will be calling me", "pending"),
+    ("Tue 3pm", "pending"),
+    ("wed 12", "pending"),
+]
+
+
+def _benchmark(rounds: int = 500) -> None:
+    """Print fast-path rate and per-reply latency on SAMPLE_REPLIES"""
+    sessions = {
+        status: SessionData(
+            session_id=f"bench_{status}",
+            applicant_name="Sample Applicant",
+            applicant_phone="+15555550100",
+            company_name="Big Chicken",
+            position="Shift Manager",
+            job_id="job_1",
+            candidate_id=1,
+            location="Main St",
+            interview_type="Onsite",
+            meeting_link="",
+            available_slots=SAMPLE_SLOTS,
+            conversation_history=[],
+            selected_date="Tuesday, January 28, 2025" if status == "pending_confirmation" else None,
+            selected_time="2:00 PM - 3:00 PM" if status == "pending_confirmation" else None,
+            status=status
+        )
+        for status in ("pending", "pending_confirmation")
+    }
+
+    for reply, status in SAMPLE_REPLIES:
+        response = _match(sessions[status], reply)
+        resolved = f"{response.action}: {response.analysis.selected_date} / {response.analysis.selected_time}" if response else "-> LLM"
+        print(f"  {reply!r:45} {resolved}")
+
+    resolved = sum(1 for reply, status in SAMPLE_REPLIES if _match(sessions[status], reply))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for reply, status in SAMPLE_REPLIES:
+            _match(sessions[status], reply)
+    elapsed = time.perf_counter() - start
+
+    print(f"\nFast path: {resolved}/{len(SAMPLE_REPLIES)} replies ({resolved / len(SAMPLE_REPLIES):.0%}) resolved without the LLM")
+    print(f"Latency: {elapsed / (rounds * len(SAMPLE_REPLIES)) * 1e6:.1f} us per reply")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,80 @@
+"""Fast-path reply matching in slot_matcher (no database or LLM needed)"""
+
+import pytest
+
+from models import SessionData
+from slot_matcher import SAMPLE_SLOTS, match_reply
+
+
+def _session(status: str = "pending") -> SessionData:
+    confirming = status == "pending_confirmation"
+    return SessionData(
+        session_id=f"test_{status}",
+        applicant_name="Sample Applicant",
+        applicant_phone="+15555550100",
+        company_name="Big Chicken",
+        position="Shift Manager",
+        job_id="job_1",
+        candidate_id=1,
+        location="Main St",
+        interview_type="Onsite",
+        meeting_link="",
+        available_slots=SAMPLE_SLOTS,
+        conversation_history=[],
+        selected_date="Tuesday, January 28, 2025" if confirming else None,
+        selected_time="2:00 PM - 3:00 PM" if confirming else None,
+        status=status,
+    )
+
+
+@pytest.mark.parametrize("reply, date, time", [
+    ("Tuesday 2pm", "Tuesday, January 28, 2025", "2:00 PM - 3:00 PM"),
+    ("I'll take Tuesday at 4pm", "Tuesday, January 28, 2025", "4:00 PM - 5:00 PM"),
+    ("wed 10 please", "Wednesday, January 29, 2025", "10:00 AM - 11:00 AM"),
+    ("1/28 at 2pm works", "Tuesday, January 28, 2025", "2:00 PM - 3:00 PM"),
+    ("second one please", "Tuesday, January 28, 2025", "11:00 AM - 12:00 PM"),
+    ("option 3", "Tuesday, January 28, 2025", "2:00 PM - 3:00 PM"),
+])
+def test_plain_picks_are_selected(reply, date, time):
+    response = match_reply(_session(), reply)
+
+    assert response.action == "wait_for_confirmation"
+    assert (response.analysis.selected_date, response.analysis.selected_time) == (date, time)
+
+
+@pytest.mark.parametrize("reply", [
+    "i cant do tuesday 2pm",
+    "i can't do tuesday 2pm",
+    "2pm doesnt work",
+    "tuesday 2pm dont work for me",
+    "i wont make tuesday 2pm",
+    "busy tuesday at 2pm",
+    "unavailable tuesday 2pm",
+    "i cannot do wed 10",
+    "tuesday 2pm is not good",
+    "option 3 doesnt work",
+    "the first one is bad",
+    "tuesday 2pm for my brother",
+])
+def test_refusals_and_unknown_words_go_to_the_llm(reply):
+    assert match_reply(_session(), reply) is None
+
+
+def test_yes_confirms_the_proposed_slot():
+    response = match_reply(_session("pending_confirmation"), "yes")
+
+    assert response.action == "finalize"
+    assert response.analysis.selected_time == "2:00 PM - 3:00 PM"
+
+
+def test_ordinals_go_to_the_llm_once_a_slot_is_taken():
+    live = {date: times[1:] for date, times in SAMPLE_SLOTS.items()}
+
+    assert match_reply(_session(), "the first one", live) is None
+    assert match_reply(_session(), "option 2", live) is None
+
+
+def test_taken_slot_goes_to_the_llm():
+    live = {date: [t for t in times if t != "2:00 PM - 3:00 PM"] for date, times in SAMPLE_SLOTS.items()}
+
+    assert match_reply(_session(), "Tuesday 2pm", live) is None
@@ -1,11 +1,18 @@
 """Twilio service for SMS sending and receiving"""
 
+import asyncio
 import os
+import requests
 from twilio.rest import Client
 from twilio.request_validator import RequestValidator
+from twilio.base.exceptions import TwilioRestException
+from urllib3.exceptions import NewConnectionError
 from dotenv import load_dotenv
 from datetime import datetime
 
+# Shared with the main app in backend/ (on PYTHONPATH, see scheduling_api.py)
+from notification_dispatcher import dispatch, DeliveryHandle, PermanentSendError, PRIORITY_TRANSACTIONAL, PRIORITY_BULK
+
 load_dotenv()
 
 # Twilio Configuration
@@ -13,48 +20,85 @@ TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 
+# One client for the process; it keeps its HTTP session (and connections) alive
+_client: Client | None = None
+
+
+def _get_client() -> Client:
+    global _client
+    if _client is None:
+        _client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return _client
+
 
-def send_sms(to_phone: str, message: str) -> bool:
+def _sent_nothing(error: Exception) -> bool:
+    """True only for errors where Twilio certainly did not accept the message"""
+    if isinstance(error, TwilioRestException):
+        # Rate limited or rejected by a Twilio server error: no message was created
+        return error.status == 429 or error.status >= 500
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        # Connection never established (DNS, refused); not a reset mid-request
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+async def _deliver_sms(to_phone: str, message: str) -> bool:
     """
-    Send SMS via Twilio
-    
-    Args:
-        to_phone: Recipient phone number (E.164 format)
-        message: Message text to send
-        
-    Returns:
-        bool: True if sent successfully, False otherwise
+    Send one SMS (the blocking Twilio SDK call runs in a thread)
+
+    Only errors raised before Twilio could have accepted the message are
+    retried by the dispatcher; anything else (read timeouts, resets,
+    unexpected errors) fails the delivery so the SMS is never sent twice.
     """
+    if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_PHONE_NUMBER:
+        raise PermanentSendError("Twilio credentials not configured")
+
     try:
-        if not TWILIO_ACCOUNT_SID or not TWILIO_AUTH_TOKEN or not TWILIO_PHONE_NUMBER:
-            print("ERROR: Twilio credentials not configured")
-            return False
-        
-        # Initialize Twilio client
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        
-        # Send SMS
-        twilio_message = client.messages.create(
+        twilio_message = await asyncio.to_thread(
+            _get_client().messages.create,
             body=message,
             from_=TWILIO_PHONE_NUMBER,
             to=to_phone
         )
-        
-        print(f"SMS sent to {to_phone}: SID {twilio_message.sid}")
-        return twilio_message.sid is not None
-        
     except Exception as e:
-        print
-        print(f"Error sending SMS to {to_phone}: {e}")
-        return False
+        if _sent_nothing(e):
+            raise
+        raise PermanentSendError(f"{e} (not retried, the SMS may have been sent)") from e
+
+    print(f"SMS sent to {to_phone}: SID {twilio_message.sid}")
+    return twilio_message.sid is not None
+
+
+def send_sms(to_phone: str, message: str, priority: int = PRIORITY_TRANSACTIONAL) -> DeliveryHandle:
+    """
+    Queue an SMS via Twilio (rate-limited, retried by the notification dispatcher)
+    
+    Args:
+        to_phone: Recipient phone number (E.164 format)
+        message: Message text to send
+        priority: Dispatcher priority (bulk scheduling SMS go after OTPs)
+        
+    Returns:
+        DeliveryHandle: Await it for True if sent successfully, False otherwise
+    """
+    return dispatch(
+        "twilio",
+        lambda: _deliver_sms(to_phone, message),
+        priority=priority,
+        description=f"SMS to {to_phone}",
+    )
 
 
 def send_initial_scheduling_sms(
     phone: str, 
     name: str, 
     company: str, 
-    slots_formatted: str
-) -> bool:
+    slots_formatted: str,
+    priority: int = PRIORITY_TRANSACTIONAL
+) -> DeliveryHandle:
     """
     Send initial interview scheduling SMS
     
@@ -63,9 +107,11 @@ def send_initial_scheduling_sms(
         name: Applicant name
         company: Company name
         slots_formatted: Pre-formatted slots string
+        priority: PRIORITY_BULK for bulk batches, so a single request that
+                  waits for delivery isn't queued behind them
         
     Returns:
-        bool: True if sent successfully
+        DeliveryHandle: Await it for True if sent successfully
     """
     message = f"""Hi {name}, this is Cleo from {company}. Thanks for completing your screening!
 We'd love to schedule an interview. Here are our available times:
@@ -74,7 +120,7 @@ We'd love to schedule an interview. Here are our available times:
 
 Please reply with your preferred day and time."""
     
-    return send_sms(phone, message)
+    return send_sms(phone, message, priority=priority)
 
 
 def verify_twilio_signature(request_url: str, post_data: dict, signature: str) -> bool:
@@ -108,7 +154,7 @@ def send_confirmation_sms(
     company: str,
     selected_date: str,
     selected_time: str
-) -> bool:
+) -> DeliveryHandle:
     """
     Send final confirmation SMS after interview is scheduled
     
@@ -120,7 +166,7 @@ def send_confirmation_sms(
         selected_time: Confirmed interview time
         
     Returns:
-        bool: True if sent successfully
+        DeliveryHandle: Await it for True if sent successfully
     """
     message = f"""✓ Confirmed! Your interview is scheduled for {selected_date} at {selected_time}.
 
@@ -134,7 +180,7 @@ Looking forward to speaking with you!
     return send_sms(phone, message)
 
 
-def send_custom_request_acknowledgment(phone: str, company: str) -> bool:
+def send_custom_request_acknowledgment(phone: str, company: str) -> DeliveryHandle:
     """
     Send acknowledgment when applicant requests custom time
     
@@ -143,7 +189,7 @@ def send_custom_request_acknowledgment(phone: str, company: str) -> bool:
         company: Company name
         
     Returns:
-        bool: True if sent successfully
+        DeliveryHandle: Await it for True if sent successfully
     """
     message = f"""Got it! I'll check with our {company} team about your availability and get back to you within 24 hours.
 
@@ -152,7 +198,7 @@ Thanks for your patience!"""
     return send_sms(phone, message)
 
 
-def send_error_message(phone: str) -> bool:
+def send_error_message(phone: str) -> DeliveryHandle:
     """
     Send error message when system has trouble processing response
     
@@ -160,7 +206,7 @@ def send_error_message(phone: str) -> bool:
         phone: Applicant phone number
         
     Returns:
-        bool: True if sent successfully
+        DeliveryHandle: Await it for True if sent successfully
     """
     message = """Sorry, I'm having trouble processing your response. Could you please reply with:
 
@@ -1,10 +1,14 @@
 """Xano integration for submitting confirmed interview schedules"""
 
-import requests
+import asyncio
 import os
 from datetime import datetime
+import httpx
 from dotenv import load_dotenv
 
+# Shared with the main app in backend/ (on PYTHONPATH, see scheduling_api.py)
+import http_client
+
 load_dotenv()
 
 # Xano API Configuration
@@ -12,7 +16,7 @@ XANO_API_URL = "https://xoho-w3ng-km3o.n7e.xano.io/api:NuFOC8Bg/PostInterviewfro
 XANO_API_KEY = "sk_test_51QxA9F7C2E8B4D1A6F9C3E7B2A"
 
 
-def submit_interview_to_xano(
+async def submit_interview_to_xano(
     candidate_id: int,        
     job_id: str,             
     interview_date: str,     
@@ -66,11 +70,12 @@ def submit_interview_to_xano(
         print(f"Payload: {payload}")
         
         # Send POST request
-        response = requests.post(
+        response = await http_client.post(
             XANO_API_URL,
             json=payload,
             headers=headers,
-            timeout=10
+            timeout=10,
+            endpoint="xano.PostInterviewfromAI"
         )
         
         if response.status_code in [200, 201]:
@@ -80,10 +85,10 @@ def submit_interview_to_xano(
             print(f"✗ Failed to submit to Xano: {response.status_code} - {response.text}")
             return False
             
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         print(f"✗ Xano API timeout for candidate {candidate_id}")
         return False
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"✗ Error submitting to Xano: {e}")
         return False
     except Exception as e:
@@ -91,7 +96,7 @@ def submit_interview_to_xano(
         return False
 
 
-def submit_with_retry(
+async def submit_with_retry(
     candidate_id: int,       
     job_id: str,            
     interview_date: str,    
@@ -115,12 +120,10 @@ def submit_with_retry(
     Returns:
         bool: True if submitted successfully within retry attempts
     """
-    import time
-    
     for attempt in range(1, max_retries + 1):
         print(f"Xano submission attempt {attempt}/{max_retries}...")
         
-        success = submit_interview_to_xano(
+        success = await submit_interview_to_xano(
             candidate_id=candidate_id,     
             job_id=job_id,                
             interview_date=interview_date,
@@ -137,13 +140,13 @@ def submit_with_retry(
             # Exponential backoff: 2^attempt seconds
             wait_time = 2 ** attempt
             print(f"Retrying in {wait_time} seconds...")
-            time.sleep(wait_time)
+            await asyncio.sleep(wait_time)
     
     print(f"✗ Failed to submit to Xano after {max_retries} attempts")
     return False
 
 
-def notify_custom_availability_request(
+async def notify_custom_availability_request(
     applicant_name: str,
     applicant_phone: str,
     company_name: str,
@@ -186,11 +189,12 @@ def notify_custom_availability_request(
             headers["x-api-key"] = XANO_API_KEY
         
         # Use same endpoint or a different one for custom requests
-        response = requests.post(
+        response = await http_client.post(
             XANO_API_URL,
             json=payload,
             headers=headers,
-            timeout=10
+            timeout=10,
+            endpoint="xano.custom_availability"
         )
         
         if response.status_code in [200, 201]:
@@ -0,0 +1,208 @@
+"""
+In-process Xano job catalog.
+
+The get_all_job_ list is synced into a dict keyed by job id, every
+JOB_CATALOG_SYNC_SECONDS or when Xano calls the job catalog webhook, so
+lookups no longer download and scan the whole list. Syncs send
+If-None-Match / If-Modified-Since and skip re-indexing on 304 (or when the
+body hash is unchanged, for responses without validators).
+
+Question configs generated from a job's eligibility criteria and screening
+questions are memoized by a hash of that text, so only changed jobs cost an
+LLM call (unused hashes age out of the LRU). Single /job/{id} fetches
+(fetch_job_from_xano) are cached for JOB_FETCH_TTL_SECONDS. Cache counters
+are reported by async_cache.cache_metrics().
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dotenv import load_dotenv
+
+import http_client
+from async_cache import AsyncCache
+from store_locations import rebuild_store_index
+from xano import XANO_BASE_URL, generate_questions_config
+
+load_dotenv()
+
+JOB_CATALOG_URL = "https://xoho-w3ng-km3o.n7e.xano.io/api:L-QNLSmb/get_all_job_"
+JOB_CATALOG_SYNC_SECONDS = float(os.getenv("JOB_CATALOG_SYNC_SECONDS", "300"))
+JOB_FETCH_TTL_SECONDS = float(os.getenv("JOB_FETCH_TTL_SECONDS", "300"))
+JOB_FETCH_TIMEOUT_SECONDS = float(os.getenv("JOB_FETCH_TIMEOUT_SECONDS", "5"))
+
+# job id (str) -> job dict from get_all_job_
+_jobs: dict = {}
+_etag = None
+_last_modified = None
+_body_hash = None
+
+# content hash -> generated questions config (None results are retried soon)
+_question_configs = AsyncCache(
+    "question_configs",
+    max_size=int(os.getenv("QUESTION_CONFIG_CACHE_SIZE", "2048")),
+    negative_ttl=60,
+)
+
+# job id -> job dict for fetch_job_from_xano (None = not found / failed)
+_fetched_jobs = AsyncCache(
+    "fetched_jobs",
+    max_size=int(os.getenv("JOB_FETCH_CACHE_SIZE", "1024")),
+    ttl=JOB_FETCH_TTL_SECONDS,
+    negative_ttl=30,
+)
+
+# Set by the webhook to sync before the next interval
+_sync_requested = asyncio.Event()
+
+# Store index rebuild started by the last re-index (kept so it isn't garbage collected)
+_store_rebuild: asyncio.Task | None = None
+
+_metrics = {
+    "syncs": 0,
+    "not_modified": 0,
+    "reindexed": 0,
+    "sync_errors": 0,
+    "last_sync_at": None,
+    "lookups": 0,
+    "lookup_misses": 0,
+}
+
+
+def questions_content_hash(job: dict) -> str:
+    """Hash of the text a questions config is generated from"""
+    content = json.dumps([job.get("Eligibility_Criteria") or "", job.get("Screening_Questions") or ""])
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+async def sync_job_catalog() -> bool:
+    """
+    Refresh the catalog from Xano with a conditional GET.
+
+    Returns:
+        bool: True if the index was rebuilt, False if nothing changed
+    """
+    global _jobs, _etag, _last_modified, _body_hash, _store_rebuild
+
+    headers = {}
+    if _etag:
+        headers["If-None-Match"] = _etag
+    if _last_modified:
+        headers["If-Modified-Since"] = _last_modified
+
+    response = await http_client.get(JOB_CATALOG_URL, headers=headers, endpoint="xano.get_all_job_")
+    _metrics["syncs"] += 1
+    _metrics["last_sync_at"] = time.time()
+
+    if response.status_code == 304:
+        _metrics["not_modified"] += 1
+        return False
+
+    if response.status_code != 200:
+        raise RuntimeError(f"Job catalog sync failed: {response.status_code} - {response.text}")
+
+    _etag = response.headers.get("ETag")
+    _last_modified = response.headers.get("Last-Modified")
+
+    body_hash = hashlib.sha256(response.content).hexdigest()
+    if body_hash == _body_hash:
+        _metrics["not_modified"] += 1
+        return False
+
+    jobs_data = response.json()
+    _jobs = {str(job.get("id")): job for job in jobs_data}
+    _body_hash = body_hash
+
+    _metrics["reindexed"] += 1
+    print(f"[JOB_CATALOG] Indexed {len(_jobs)} job(s)")
+
+    # Geocoding store addresses shouldn't hold up the lookup that triggered the sync
+    _store_rebuild = asyncio.create_task(rebuild_store_index(list(_jobs.values())))
+    return True
+
+
+async def run_job_catalog_sync() -> None:
+    """Background task: sync every JOB_CATALOG_SYNC_SECONDS or when the webhook fires"""
+    while True:
+        try:
+            _sync_requested.clear()
+            await sync_job_catalog()
+        except asyncio.CancelledError:
+            print("[JOB_CATALOG] Sync cancelled")
+            raise
+        except Exception as e:
+            _metrics["sync_errors"] += 1
+            print(f"[JOB_CATALOG] Sync error: {e}")
+
+        try:
+            await asyncio.wait_for(_sync_requested.wait(), timeout=JOB_CATALOG_SYNC_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def request_job_catalog_sync() -> None:
+    """Ask the background task to sync now (called from the webhook)"""
+    _sync_requested.set()
+
+
+def get_catalog_job(job_id) -> dict | None:
+    """O(1) lookup of a job from the synced catalog"""
+    _metrics["lookups"] += 1
+    job = _jobs.get(str(job_id))
+    if job is None:
+        _metrics["lookup_misses"] += 1
+    return job
+
+
+async def get_questions_config(job_id) -> dict | None:
+    """
+    Questions config for a catalog job, generated once per distinct
+    eligibility criteria / screening questions text.
+    """
+    job = get_catalog_job(job_id)
+    if job is None and not _jobs:
+        # First request before the background sync has run
+        await sync_job_catalog()
+        job = get_catalog_job(job_id)
+    if job is None:
+        return None
+
+    return await _question_configs.get_or_load(
+        questions_content_hash(job),
+        lambda: asyncio.to_thread(
+            generate_questions_config,
+            job.get("Eligibility_Criteria"),
+            job.get("Screening_Questions"),
+        ),
+        is_negative=lambda config: config is None,
+    )
+
+
+async def fetch_job(job_id: str) -> dict | None:
+    """GET /job/{job_id} from Xano, cached for JOB_FETCH_TTL_SECONDS"""
+    return await _fetched_jobs.get_or_load(
+        job_id, lambda: _fetch_job(job_id), is_negative=lambda job: job is None
+    )
+
+
+async def _fetch_job(job_id: str) -> dict | None:
+    response = await http_client.get(
+        f"{XANO_BASE_URL}/job/{job_id}",
+        timeout=JOB_FETCH_TIMEOUT_SECONDS,
+        endpoint="xano.job",
+    )
+    if response.status_code != 200:
+        print(f"Failed to fetch job: {response.status_code} - {response.text}")
+        return None
+
+    return response.json()
+
+
+def job_catalog_metrics() -> dict:
+    """Sync and lookup counters for the /metrics endpoint"""
+    return {
+        **_metrics,
+        "jobs": len(_jobs),
+    }
@@ -0,0 +1,360 @@
+"""
+In-process job config registry.
+
+All rows of the job_configs table are loaded once at startup and served from
+memory. A background watcher keeps them fresh: it LISTENs on the
+job_configs_changed channel (fired by a trigger on insert/update) and, as a
+safety net, polls updated_at every JOB_CONFIG_POLL_SECONDS.
+
+Lookups fall back to the static JOB_CONFIGS (keyed by job_type) when a job_id
+has no generated config in the database.
+
+Sessions don't embed their questions. compile_job_config() resolves a config
+for one location once (address placeholder filled in, question lists frozen to
+interned tuples, scoring model made read-only and pre-serialized) and graph
+state keeps only the returned config_id. Compiled configs are cached by
+(job, config version, location), so every candidate for the same
+store shares one object and a config reload produces a new id.
+
+A config_id is pinned to its version: every version written to job_configs
+is also kept in job_config_versions (same trigger) for
+JOB_CONFIG_HISTORY_DAYS, so an in-flight session keeps its question lists
+after a reload, an LRU eviction or a restart.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple
+from psycopg import AsyncConnection
+from psycopg.rows import dict_row
+from dotenv import load_dotenv
+
+from db import get_pool
+from job_configs import JOB_CONFIGS
+
+load_dotenv()
+
+JOB_CONFIG_CHANNEL = "job_configs_changed"
+JOB_CONFIG_POLL_SECONDS = float(os.getenv("JOB_CONFIG_POLL_SECONDS", "60"))
+COMPILED_JOB_CONFIG_CACHE_SIZE = int(os.getenv("COMPILED_JOB_CONFIG_CACHE_SIZE", "1024"))
+# Superseded config versions are kept this long (longer than any session)
+JOB_CONFIG_HISTORY_DAYS = int(os.getenv("JOB_CONFIG_HISTORY_DAYS", "30"))
+
+# Version used for configs that come from the static JOB_CONFIGS
+STATIC_CONFIG_VERSION = "static"
+
+# job_id -> config dict (from job_configs table)
+_configs: dict = {}
+# job_id -> config version (updated_at of the row)
+_versions: dict = {}
+# (job_id, version) -> config, for versions sessions may still be pinned to
+_history: dict = {}
+_last_updated_at = None
+
+_metrics = {
+    "hits": 0,
+    "misses": 0,
+    "static_fallbacks": 0,
+    "full_loads": 0,
+    "reloaded_entries": 0,
+    "notifications": 0,
+    "last_reload_at": None,
+}
+
+
+class CompiledJobConfig(NamedTuple):
+    """Immutable, location-specific job config shared by every session that uses it"""
+    config_id: str
+    knockout_questions: tuple
+    questions: tuple
+    scoring_model: MappingProxyType
+    scoring_model_json: str
+
+
+def _parse_config(config) -> dict:
+    """JSONB arrives as dict; tolerate rows stored as JSON strings"""
+    return json.loads(config) if isinstance(config, str) else config
+
+
+def _config_version(updated_at) -> str:
+    """Version string for a job_configs row"""
+    return updated_at.isoformat() if updated_at else "db"
+
+
+async def setup_job_config_table() -> None:
+    """
+    Create job_configs (written by xano_jobs.upsert_job_configs) and the
+    NOTIFY trigger. Call this once at app startup (from lifespan in main.py).
+    """
+    async with get_pool().connection() as conn:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_configs (
+                job_id TEXT PRIMARY KEY,
+                config JSONB NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Hash of the job title/description/location the config was generated from
+        await conn.execute("""
+            ALTER TABLE job_configs ADD COLUMN IF NOT EXISTS content_hash TEXT
+        """)
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_job_configs_updated_at ON job_configs(updated_at)
+        """)
+        # Every version, so sessions pinned to an older one can still resolve it
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_config_versions (
+                job_id     TEXT      NOT NULL,
+                updated_at TIMESTAMP NOT NULL,
+                config     JSONB     NOT NULL,
+                PRIMARY KEY (job_id, updated_at)
+            )
+        """)
+        await conn.execute("""
+            INSERT INTO job_config_versions (job_id, updated_at, config)
+            SELECT job_id, updated_at, config FROM job_configs WHERE updated_at IS NOT NULL
+            ON CONFLICT DO NOTHING
+        """)
+        await conn.execute(f"""
+            CREATE OR REPLACE FUNCTION notify_job_config_changed()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                IF NEW.updated_at IS NOT NULL THEN
+                    INSERT INTO job_config_versions (job_id, updated_at, config)
+                    VALUES (NEW.job_id, NEW.updated_at, NEW.config)
+                    ON CONFLICT DO NOTHING;
+                END IF;
+                PERFORM pg_notify('{JOB_CONFIG_CHANNEL}', NEW.job_id);
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        await conn.execute("""
+            DROP TRIGGER IF EXISTS job_configs_notify ON job_configs
+        """)
+        await conn.execute("""
+            CREATE TRIGGER job_configs_notify
+                AFTER INSERT OR UPDATE ON job_configs
+                FOR EACH ROW
+                EXECUTE FUNCTION notify_job_config_changed()
+        """)
+    print("[JOB_CONFIGS] job_configs table, version history and notify trigger ready")
+
+
+async def load_job_configs() -> int:
+    """
+    Load every job config, and the versions of the last JOB_CONFIG_HISTORY_DAYS,
+    into memory. Returns the number of configs loaded.
+    """
+    global _configs, _last_updated_at
+
+    async with get_pool().connection() as conn:
+        await conn.execute("""
+            DELETE FROM job_config_versions
+            WHERE updated_at < NOW() - make_interval(days => %s)
+        """, (JOB_CONFIG_HISTORY_DAYS,))
+        cur = await conn.execute("SELECT job_id, config, updated_at FROM job_config_versions")
+        history = await cur.fetchall()
+        cur = await conn.execute("SELECT job_id, config, updated_at FROM job_configs")
+        rows = await cur.fetchall()
+
+    _history.clear()
+    _history.update({
+        (job_id, _config_version(updated_at)): _parse_config(config)
+        for job_id, config, updated_at in history
+    })
+
+    _configs = {job_id: _parse_config(config) for job_id, config, _ in rows}
+    _versions.clear()
+    _versions.update({job_id: _config_version(updated_at) for job_id, _, updated_at in rows})
+    _last_updated_at = max((updated_at for _, _, updated_at in rows if updated_at), default=None)
+
+    _metrics["full_loads"] += 1
+    _metrics["last_reload_at"] = time.time()
+    print(f"[JOB_CONFIGS] Loaded {len(_configs)} job config(s) from database")
+    return len(_configs)
+
+
+async def refresh_job_configs(job_id: str = None) -> int:
+    """
+    Reload changed entries only: one job_id (after a NOTIFY) or every row
+    with updated_at newer than the last one seen (polling).
+    Returns the number of entries refreshed.
+    """
+    global _last_updated_at
+
+    async with get_pool().connection() as conn:
+        if job_id:
+            cur = await conn.execute(
+                "SELECT job_id, config, updated_at FROM job_configs WHERE job_id = %s",
+                (job_id,)
+            )
+        elif _last_updated_at is not None:
+            cur = await conn.execute(
+                "SELECT job_id, config, updated_at FROM job_configs WHERE updated_at > %s",
+                (_last_updated_at,)
+            )
+        else:
+            cur = await conn.execute("SELECT job_id, config, updated_at FROM job_configs")
+        rows = await cur.fetchall()
+
+    for row_job_id, config, updated_at in rows:
+        if row_job_id in _configs:
+            # Sessions compiled from the previous version stay pinned to it
+            _history[(row_job_id, _versions.get(row_job_id, "db"))] = _configs[row_job_id]
+        _configs[row_job_id] = _parse_config(config)
+        _versions[row_job_id] = _config_version(updated_at)
+        if updated_at and (_last_updated_at is None or updated_at > _last_updated_at):
+            _last_updated_at = updated_at
+
+    if rows:
+        _metrics["reloaded_entries"] += len(rows)
+        _metrics["last_reload_at"] = time.time()
+        print(f"[JOB_CONFIGS] Refreshed {len(rows)} job config(s)")
+
+    return len(rows)
+
+
+async def watch_job_configs() -> None:
+    """
+    Background task: apply NOTIFY changes as they arrive and poll updated_at
+    every JOB_CONFIG_POLL_SECONDS to catch anything missed (e.g. while reconnecting).
+    """
+    connection_string = os.getenv("POSTGRES_CONNECTION_STRING")
+
+    while True:
+        try:
+            async with await AsyncConnection.connect(connection_string, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {JOB_CONFIG_CHANNEL}")
+                print(f"[JOB_CONFIGS] Listening on {JOB_CONFIG_CHANNEL}")
+
+                while True:
+                    # notifies() returns after the timeout so polling still runs
+                    async for notify in conn.notifies(timeout=JOB_CONFIG_POLL_SECONDS):
+                        _metrics["notifications"] += 1
+                        await refresh_job_configs(notify.payload)
+
+                    await refresh_job_configs()
+
+        except asyncio.CancelledError:
+            print("[JOB_CONFIGS] Watcher cancelled")
+            raise
+        except Exception as e:
+            print(f"[JOB_CONFIGS] Watcher error: {e}, reconnecting in 5s")
+            await asyncio.sleep(5)
+
+
+def _resolve_job_config(job_id: str, job_type: str = None) -> tuple[str, dict] | None:
+    """Return (version, config) for job_id, falling back to JOB_CONFIGS[job_type]"""
+    config = _configs.get(job_id)
+    if config is not None:
+        _metrics["hits"] += 1
+        return _versions.get(job_id, "db"), config
+
+    _metrics["misses"] += 1
+
+    if job_type in JOB_CONFIGS:
+        _metrics["static_fallbacks"] += 1
+        return STATIC_CONFIG_VERSION, JOB_CONFIGS[job_type]
+
+    return None
+
+
+def get_job_config(job_id: str, job_type: str = None) -> dict | None:
+    """
+    Look up a job config from memory: the generated config for job_id first,
+    then the static JOB_CONFIGS entry for job_type. Returns None if neither exists.
+    """
+    resolved = _resolve_job_config(job_id, job_type)
+    return resolved[1] if resolved else None
+
+
+def _freeze(value):
+    """Recursively turn dicts into read-only mappings and lists into tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({sys.intern(k): _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+@lru_cache(maxsize=COMPILED_JOB_CONFIG_CACHE_SIZE)
+def _compile(job_id: str, job_type: str, version: str, location: str) -> CompiledJobConfig:
+    """
+    Build the compiled config for exactly this version (cached per version and location)
+
+    Raises:
+        LookupError: If the version is no longer available
+    """
+    if version == STATIC_CONFIG_VERSION:
+        config = JOB_CONFIGS[job_type]
+    elif _versions.get(job_id) == version:
+        config = _configs[job_id]
+    else:
+        config = _history.get((job_id, version))
+
+    if config is None:
+        raise LookupError(f"Job config {job_id} version {version} is no longer available")
+
+    scoring_model = config.get("scoring_model", {})
+
+    compiled = CompiledJobConfig(
+        config_id="|".join([job_id or "", job_type or "", version, location or ""]),
+        knockout_questions=tuple(
+            sys.intern(q.format(address=location)) for q in config.get("knockout_questions", [])
+        ),
+        questions=tuple(sys.intern(q) for q in config.get("questions", [])),
+        scoring_model=_freeze(scoring_model),
+        scoring_model_json=json.dumps(scoring_model, indent=2),
+    )
+    print(f"[JOB_CONFIGS] Compiled {compiled.config_id}")
+    return compiled
+
+
+def compile_job_config(job_id: str, job_type: str, location: str) -> CompiledJobConfig | None:
+    """
+    Return the compiled config for a job at a location, or None if the job
+    has no config. Store compiled.config_id in graph state.
+    """
+    resolved = _resolve_job_config(job_id, job_type)
+    if resolved is None:
+        return None
+
+    version, _ = resolved
+    if version == STATIC_CONFIG_VERSION:
+        # Static configs are per job_type, so jobs of the same type share them
+        job_id = ""
+    return _compile(job_id, job_type, version, location)
+
+
+def get_compiled_config(config_id: str) -> CompiledJobConfig:
+    """
+    Resolve a config_id stored in graph state. After a restart or cache
+    eviction the same version is compiled again (from the history if the
+    job's config has been reloaded since), never the current one.
+
+    Raises:
+        LookupError: If that version is no longer kept
+    """
+    # location goes last since it is free text
+    job_id, job_type, version, location = config_id.split("|", 3)
+    return _compile(job_id, job_type, version, location)
+
+
+def job_config_metrics() -> dict:
+    """Hit/miss and reload counters for the /metrics endpoint"""
+    lookups = _metrics["hits"] + _metrics["misses"]
+    return {
+        **_metrics,
+        "entries": len(_configs),
+        "history_versions": len(_history),
+        "compiled": _compile.cache_info()._asdict(),
+        "hit_ratio": round(_metrics["hits"] / lookups, 3) if lookups else 0.0,
+    }
@@ -1,13 +1,16 @@
 """Location services for address geocoding and GPS cross-verification"""
 
+import asyncio
 import json
 import os
 import math
 from wsgiref import headers
 from fastapi import params
-import requests
 from dotenv import load_dotenv
 
+import http_client
+from geocode_cache import cached_geocode, cached_reverse_geocode
+
 load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY")
@@ -16,12 +19,15 @@ print(f"[DEBUG] Google API Key loaded: {GOOGLE_API_KEY[:10] if GOOGLE_API_KEY el
 
 # ==================== Haversine Distance ====================
 
+EARTH_RADIUS_MILES = 3958.8
+
+
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculate distance between two GPS coordinates in miles
     using Haversine formula
     """
-    R = 3958.8  # Earth radius in miles
+    R = EARTH_RADIUS_MILES
 
     lat1_r = math.radians(lat1)
     lat2_r = math.radians(lat2)
@@ -39,13 +45,18 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 
 # ==================== Geocoding ====================
 
-def geocode_address(address: str) -> dict | None:
+async def geocode_address(address: str) -> dict | None:
     """
     Convert a text address to lat/lng using Google Geocoding API
+    (cached in memory and in the geocode_cache table)
 
     Returns:
         dict: { "lat": float, "lng": float, "formatted_address": str } or None
     """
+    return await cached_geocode(address, lambda: _google_geocode(address))
+
+
+async def _google_geocode(address: str) -> dict | None:
     try:
         url = "https://maps.googleapis.com/maps/api/geocode/json"
         params = {
@@ -54,7 +65,7 @@ def geocode_address(address: str) -> dict | None:
         }
 
         headers = {"Referer": "http://localhost:8000/"}
-        response = requests.get(url, params=params, headers=headers, timeout=5)
+        response = await http_client.get(url, params=params, headers=headers, timeout=5, endpoint="google.geocode")
         
         data = response.json()
 
@@ -75,13 +86,18 @@ def geocode_address(address: str) -> dict | None:
         return None
 
 
-def reverse_geocode(lat: float, lng: float) -> dict | None:
+async def reverse_geocode(lat: float, lng: float) -> dict | None:
     """
     Convert GPS coordinates to a human-readable address
+    (cached per GEOCODE_GRID_METERS grid cell)
 
     Returns:
         dict: { "formatted_address": str, "components": dict } or None
     """
+    return await cached_reverse_geocode(lat, lng, lambda: _google_reverse_geocode(lat, lng))
+
+
+async def _google_reverse_geocode(lat: float, lng: float) -> dict | None:
     try:
         url = "https://maps.googleapis.com/maps/api/geocode/json"
         params = {
@@ -90,7 +106,7 @@ def reverse_geocode(lat: float, lng: float) -> dict | None:
         }
 
         headers = {"Referer": "http://localhost:8000/"}
-        response = requests.get(url, params=params, headers=headers, timeout=5)
+        response = await http_client.get(url, params=params, headers=headers, timeout=5, endpoint="google.reverse_geocode")
         
         data = response.json()
 
@@ -125,9 +141,10 @@ def reverse_geocode(lat: float, lng: float) -> dict | None:
 
 # ==================== Places Autocomplete ====================
 
-def get_address_autocomplete(input_text: str, session_token: str = "") -> list:
+async def get_address_autocomplete(input_text: str, session_token: str = "", region: str = "") -> list:
     """
     Get address suggestions from Google Places Autocomplete API
+    (region: optional ccTLD code to bias results, e.g. "us")
 
     Returns:
         list: [ { "description": str, "place_id": str } ]
@@ -140,9 +157,11 @@ def get_address_autocomplete(input_text: str, session_token: str = "") -> list:
             "key": GOOGLE_API_KEY,
             "sessiontoken": session_token
         }
+        if region:
+            params["region"] = region
 
         headers = {"Referer": "http://localhost:8000/"}
-        response = requests.get(url, params=params, headers=headers, timeout=5)
+        response = await http_client.get(url, params=params, headers=headers, timeout=5, endpoint="google.places_autocomplete")
         
         data = response.json()
 
@@ -166,7 +185,7 @@ def get_address_autocomplete(input_text: str, session_token: str = "") -> list:
         return []
 
 
-def get_place_details(place_id: str) -> dict | None:
+async def get_place_details(place_id: str) -> dict | None:
     """
     Get structured address details from a Google Places place_id
 
@@ -182,7 +201,7 @@ def get_place_details(place_id: str) -> dict | None:
         }
 
         headers = {"Referer": "http://localhost:8000/"}
-        response = requests.get(url, params=params, headers=headers, timeout=5)
+        response = await http_client.get(url, params=params, headers=headers, timeout=5, endpoint="google.place_details")
         
         data = response.json()
 
@@ -230,14 +249,20 @@ DISTANCE_THRESHOLD_MILES = 15.0   # Flag if GPS > 15 miles from typed address
 CITY_STATE_MATCH_REQUIRED = True  # Flag if city/state don't match
 
 
-def verify_location(
+async def verify_location(
     typed_address: str,
     gps_lat: float,
-    gps_lng: float
+    gps_lng: float,
+    typed_lat: float | None = None,
+    typed_lng: float | None = None,
 ) -> dict:
     """
     Cross-verify GPS coordinates against typed address
 
+    typed_lat/typed_lng are the coordinates /places/details already returned
+    for the selected address; when given, the address is not geocoded again.
+    The GPS reverse geocode runs concurrently with the forward geocode.
+
     Returns:
         dict: {
             "verified": bool,
@@ -246,8 +271,11 @@ def verify_location(
             "flag_reason": str,
             "gps_address": str,
             "typed_coords": { "lat", "lng" },
+            "nearest_store": { "job_id", "address", "lat", "lng", "distance_miles" } or None,
         }
     """
+    from offline_geocoder import offline_reverse_geocode
+    from store_locations import nearest_stores, haversine_miles
     result = {
         "verified": False,
         "distance_miles": None,
@@ -255,10 +283,33 @@ def verify_location(
         "flag_reason": "",
         "gps_address": "",
         "typed_coords": None,
+        "nearest_store": None,
     }
 
-    # Step 1: Geocode the typed address
-    typed_coords = geocode_address(typed_address)
+    # Step 1 + 2: Coordinates of the typed address and reverse geocode of the GPS point
+    # (city/state/zip come from the local places dataset when it is confident)
+    gps_result = offline_reverse_geocode(gps_lat, gps_lng)
+
+    if typed_lat is not None and typed_lng is not None:
+        typed_coords = {"lat": typed_lat, "lng": typed_lng, "formatted_address": typed_address}
+        if gps_result is None:
+            gps_result = await reverse_geocode(gps_lat, gps_lng)
+    elif gps_result is None:
+        typed_coords, gps_result = await asyncio.gather(
+            geocode_address(typed_address),
+            reverse_geocode(gps_lat, gps_lng),
+        )
+    else:
+        typed_coords = await geocode_address(typed_address)
+
+    if gps_result:
+        result["gps_address"] = gps_result["formatted_address"]
+
+    # Closest open location to where the candidate actually is (multi-location brands)
+    nearest = nearest_stores(gps_lat, gps_lng, k=1)
+    if nearest:
+        result["nearest_store"] = nearest[0]
+
     if not typed_coords:
         result["flag"] = True
         result["flag_reason"] = "Could not verify typed address"
@@ -266,16 +317,8 @@ def verify_location(
 
     result["typed_coords"] = typed_coords
 
-    # Step 2: Reverse geocode the GPS coordinates
-    gps_result = reverse_geocode(gps_lat, gps_lng)
-    if gps_result:
-        result["gps_address"] = gps_result["formatted_address"]
-
     # Step 3: Calculate distance
-    distance = haversine_distance(
-        typed_coords["lat"], typed_coords["lng"],
-        gps_lat, gps_lng
-    )
+    distance = float(haversine_miles(typed_coords["lat"], typed_coords["lng"], gps_lat, gps_lng))
     result["distance_miles"] = round(distance, 2)
 
     print(f"Distance between typed address and GPS: {distance:.2f} miles")
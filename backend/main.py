@@ -6,11 +6,20 @@ from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect,
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, FileResponse
 from langchain.schema import HumanMessage, AIMessage
+from langchain_core.messages import RemoveMessage
 import json
 import uuid
 from graph import build_graph, ChatbotState
-from job_configs import JOB_CONFIGS
-# from xano_jobs import read_job_config_from_db
+from langgraph.types import Command
+from widget_inputs import WIDGET_MESSAGE_TYPES, WIDGET_NODES, parse_widget_input, parse_typed_input
+from job_config_registry import (
+    setup_job_config_table,
+    load_job_configs,
+    watch_job_configs,
+    get_job_config,
+    compile_job_config,
+    job_config_metrics,
+)
 
 from contextlib import asynccontextmanager
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
@@ -18,18 +27,50 @@ from psycopg import AsyncConnection
 from psycopg.rows import dict_row
 import os
 import asyncio
-from location_services import get_address_autocomplete, get_place_details, reverse_geocode
+from location_services import reverse_geocode
+from places_proxy import autocomplete, place_details as cached_place_details, places_metrics
+from store_locations import nearest_stores, store_index_metrics
+from offline_geocoder import load_offline_geocoder, offline_geocode_metrics
+from phone_verifier import close_phone_verifier, phone_verify_metrics
+from notification_dispatcher import stop_dispatcher, dispatcher_metrics, get_delivery_status
+
+from db import open_pool, close_pool
+from http_client import close_clients, http_metrics
+from xano import xano_submission_metrics
+from job_catalog import run_job_catalog_sync, request_job_catalog_sync, job_catalog_metrics
+from async_cache import cache_metrics
+from geocode_cache import setup_geocode_table, geocode_cache_metrics
+from pdf_reports import start_pdf_pool, shutdown_pdf_pool, setup_report_table, get_report_pdf, verify_report_token
+from xano_outbox import (
+    setup_outbox_table,
+    run_outbox_worker,
+    requeue_dead_letters,
+    outbox_metrics,
+)
+from transcript_store import (
+    TRANSCRIPT_STATE_WINDOW,
+    setup_transcript_table,
+    unrecorded_messages,
+    append_events,
+    read_transcript,
+)
 
 from id_verification import (
     setup_mapping_table,
-    save_session_mapping,
-    get_cleo_session_id,
+    resolve_webhook_session,
+    get_thread_id,
+    parse_kyc_result,
     verify_webhook_signature,
 )
+from id_verify_inbox import (
+    setup_inbox_table,
+    ingest_webhook,
+    run_inbox_worker,
+    inbox_metrics,
+)
 
 
 brand_name = ""
-current_session_id = ""
 
 # Initialize graph at startup
 graph_app = None
@@ -54,12 +95,40 @@ async def lifespan(app: FastAPI):
     checkpointer = AsyncPostgresSaver(conn)
     await checkpointer.setup()
 
+    await open_pool()
     await setup_mapping_table()    # creates id_verify_sessions table
+    await setup_transcript_table()    # creates conversation_events table
+
+    # Job configs are served from memory; the watcher applies DB changes
+    await setup_job_config_table()
+    await load_job_configs()
+    job_config_task = asyncio.create_task(watch_job_configs())
+
+    # Xano job catalog, synced periodically and on webhook
+    job_catalog_task = asyncio.create_task(run_job_catalog_sync())
+
+    # Applicant report PDFs render in a process pool
+    await setup_report_table()
+    start_pdf_pool()
+
+    # Applicant submissions are delivered to Xano from the outbox
+    await setup_outbox_table()
+    outbox_task = asyncio.create_task(run_outbox_worker())
+
+    # Shared tier of the geocode / reverse-geocode cache
+    await setup_geocode_table()
+
+    # Local places dataset for the GPS city/state check (Google is the fallback)
+    load_offline_geocoder()
     
     # Build graph with checkpointer
     graph_app = build_graph(checkpointer)
     print("Graph initialized with AsyncPostgresSaver")
 
+    # ID verification webhooks are acknowledged on receipt and applied here
+    await setup_inbox_table()
+    id_verify_task = asyncio.create_task(run_inbox_worker(apply_id_verify_event))
+
     # START CLEANUP TASK
     cleanup_task = asyncio.create_task(cleanup_inactive_sessions())
     print("Session cleanup task started")
@@ -68,7 +137,16 @@ async def lifespan(app: FastAPI):
     
     # CANCEL CLEANUP TASK ON SHUTDOWN
     cleanup_task.cancel()
+    job_config_task.cancel()
+    job_catalog_task.cancel()
+    outbox_task.cancel()
+    id_verify_task.cancel()
+    shutdown_pdf_pool()
+    await stop_dispatcher()
+    await close_clients()
+    close_phone_verifier()
     # Cleanup
+    await close_pool()
     await conn.close()
     print("Connection closed")
 
@@ -155,37 +233,132 @@ async def reverse_geocode_coords(lat: float = Query(...), lng: float = Query(...
     Convert GPS coordinates to a human-readable address.
     Returns: { formatted_address, components: { city, state, zip, country } }
     """
-    result = reverse_geocode(lat, lng)
+    result = await reverse_geocode(lat, lng)
     if not result:
         raise HTTPException(status_code=404, detail="Location not found")
     return result
 
 
 @app.get("/places/autocomplete")
-async def places_autocomplete(input: str = Query(...), session_token: str = Query("")):
+async def places_autocomplete(input: str = Query(...), session_token: str = Query(""), region: str = Query("")):
     """
     Proxy for Google Places Autocomplete.
     Keeps the API key on the server (never exposed to frontend).
+    Cached per session token and region, and rate-limited per session.
     """
     if len(input.strip()) < 3:
         return {"predictions": []}
 
-    suggestions = get_address_autocomplete(input.strip(), session_token)
+    suggestions = await autocomplete(input.strip(), session_token, region)
     return {"predictions": suggestions}
 
 
+@app.get("/stores/nearest")
+async def stores_nearest(lat: float = Query(...), lng: float = Query(...), k: int = Query(3, ge=1, le=25)):
+    """
+    Nearest open store locations (job postings) to a point.
+    Returns: { stores: [ { job_id, address, lat, lng, distance_miles } ] }
+    """
+    return {"stores": nearest_stores(lat, lng, k)}
+
+
 @app.get("/places/details")
 async def place_details(place_id: str = Query(...)):
     """
     Get structured address details from a Google place_id.
     Returns: { street, city, state, zip, full, lat, lng }
     """
-    details = get_place_details(place_id)
+    details = await cached_place_details(place_id)
     if not details:
         raise HTTPException(status_code=404, detail="Place not found")
     return details
 
 
+@app.get("/transcript/{session_id}")
+async def get_transcript(session_id: str, api_key: str = Query(...), after_seq: int = Query(0)):
+    """
+    Export a session transcript from the append-only log.
+    Pass after_seq to replay only events after a known cursor.
+    """
+    if api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+
+    events = await read_transcript(session_id, after_seq)
+    return {"session_id": session_id, "events": events}
+
+
+@app.get("/notifications/{delivery_id}")
+async def notification_status(delivery_id: str, api_key: str = Query(...)):
+    """Delivery status of a recent email / SMS notification"""
+    if api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+
+    status = get_delivery_status(delivery_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    return status
+
+
+@app.get("/metrics")
+async def metrics(api_key: str = Query(...)):
+    """In-process cache, registry and queue counters"""
+    if api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+
+    return {
+        "job_configs": job_config_metrics(),
+        "xano_outbox": await outbox_metrics(),
+        "http": http_metrics(),
+        "xano_submissions": xano_submission_metrics(),
+        "job_catalog": job_catalog_metrics(),
+        "caches": cache_metrics(),
+        "geocode": geocode_cache_metrics(),
+        "places": places_metrics(),
+        "stores": store_index_metrics(),
+        "offline_geocode": offline_geocode_metrics(),
+        "phone_verify": phone_verify_metrics(),
+        "notifications": dispatcher_metrics(),
+        "id_verify_inbox": await inbox_metrics(),
+    }
+
+
+@app.get("/reports/{session_id}/pdf")
+async def download_report(session_id: str, token: str = Query(...)):
+    """Applicant report PDF for hiring managers (rendered on first download if needed)"""
+    # Per-report signed link from report_download_url(), not the API key
+    if not verify_report_token(session_id, token):
+        raise HTTPException(status_code=403, detail="Invalid or expired link")
+
+    pdf = await get_report_pdf(session_id)
+    if pdf is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="applicant_report_{session_id}.pdf"'},
+    )
+
+
+@app.post("/webhooks/job-catalog")
+async def job_catalog_webhook(api_key: str = Query(...)):
+    """Called by Xano when jobs change; triggers a catalog sync"""
+    if api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+
+    request_job_catalog_sync()
+    return {"status": "sync requested"}
+
+
+@app.post("/xano-outbox/requeue")
+async def requeue_xano_outbox(api_key: str = Query(...)):
+    """Retry dead-lettered Xano submissions"""
+    if api_key != API_KEY:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+
+    return {"requeued": await requeue_dead_letters()}
+
+
 @app.get("/validate-domain")
 async def validate_domain(
     domain: str = Query(..., description="Domain where chatbot is embedded")
@@ -229,10 +402,8 @@ async def start_session(job_type: str = Query(...), api_key: str = Query(...), l
 
     print(f"Starting session for job_type: {job_type} at location: {location}")
 
-    # job_configs = await read_job_config_from_db()
-
-    # Validate job_id exists
-    if job_type not in JOB_CONFIGS:
+    # Validate job config exists (generated config for job_id, else static job_type)
+    if get_job_config(job_id, job_type) is None:
         raise HTTPException(status_code=404, detail="Job type not found")
     
     # Validate API key
@@ -241,8 +412,6 @@ async def start_session(job_type: str = Query(...), api_key: str = Query(...), l
     
     # Create session
     session_id = str(uuid.uuid4())
-    global current_session_id
-    current_session_id = session_id
 
     thread_id = f"thread_{job_type}_{session_id}"
     
@@ -265,19 +434,6 @@ async def start_session(job_type: str = Query(...), api_key: str = Query(...), l
     }
 
 
-def set_job_address(job_config: dict, location: str):
-
-    # Replace placeholder in knockout questions
-    job = job_config.copy()
-    job["knockout_questions"] = [
-        q.format(address=location) for q in job["knockout_questions"]
-    ]
-
-    print(f"Updated Job ->: {job}")
-
-    return job
-
-
 async def websocket_heartbeat(websocket: WebSocket):
     """
     Send ping every 30 seconds to keep connection alive.
@@ -333,8 +489,10 @@ async def cleanup_inactive_sessions():
 @app.post("/webhook/id-verification")
 async def id_verification_webhook(request: Request):
     """
-    Receives Simplici webhook when ID verification completes.
-    Updates graph state and pushes real-time result to the active WebSocket.
+    Receives Simplici webhooks (sessionInitiate, kyc).
+    Only stores the event in the inbox and acknowledges; apply_id_verify_event
+    runs on the inbox worker. Redeliveries of the same sessionId + stepId are
+    dropped as duplicates.
     """
     raw_body = await request.body()
 
@@ -343,67 +501,52 @@ async def id_verification_webhook(request: Request):
     # if not verify_webhook_signature(raw_body, signature):
     #     raise HTTPException(status_code=401, detail="Invalid webhook signature")
 
-    payload = await request.json()
-    print(f"[WEBHOOK] ID verification payload received: {payload}")
+    try:
+        payload = json.loads(raw_body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+    if not payload.get("sessionId"):
+        raise HTTPException(status_code=400, detail="Missing sessionId")
 
-    simplici_session_id = payload.get("sessionId")
     step_id = payload.get("stepId", "")
+    print(f"[WEBHOOK] ID verification {step_id} received for Simplici session {payload['sessionId']}")
 
-    if step_id == "sessionInitiate":
-        simplici_session_id = payload.get("sessionId")
-        cleo_session_id = current_session_id  
-        await save_session_mapping(simplici_session_id, cleo_session_id)
-        
-        print(f"[WEBHOOK] Session initiated. Simplici session {simplici_session_id} mapped to Cleo session {cleo_session_id}")
-        return {"status": "handled"}
+    status = await ingest_webhook(payload)
+    return {"status": status}
 
-    # Early exit for intermediate steps
-    if step_id != "kyc":
-        print(f"[WEBHOOK] Ignoring step: {step_id}")
-        return {"status": "ignored"}
-    
-    event_payload = payload.get("payload", {})
-
-    if not simplici_session_id:
-        raise HTTPException(status_code=400, detail="Missing sessionId")
 
+async def apply_id_verify_event(simplici_session_id: str, step_id: str, payload: dict) -> str:
+    """
+    Inbox worker handler for one stored webhook.
+    Raising makes the inbox retry the event with backoff (and dead-letter it
+    after the last attempt), so an event whose session can't be resolved yet,
+    e.g. a kyc processed before its mapping is written, is not marked done.
+    """
     # ── Look up which Cleo session this belongs to ────────────────────────────
-    cleo_session_id = await get_cleo_session_id(simplici_session_id)
+    cleo_session_id = await resolve_webhook_session(simplici_session_id, payload)
 
     if not cleo_session_id:
-        print(f"[WEBHOOK] No Cleo session found for Simplici session {simplici_session_id}")
-        # Return 200 so Simplici doesn't keep retrying
-        return {"status": "session_not_found"}
-
-    # Determine pass/fail from Simplici schema
-    kyc_data      = event_payload.get("kyc", {})
-    report        = kyc_data.get("basicInfo", {}).get("report", {})
-    top_status    = event_payload.get("status", "")
-    report_status = report.get("status", "")
-    rejections    = report.get("reject", ["unknown"])  # non-empty = failed
-    liveliness    = report.get("liveliness", False)
-
-    verified = (
-        top_status    == "completed" and
-        report_status == "completed" and
-        liveliness    == True and
-        len(rejections) == 0
-    )
+        raise LookupError(f"No Cleo session found for Simplici session {simplici_session_id}")
 
-    print(f"[WEBHOOK] KYC result — status: {top_status}, report: {report_status}, liveliness: {liveliness}, rejections: {rejections}, verified: {verified}")
+    if step_id == "sessionInitiate":
+        print(f"[WEBHOOK] Session initiated. Simplici session {simplici_session_id} mapped to Cleo session {cleo_session_id}")
+        return "mapped"
 
+    verified = parse_kyc_result(payload.get("payload", {}))
     print(f"[WEBHOOK] Session {cleo_session_id} — verified: {verified}")
 
     # ── Update LangGraph state directly ──────────────────────────────────────
-    session   = sessions.get(cleo_session_id)
-    if not session:
-        return {"status": "session_inactive"}
+    # The checkpointer is shared, so the session needn't be held by this process
+    session = sessions.get(cleo_session_id)
+    thread_id = session["thread_id"] if session else await get_thread_id(cleo_session_id)
+    if not thread_id:
+        raise LookupError(f"No thread found for Cleo session {cleo_session_id}")
 
-    thread_id = session["thread_id"]
-    config    = {"configurable": {"thread_id": thread_id}}
-
-    current_state    = await graph_app.aget_state(config)
-    current_messages = current_state.values.get("messages", [])
+    config = {"configurable": {"thread_id": thread_id}}
+    snapshot = await graph_app.aget_state(config)
+    if not snapshot.values:
+        raise LookupError(f"No checkpoint for thread {thread_id}")
 
     await graph_app.aupdate_state(
         config,
@@ -414,18 +557,165 @@ async def id_verification_webhook(request: Request):
     )
 
     # ── Push real-time result to the active WebSocket ─────────────────────────
-    ws = session.get("websocket")
+    # Without a socket here the client picks the result up from state when it
+    # confirms; a failed push is raised so the inbox retries the event.
+    ws = session.get("websocket") if session and session.get("active") else None
     if ws:
-        try:
-            await ws.send_json({
-                "type":     "id_verify_result",
-                "verified": verified
+        await ws.send_json({
+            "type":     "id_verify_result",
+            "verified": verified
+        })
+        print(f"[WEBHOOK] Pushed id_verify_result to WebSocket for {cleo_session_id}")
+
+    return "verified" if verified else "rejected"
+
+
+async def record_transcript(config: dict, session_id: str, new_messages: list = None):
+    """
+    Write messages not yet in conversation_events to the log (one batched insert),
+    then drop logged messages from graph state except the tail nodes still read.
+
+    new_messages (e.g. the user's reply) are appended to state in the same update.
+    """
+    new_messages = new_messages or []
+
+    snapshot = await graph_app.aget_state(config)
+    messages = snapshot.values.get("messages", []) + new_messages
+    transcript_seq = snapshot.values.get("transcript_seq", 0)
+
+    unrecorded = unrecorded_messages(messages, transcript_seq)
+    if not unrecorded:
+        return
+
+    transcript_seq = await append_events(session_id, transcript_seq, unrecorded)
+
+    stale = messages[:-TRANSCRIPT_STATE_WINDOW]
+    await graph_app.aupdate_state(
+        config,
+        {
+            "messages": [RemoveMessage(id=msg.id) for msg in stale] + new_messages,
+            "transcript_seq": transcript_seq,
+        }
+    )
+
+
+# Nodes whose message is rendered as a question bubble
+QUESTION_NODES = [
+    "ask_knockout_question", "ask_name", "ask_email", "ask_phone", "ask_question",
+    "ask_work_experience", "ask_education", "ask_id_verification", "ask_gps_verification"
+]
+
+# UI flag to re-show when a widget payload fails validation
+WIDGET_UI_FLAGS = {
+    "address_data": "show_address_ui",
+    "gps_data": "show_gps_ui",
+    "work_experience_data": "show_work_experience_ui",
+    "id_verify_confirmed": "show_id_verify_ui",
+}
+
+# Reply to text typed while a widget is waiting (and can't take text)
+WIDGET_PROMPTS = {
+    "gps_data": "Please use the button below to share your location, or skip this step.",
+    "work_experience_data": "Please add your work experience using the form below.",
+    "id_verify_confirmed": "Please complete your ID verification using the button below, then let me know when you're done.",
+}
+
+
+async def stream_workflow(websocket: WebSocket, graph_input, config: dict, default_message_type: str = "body"):
+    """
+    Run the graph until its next pause and push new AI messages to the socket.
+
+    graph_input is the initial state, None (resume after a text message) or
+    Command(resume=...) for widget submissions.
+    """
+    async for event in graph_app.astream(graph_input, config=config, stream_mode="updates"):
+        for node_name, node_data in event.items():
+            print(f"[DEBUG] Processing node: {node_name}")  # ADD DEBUG
+
+            if node_name == "__interrupt__" or not node_data or "messages" not in node_data:
+                continue
+
+            messages = node_data["messages"]
+
+            # Check if this is delay_messages_node
+            if node_name == "delay_messages":
+                print("Processing delay_messages...")
+
+                for msg in messages[-2:]:   # only last two messages
+                    # Show typing for 1 second
+                    await websocket.send_json({"type": "typing"})
+                    await asyncio.sleep(0.7)
+
+                    print(msg.content)
+                    await asyncio.sleep(1.5)  # 3 second delay
+
+                    if isinstance(msg, AIMessage):
+                        await websocket.send_json({
+                            "type": "ai_message",
+                            "content": msg.content,
+                            "messageType": "body"
+                        })
+                continue
+
+            if node_name == "process_id_result":
+                # Send both success/fail messages with typing delays
+                for msg in messages[-2:]:
+                    await websocket.send_json({"type": "typing"})
+                    await asyncio.sleep(0.7)
+                    await asyncio.sleep(1.2)
+                    if isinstance(msg, AIMessage):
+                        await websocket.send_json({
+                            "type": "ai_message",
+                            "content": msg.content,
+                            "messageType": "body"
+                        })
+                continue
+
+            if node_name == "ask_id_verification" and node_data.get("show_id_verify_ui", False):
+                # 3-message sandwich, verification button on the last one
+                for msg in messages[-3:]:
+                    if isinstance(msg, AIMessage):
+                        await websocket.send_json({"type": "typing"})
+                        await asyncio.sleep(0.7)
+                        await asyncio.sleep(1.2)
+                        is_last = (msg == messages[-1])
+                        await websocket.send_json({
+                            "type": "ai_message",
+                            "content": msg.content,
+                            "messageType": "body",
+                            "show_id_verify_ui": is_last,
+                            "id_verify_link": node_data.get("id_verify_link", "") if is_last else "",
+                        })
+                continue
+
+            messageType = "questions" if node_name in QUESTION_NODES else default_message_type
+
+            msg = messages[-1]
+            if not isinstance(msg, AIMessage):
+                continue
+
+            # Show typing for 1 second
+            await websocket.send_json({"type": "typing"})
+            await asyncio.sleep(0.7)
+
+            print(msg.content)
+
+            # Check if we should show work experience UI and education UI
+            show_ui = (node_name == "store_work_experience_response" and node_data.get("show_work_experience_ui", False))
+            show_edu_ui = (node_name == "ask_education" and node_data.get("show_education_ui", False))
+            show_address_ui = (node_name == "ask_address" and node_data.get("show_address_ui", False))
+            show_gps_ui = (node_name == "ask_gps_verification" and node_data.get("show_gps_ui", False))
+
+            await websocket.send_json({
+                "type": "ai_message",
+                "content": msg.content,
+                "messageType": messageType,
+                "show_work_experience_ui": show_ui,
+                "show_education_ui": show_edu_ui,
+                "show_address_ui": show_address_ui,
+                "show_gps_ui": show_gps_ui,
             })
-            print(f"[WEBHOOK] Pushed id_verify_result to WebSocket for {cleo_session_id}")
-        except Exception as e:
-            print(f"[WEBHOOK] Could not push to WebSocket (client may be disconnected): {e}")
 
-    return {"status": "ok", "verified": verified}
 
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
@@ -454,12 +744,6 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     # if sys.platform == 'win32':
     #     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-    # job_config = await read_job_config_from_db(job_id)
-
-    job_config = JOB_CONFIGS[job_type]
-
-    job = set_job_address(job_config, location)
-
     global brand_name
     
     config = {"configurable": {"thread_id": thread_id}}
@@ -477,18 +761,27 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         else:
             # NEW SESSION - Start fresh workflow
             print(f"[NEW SESSION] No existing state, starting new workflow for {session_id}")
+
+            # Shared per (job, config version, location); state only keeps the id
+            job_config = compile_job_config(job_id, job_type, location)
+            if job_config is None:
+                print(f"[NEW SESSION] No job config for job_id={job_id}, job_type={job_type}")
+                await websocket.send_json({
+                    "type": "error",
+                    "message": "This job is not available for applications right now."
+                })
+                await websocket.close()
+                return
             
             initial_state = ChatbotState(
                 messages=[],
-                questions=job["questions"],
-                scoring_model=job["scoring_model"],
+                job_config_id=job_config.config_id,
                 current_question_index=0,
                 answers={},
                 personal_details={},
                 ready_confirmed=False,
                 knockout_answers={},
                 current_knockout_question_index=0,
-                knockout_questions=job["knockout_questions"],
                 
                 email_attempt_count=0,
                 phone_attempt_count=0,
@@ -545,54 +838,19 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 gps_flag_reason="",
                 gps_distance_miles=0.0,
                 show_gps_ui=False,
+
+                transcript_seq=0,
             )
             
             # Start workflow with streaming (ONLY for new sessions)
-            async for event in graph_app.astream(initial_state, config=config, stream_mode="updates"):
-                for node_name, node_data in event.items():
-                    if node_data and "messages" in node_data:
-                        messages = node_data["messages"]
-                        
-                        # Check if this is delay_messages_node
-                        if node_name == "delay_messages":
-                            print("Processing delay_messages stage start...")
-                            
-                            for msg in messages[-2:]:   # only last two messages
-                                # Show typing for 1 second
-                                await websocket.send_json({"type": "typing"})
-                                await asyncio.sleep(0.7)
-                                
-                                print(msg.content)
-                                await asyncio.sleep(1.5)  # 3 second delay
-                                
-                                if isinstance(msg, AIMessage):
-                                    await websocket.send_json({
-                                        "type": "ai_message",
-                                        "content": msg.content,
-                                        "messageType": "body"
-                                    })
-                        else:
-                            # Normal processing - send last message only
-                            msg = messages[-1]
-                            print(msg.content)
-                            
-                            # Show typing for 1 second
-                            await websocket.send_json({"type": "typing"})
-                            await asyncio.sleep(0.7)
-                            
-                            if isinstance(msg, AIMessage):
-                                
-                                await websocket.send_json({
-                                    "type": "ai_message",
-                                    "content": msg.content,
-                                    "messageType": "intro",
-                                })
+            await stream_workflow(websocket, initial_state, config, default_message_type="intro")
         
         while True:
     
             # Check if workflow completed
             snapshot = await graph_app.aget_state(config)
             if not snapshot.next:
+                await record_transcript(config, session_id)
                 await websocket.send_json({
                     "type": "workflow_complete",
                 })
@@ -643,291 +901,55 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 await websocket.send_json({"type": "pong"})
                 continue
             
-            # Handle address data from frontend autocomplete UI
-            if message_data.get("type") == "address_data":
-                address_payload = message_data.get("data", {})
-
-                print(f"Received address data: {address_payload}")
-
-                current_state = await graph_app.aget_state(config)
-                current_messages = current_state.values.get("messages", [])
-
-                # Store address as JSON string in human message
-                import json as _json
-                address_message = _json.dumps(address_payload)
-
-                # Show friendly confirmation to user
-                display_address = address_payload.get("full", address_payload.get("street", "Address received"))
-
-                await graph_app.aupdate_state(
-                    config,
-                    {
-                        "address": address_payload,
-                        "messages": current_messages + [HumanMessage(content=address_message)]
-                    }
-                )
-
-                # Resume workflow
-                async for event in graph_app.astream(None, config=config, stream_mode="updates"):
-                    for node_name, node_data in event.items():
-                        print(f"[DEBUG] Processing node: {node_name}")
-
-                        if node_data and "messages" in node_data:
-                            messages = node_data["messages"]
-                            msg = messages[-1]
-
-                            messageType = "questions" if node_name in [
-                                "ask_gps_verification"
-                            ] else "body"
-
-                            show_gps_ui = (
-                                node_name == "ask_gps_verification" and
-                                node_data.get("show_gps_ui", False)
-                            )
-
-                            await websocket.send_json({"type": "typing"})
-                            await asyncio.sleep(0.7)
-
-                            if isinstance(msg, AIMessage):
-                                await websocket.send_json({
-                                    "type": "ai_message",
-                                    "content": msg.content,
-                                    "messageType": messageType,
-                                    "show_gps_ui": show_gps_ui
-                                })
-
-                continue   # skip normal message processing
-
-
-            # Handle GPS coordinates from frontend location button
-            if message_data.get("type") == "gps_data":
-                gps_payload = message_data.get("data", {})
-
-                print(f"Received GPS data: lat={gps_payload.get('lat')}, lng={gps_payload.get('lng')}")
+            message_type = message_data.get("type")
 
-                current_state = await graph_app.aget_state(config)
-                current_messages = current_state.values.get("messages", [])
+            # Widget submissions resume the node waiting on interrupt() with a typed value
+            if message_type in WIDGET_MESSAGE_TYPES:
+                waiting_node = WIDGET_MESSAGE_TYPES[message_type]
+                if waiting_node not in snapshot.next:
+                    print(f"[WIDGET] Ignoring {message_type}, workflow is waiting on {snapshot.next}")
+                    continue
 
-                import json as _json
-                gps_message = _json.dumps(gps_payload)
-                
-                # Handle None explicitly (user skipped = lat/lng sent as null)
-                raw_lat = gps_payload.get("lat")
-                raw_lng = gps_payload.get("lng")
-                gps_lat = float(raw_lat) if raw_lat is not None else 0.0
-                gps_lng = float(raw_lng) if raw_lng is not None else 0.0
-                
-                await graph_app.aupdate_state(
-                    config,
-                    {
-                        "gps_lat": gps_lat,
-                        "gps_lng": gps_lng,
-                        "messages": current_messages + [HumanMessage(content=gps_message)]
-                    }
-                )
-
-                # Resume workflow
-                async for event in graph_app.astream(None, config=config, stream_mode="updates"):
-                    for node_name, node_data in event.items():
-                        print(f"[DEBUG] Processing node: {node_name}")
-
-                        if node_data and "messages" in node_data:
-                            messages = node_data["messages"]
-                            msg = messages[-1]
-
-                            messageType = "questions" if node_name in [
-                                "ask_question"
-                            ] else "body"
-
-                            await websocket.send_json({"type": "typing"})
-                            await asyncio.sleep(0.7)
-
-                            if isinstance(msg, AIMessage):
-                                await websocket.send_json({
-                                    "type": "ai_message",
-                                    "content": msg.content,
-                                    "messageType": messageType
-                                })
+                widget_data = message_data.get("data")
 
-                continue   # skip normal message processing
+                if message_type == "id_verify_confirmed":
+                    print(f"[ID_VERIFY] User confirmed completion for session {session_id}")
 
+                    id_verified      = snapshot.values.get("id_verified", False)
+                    id_verify_failed = snapshot.values.get("id_verify_failed", False)
 
-            # Handle user confirming they've completed ID verification
-            if message_data.get("type") == "id_verify_confirmed":
-                print(f"[ID_VERIFY] User confirmed completion for session {session_id}")
+                    if not id_verified and not id_verify_failed:
+                        # Webhook hasn't arrived yet — tell user to wait
+                        await websocket.send_json({
+                            "type": "ai_message",
+                            "content": "We're still processing your verification — it should only take a moment. Please try again in a few seconds.",
+                            "messageType": "body"
+                        })
+                        continue
 
-                current_state = await graph_app.aget_state(config)
-                id_verified   = current_state.values.get("id_verified", False)
-                id_verify_failed = current_state.values.get("id_verify_failed", False)
+                    widget_data = {"verified": id_verified}
 
-                if not id_verified and not id_verify_failed:
-                    # Webhook hasn't arrived yet — tell user to wait
+                try:
+                    resume_value = parse_widget_input(message_type, widget_data)
+                except ValueError as e:
+                    print(f"[WIDGET] Invalid {message_type} payload: {e}")
                     await websocket.send_json({
                         "type": "ai_message",
-                        "content": "We're still processing your verification — it should only take a moment. Please try again in a few seconds.",
-                        "messageType": "body"
+                        "content": "Sorry, I couldn't read that. Could you please try again?",
+                        "messageType": "body",
+                        WIDGET_UI_FLAGS[message_type]: True,
                     })
                     continue
 
-                # Webhook already updated state — resume graph
-                current_messages = current_state.values.get("messages", [])
-                await graph_app.aupdate_state(
-                    config,
-                    {"messages": current_messages + [HumanMessage(content="id_verify_confirmed")]}
-                )
-
-                async for event in graph_app.astream(None, config=config, stream_mode="updates"):
-                    for node_name, node_data in event.items():
-                        print(f"[DEBUG] Processing node: {node_name}")
-
-                        if node_data and "messages" in node_data:
-                            messages = node_data["messages"]
-
-                            if node_name == "process_id_result":
-                                # Send both success/fail messages with typing delays
-                                for msg in messages[-2:]:
-                                    await websocket.send_json({"type": "typing"})
-                                    await asyncio.sleep(0.7)
-                                    await asyncio.sleep(1.2)
-                                    if isinstance(msg, AIMessage):
-                                        await websocket.send_json({
-                                            "type": "ai_message",
-                                            "content": msg.content,
-                                            "messageType": "body"
-                                        })
-                            else:
-                                messageType = "questions" if node_name in [
-                                    "ask_knockout_question", "ask_name", "ask_email",
-                                    "ask_phone", "ask_question", "ask_work_experience",
-                                    "ask_education", "ask_id_verification"
-                                ] else "body"
-
-                                await websocket.send_json({"type": "typing"})
-                                await asyncio.sleep(0.7)
-
-                                msg = messages[-1]
-                                if isinstance(msg, AIMessage):
-                                    await websocket.send_json({
-                                        "type": "ai_message",
-                                        "content": msg.content,
-                                        "messageType": messageType
-                                    })
-
-                continue   # Skip normal message processing
-            
-            
-            # Handle work experience data submission
-            if message_data.get("type") == "work_experience_data":
-                work_exp_data = message_data.get("data", [])
-                
-                print(f"Received work experiences: {work_exp_data}")
-                
-                # Get current state
-                current_state = await graph_app.aget_state(config)
-                current_messages = current_state.values.get("messages", [])
-                
-                #Store all experiences (data is already an array)
-                # Format work experience message
-                if isinstance(work_exp_data, list):
-                    experiences_text = ", ".join([
-                        f"{exp['role']} at {exp['company']} ({exp['startDate']} to {exp['endDate']})" 
-                        for exp in work_exp_data
-                    ])
-                    work_exp_message = f"Work experience: {experiences_text}"
-                else:
-                    # Fallback for single experience (backward compatibility)
-                    work_exp_message = f"Added: {work_exp_data['role']} at {work_exp_data['company']}"
-                
-                # Update state
-                await graph_app.aupdate_state(
-                    config,
-                    {
-                        "work_experience": work_exp_data if isinstance(work_exp_data, list) else [work_exp_data],
-                        "messages": current_messages + [HumanMessage(content=work_exp_message)]
-                    }
-                )
-    
-                
-                # print(f"[DEBUG] Resuming workflow after work experience")  # ADD DEBUG
-                
-                # Continue workflow
-                async for event in graph_app.astream(None, config=config, stream_mode="updates"):
-                    for node_name, node_data in event.items():
-                        print(f"[DEBUG] Processing node: {node_name}")  # ADD DEBUG
-                        
-                        if node_data and "messages" in node_data:
-                            messages = node_data["messages"]
-                            
-                            if node_name == "delay_messages":
-                                print("Processing delay_messages after work exp...")
-                                
-                                for msg in messages[-2:]:
-                                    await websocket.send_json({"type": "typing"})
-                                    await asyncio.sleep(0.7)
-                                    print(msg.content)
-                                    await asyncio.sleep(1.5)
-                                    
-                                    if isinstance(msg, AIMessage):
-                                        await websocket.send_json({
-                                            "type": "ai_message",
-                                            "content": msg.content,
-                                            "messageType": "body"
-                                        })
-                            else:
-                                messageType = "body"
-                                if node_name in ["ask_knockout_question", "ask_name", "ask_email", "ask_phone", "ask_question", "ask_work_experience", "ask_education", "ask_id_verification"]:
-                                    messageType = "questions"
-
-
-                                
-                                await websocket.send_json({"type": "typing"})
-                                await asyncio.sleep(0.7)
-                                
-                                msg = messages[-1]
-                                print(msg.content)
-                                if isinstance(msg, AIMessage):
-                                    
-                                    # Check if we should show work experience UI and education UI
-                                    show_ui = (node_name == "store_work_experience_response" and node_data.get("show_work_experience_ui", False))
-                                    show_edu_ui = (node_name == "ask_education" and node_data.get("show_education_ui", False))
-                                    show_address_ui = (node_name == "ask_address" and node_data.get("show_address_ui", False))  
-                                    show_gps_ui = (node_name == "ask_gps_verification" and node_data.get("show_gps_ui", False))
-
-                                    if node_name == "ask_id_verification":
-                                        for msg in messages[-3:]:
-                                            if isinstance(msg, AIMessage):
-                                                await websocket.send_json({"type": "typing"})
-                                                await asyncio.sleep(0.7)
-                                                await asyncio.sleep(1.2)
-                                                is_last = (msg == messages[-1])
-                                                await websocket.send_json({
-                                                    "type": "ai_message",
-                                                    "content": msg.content,
-                                                    "messageType": "body",
-                                                    "show_id_verify_ui": is_last,
-                                                    "id_verify_link": node_data.get("id_verify_link", "") if is_last else "",
-                                                })
-                                        continue
-                                    
-                                    show_id_verify_ui  = (node_name == "ask_id_verification"  and node_data.get("show_id_verify_ui", False))
-                                    id_verify_link     = node_data.get("id_verify_link", "") if show_id_verify_ui else ""
-                                    
-                                    await websocket.send_json({
-                                        "type": "ai_message",
-                                        "content": msg.content,
-                                        "messageType": messageType,
-                                        "show_work_experience_ui": show_ui,
-                                        "show_education_ui": show_edu_ui,
-                                        "show_address_ui": show_address_ui,  
-                                        "show_gps_ui": show_gps_ui,
-                                        "show_id_verify_ui": show_id_verify_ui,
-                                        "id_verify_link": id_verify_link,
-                                    })
-                
-                continue  # Skip normal message processing
-            
-            if message_data.get("type") != "user_message":
-                print(f"[DEBUG] Skipping non-user message type: {message_data.get('type')}")  # ADD DEBUG
+                print(f"[WIDGET] Resuming {waiting_node} with {message_type}: {resume_value}")
+
+                await record_transcript(config, session_id)
+                await stream_workflow(websocket, Command(resume=resume_value), config)
+
+                continue   # skip normal message processing
+
+            if message_type != "user_message":
+                print(f"[DEBUG] Skipping non-user message type: {message_type}")  # ADD DEBUG
                 continue
             
             # Convert to string first
@@ -939,95 +961,37 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 print(f"[DEBUG] Empty user input, skipping")  # ADD DEBUG
                 continue
             
-            current_state = await graph_app.aget_state(config)
-            current_messages = current_state.values.get("messages", [])
-            
-            # print(f"[DEBUG] Current messages count: {len(current_messages)}")  # ADD DEBUG
-                        
-            # Normal message processing
-            await graph_app.aupdate_state(
-                config,
-                {"messages": current_messages + [HumanMessage(content=user_input)]}
-            )
+            # Paused inside a widget node: resume it with the text, or re-show the widget.
+            # Re-running the node with None would only hit interrupt() again. Found from
+            # snapshot.next, not snapshot.interrupts: any aupdate_state (e.g. the ID
+            # webhook's) clears the pending interrupt while the node still waits.
+            waiting_node = next((node for node in snapshot.next if node in WIDGET_NODES), None)
+            if waiting_node:
+                resume_value = parse_typed_input(waiting_node, user_input)
+
+                if resume_value is not None:
+                    print(f"[WIDGET] Resuming {waiting_node} with typed text")
+                    await record_transcript(config, session_id)
+                    await stream_workflow(websocket, Command(resume=resume_value), config)
+                    continue
+
+                widget_type = WIDGET_NODES[waiting_node]
+                print(f"[WIDGET] Text received while {waiting_node} waits for its widget")
+                await websocket.send_json({
+                    "type": "ai_message",
+                    "content": WIDGET_PROMPTS.get(widget_type, "Please use the form below to continue."),
+                    "messageType": "body",
+                    WIDGET_UI_FLAGS[widget_type]: True,
+                })
+                continue
+
+            # Normal message processing - log pending messages and append the reply in one update
+            await record_transcript(config, session_id, [HumanMessage(content=user_input)])
             
             print(f"[DEBUG] Resuming workflow after user message")  # ADD DEBUG
             
             # Resume workflow with streaming
-            async for event in graph_app.astream(None, config=config, stream_mode="updates"):
-                for node_name, node_data in event.items():
-                    print(f"[DEBUG] Processing node: {node_name}")  # ADD DEBUG
-                    
-                    if node_data and "messages" in node_data:
-                        messages = node_data["messages"]
-                        
-                        # Check if this is delay_messages_node
-                        if node_name == "delay_messages":
-                            print("Processing delay_messages stage end...")
-
-                            for msg in messages[-2:]:   # only last two messages
-                                
-                                # Show typing for 1 second
-                                await websocket.send_json({"type": "typing"})
-                                await asyncio.sleep(0.7)
-                                
-                                print(msg.content)
-                                await asyncio.sleep(1.5)  # 3 second delay
-                                
-                                if isinstance(msg, AIMessage):
-                                    await websocket.send_json({
-                                        "type": "ai_message",
-                                        "content": msg.content,
-                                        "messageType": "body"
-                                    })
-                        else:
-                            messageType = "body"
-                            
-                            if node_name in ["ask_knockout_question", "ask_name", "ask_email", "ask_phone", "ask_question", "ask_work_experience", "ask_education", "ask_id_verification"]:
-                                messageType = "questions"
-                            
-                            if node_name == "ask_id_verification":
-                                for msg in messages[-3:]:
-                                    if isinstance(msg, AIMessage):
-                                        await websocket.send_json({"type": "typing"})
-                                        await asyncio.sleep(0.7)
-                                        await asyncio.sleep(1.2)
-                                        is_last = (msg == messages[-1])
-                                        await websocket.send_json({
-                                            "type": "ai_message",
-                                            "content": msg.content,
-                                            "messageType": "body",
-                                            "show_id_verify_ui": is_last,
-                                            "id_verify_link": node_data.get("id_verify_link", "") if is_last else "",
-                                        })
-                                continue
-                            # Show typing for 1 second
-                            await websocket.send_json({"type": "typing"})
-                            await asyncio.sleep(0.7)
-                            
-                            msg = messages[-1]
-                            print(msg.content)
-                            if isinstance(msg, AIMessage):
-                                
-                                # Check if we should show work experience UI and education UI
-                                show_ui = (node_name == "store_work_experience_response" and node_data.get("show_work_experience_ui", False))
-                                show_edu_ui = (node_name == "ask_education" and node_data.get("show_education_ui", False))
-                                show_address_ui = (node_name == "ask_address" and node_data.get("show_address_ui", False))  
-                                show_gps_ui = (node_name == "ask_gps_verification" and node_data.get("show_gps_ui", False))
-
-                                show_id_verify_ui  = (node_name == "ask_id_verification"  and node_data.get("show_id_verify_ui", False))
-                                id_verify_link     = node_data.get("id_verify_link", "") if show_id_verify_ui else ""
-                                
-                                await websocket.send_json({
-                                    "type": "ai_message",
-                                    "content": msg.content,
-                                    "messageType": messageType,
-                                    "show_work_experience_ui": show_ui,
-                                    "show_education_ui": show_edu_ui,
-                                    "show_address_ui": show_address_ui,
-                                    "show_gps_ui": show_gps_ui,
-                                    "show_id_verify_ui": show_id_verify_ui,
-                                    "id_verify_link": id_verify_link, 
-                                })
+            await stream_workflow(websocket, None, config)
     
     except WebSocketDisconnect:
         print(f"Client disconnected: {session_id}")
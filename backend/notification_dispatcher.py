@@ -0,0 +1,319 @@
+"""
+Async dispatcher for outbound notifications (Brevo email, Plivo OTP SMS,
+Twilio scheduling SMS).
+
+Callers hand over a send coroutine and get a DeliveryHandle back right away;
+awaiting the handle gives the send result once it is delivered (or the last
+failed result after retries). Each provider has:
+
+    - a priority queue, so OTPs go out before bulk scheduling SMS
+    - a token bucket (<PROVIDER>_RATE_PER_SECOND, <PROVIDER>_BURST)
+    - a few worker tasks, started on first use on the running loop
+
+A send counts as delivered when it returns a truthy value. Failed or raising
+sends are retried with backoff up to the handle's max_attempts, except
+PermanentSendError (e.g. the provider may already have accepted the message,
+so a retry could deliver it twice). Recent handles are kept by id for
+delivery-status lookups.
+"""
+
+import asyncio
+import itertools
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Lower sends first
+PRIORITY_OTP = 0
+PRIORITY_TRANSACTIONAL = 1
+PRIORITY_BULK = 2
+
+PROVIDERS = {
+    "brevo": {
+        "rate": float(os.getenv("BREVO_RATE_PER_SECOND", "10")),
+        "burst": int(os.getenv("BREVO_BURST", "20")),
+        "workers": int(os.getenv("BREVO_WORKERS", "4")),
+    },
+    "plivo": {
+        "rate": float(os.getenv("PLIVO_RATE_PER_SECOND", "5")),
+        "burst": int(os.getenv("PLIVO_BURST", "10")),
+        "workers": int(os.getenv("PLIVO_WORKERS", "4")),
+    },
+    "twilio": {
+        # One message per second per long code unless the number is upgraded
+        "rate": float(os.getenv("TWILIO_RATE_PER_SECOND", "1")),
+        "burst": int(os.getenv("TWILIO_BURST", "5")),
+        "workers": int(os.getenv("TWILIO_WORKERS", "2")),
+    },
+}
+
+NOTIFY_RETRY_BASE_SECONDS = float(os.getenv("NOTIFY_RETRY_BASE_SECONDS", "2"))
+NOTIFY_RETRY_MAX_SECONDS = float(os.getenv("NOTIFY_RETRY_MAX_SECONDS", "60"))
+NOTIFY_RECENT_DELIVERIES = int(os.getenv("NOTIFY_RECENT_DELIVERIES", "2000"))
+
+
+class PermanentSendError(Exception):
+    """Raised by a send to fail its handle right away, without retries"""
+
+
+class TokenBucket:
+    """Classic token bucket; acquire() waits until a token is available"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class DeliveryHandle:
+    """Awaitable result of one dispatched notification"""
+
+    def __init__(self, provider: str, send, priority: int, description: str, max_attempts: int):
+        self.id = str(uuid.uuid4())
+        self.provider = provider
+        self.priority = priority
+        self.description = description
+        self.max_attempts = max_attempts
+        self.status = "queued"
+        self.attempts = 0
+        self.error = None
+        self.created_at = time.time()
+        self.delivered_at = None
+        self._send = send
+        self._enqueued_at = time.monotonic()
+        self._future = asyncio.get_running_loop().create_future()
+
+    def __await__(self):
+        return asyncio.shield(self._future).__await__()
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "provider": self.provider,
+            "priority": self.priority,
+            "description": self.description,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "created_at": self.created_at,
+            "delivered_at": self.delivered_at,
+        }
+
+
+class _ProviderQueue:
+    def __init__(self, name: str, rate: float, burst: int, workers: int):
+        self.name = name
+        self.queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self.bucket = TokenBucket(rate, burst)
+        self.worker_count = workers
+        self.workers: list = []
+        self.metrics = {
+            "dispatched": 0,
+            "delivered": 0,
+            "failed": 0,
+            "retries": 0,
+            "queue_wait_ms_total": 0.0,
+            "sends": 0,
+        }
+
+
+# provider -> _ProviderQueue, bound to the loop that created it
+_queues: dict = {}
+_loop = None
+_sequence = itertools.count()
+
+# handle id -> DeliveryHandle, most recent last
+_deliveries: OrderedDict = OrderedDict()
+
+
+def _get_queue(provider: str) -> _ProviderQueue:
+    """Queue and workers for a provider, created on first use on the current loop"""
+    global _loop
+
+    loop = asyncio.get_running_loop()
+    if _loop is not loop:
+        # New event loop (tests, second app): queues can't be shared across loops
+        _queues.clear()
+        _loop = loop
+
+    provider_queue = _queues.get(provider)
+    if provider_queue is None:
+        config = PROVIDERS[provider]
+        provider_queue = _ProviderQueue(provider, config["rate"], config["burst"], config["workers"])
+        provider_queue.workers = [
+            asyncio.create_task(_worker(provider_queue)) for _ in range(provider_queue.worker_count)
+        ]
+        _queues[provider] = provider_queue
+        print(f"[NOTIFY] {provider} dispatcher started ({provider_queue.worker_count} worker(s), {config['rate']}/s)")
+    return provider_queue
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(NOTIFY_RETRY_BASE_SECONDS * 2 ** (attempts - 1), NOTIFY_RETRY_MAX_SECONDS)
+
+
+async def _worker(provider_queue: _ProviderQueue) -> None:
+    while True:
+        # Item first, then the token, so idle workers don't hold tokens (the
+        # burst stays the bucket's). Then swap for anything more urgent that
+        # was queued meanwhile, so no worker sends a bulk item ahead of an OTP
+        item = await provider_queue.queue.get()
+        await provider_queue.bucket.acquire()
+        item = _most_urgent(provider_queue.queue, item)
+        _, _, handle = item
+        try:
+            await _attempt(provider_queue, handle)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[NOTIFY] {provider_queue.name} worker error: {e}")
+        finally:
+            provider_queue.queue.task_done()
+
+
+def _most_urgent(queue: asyncio.PriorityQueue, item: tuple) -> tuple:
+    """The held item, or the queue's head if that sorts first (the held one goes back)"""
+    try:
+        head = queue.get_nowait()
+    except asyncio.QueueEmpty:
+        return item
+
+    if head[:2] < item[:2]:
+        item, head = head, item
+    queue.put_nowait(head)
+    queue.task_done()
+    return item
+
+
+async def _attempt(provider_queue: _ProviderQueue, handle: DeliveryHandle) -> None:
+    metrics = provider_queue.metrics
+    metrics["sends"] += 1
+    metrics["queue_wait_ms_total"] += (time.monotonic() - handle._enqueued_at) * 1000
+
+    handle.status = "sending"
+    handle.attempts += 1
+    result = None
+    retryable = True
+    try:
+        result = await handle._send()
+        handle.error = None if result else "provider returned failure"
+    except PermanentSendError as e:
+        handle.error = str(e)
+        retryable = False
+    except Exception as e:
+        handle.error = str(e)
+
+    if result:
+        handle.status = "delivered"
+        handle.delivered_at = time.time()
+        metrics["delivered"] += 1
+        if not handle._future.done():
+            handle._future.set_result(result)
+        return
+
+    if retryable and handle.attempts < handle.max_attempts:
+        delay = _retry_delay(handle.attempts)
+        handle.status = "retrying"
+        metrics["retries"] += 1
+        print(f"[NOTIFY] {handle.description} attempt {handle.attempts} failed ({handle.error}), retry in {delay:.1f}s")
+        asyncio.get_running_loop().call_later(delay, _enqueue, provider_queue, handle)
+        return
+
+    handle.status = "failed"
+    metrics["failed"] += 1
+    print(f"[NOTIFY] {handle.description} failed after {handle.attempts} attempt(s): {handle.error}")
+    if not handle._future.done():
+        handle._future.set_result(result)
+
+
+def _enqueue(provider_queue: _ProviderQueue, handle: DeliveryHandle) -> None:
+    handle._enqueued_at = time.monotonic()
+    provider_queue.queue.put_nowait((handle.priority, next(_sequence), handle))
+
+
+def dispatch(
+    provider: str,
+    send,
+    *,
+    priority: int = PRIORITY_TRANSACTIONAL,
+    description: str = "",
+    max_attempts: int = 3,
+) -> DeliveryHandle:
+    """
+    Queue a notification for delivery.
+
+    Args:
+        provider: "brevo", "plivo" or "twilio" (selects queue and rate limit)
+        send: Zero-argument coroutine function doing the actual send;
+              a truthy return value means delivered
+        priority: PRIORITY_OTP, PRIORITY_TRANSACTIONAL or PRIORITY_BULK
+        description: Label for logs and status lookups
+        max_attempts: Total attempts before the handle resolves as failed
+
+    Returns:
+        DeliveryHandle: Await it for the send result
+    """
+    provider_queue = _get_queue(provider)
+    handle = DeliveryHandle(provider, send, priority, description or provider, max_attempts)
+
+    _deliveries[handle.id] = handle
+    while len(_deliveries) > NOTIFY_RECENT_DELIVERIES:
+        _deliveries.popitem(last=False)
+
+    provider_queue.metrics["dispatched"] += 1
+    _enqueue(provider_queue, handle)
+    return handle
+
+
+def get_delivery_status(delivery_id: str) -> dict | None:
+    """Status of a recent delivery by handle id"""
+    handle = _deliveries.get(delivery_id)
+    return handle.to_dict() if handle is not None else None
+
+
+async def stop_dispatcher() -> None:
+    """Cancel the workers on shutdown (queued notifications are dropped)"""
+    for provider_queue in _queues.values():
+        for task in provider_queue.workers:
+            task.cancel()
+        await asyncio.gather(*provider_queue.workers, return_exceptions=True)
+    _queues.clear()
+    print("[NOTIFY] Dispatcher stopped")
+
+
+def dispatcher_metrics() -> dict:
+    """Per-provider queue depth, outcomes and average queue wait for /metrics"""
+    result = {}
+    for name, provider_queue in _queues.items():
+        metrics = provider_queue.metrics
+        sends = metrics["sends"]
+        result[name] = {
+            "dispatched": metrics["dispatched"],
+            "delivered": metrics["delivered"],
+            "failed": metrics["failed"],
+            "retries": metrics["retries"],
+            "queue_depth": provider_queue.queue.qsize(),
+            "avg_queue_wait_ms": round(metrics["queue_wait_ms_total"] / sends, 1) if sends else 0.0,
+        }
+    return result
@@ -0,0 +1,273 @@
+"""
+Offline reverse geocoder for the GPS city/state cross-check.
+
+verify_location only needs the locality, admin area and postal code of the
+candidate's GPS point. This answers that from a bundled places/postal
+dataset with no network call; Google is only used when the answer can't be
+trusted: the nearest place is too far away (or not in the data), or the
+nearest few places disagree on city/state, as they do near a city line.
+
+Dataset:
+    Source is a GeoNames postal-code dump (tab-separated: country, postal
+    code, place name, admin1 name, admin1 code, ..., latitude, longitude,
+    accuracy), e.g. https://download.geonames.org/export/zip/US.zip.
+    Compile it once into a sorted NumPy file that is memory-mapped at startup:
+
+        python offline_geocoder.py build US.txt data/us_places.npy
+
+    OFFLINE_GEOCODE_DATASET points at the .npy (or a .tsv, parsed into
+    memory - fine for small files such as data/us_places_sample.tsv).
+
+Index:
+    Records are sorted by grid cell (OFFLINE_GEOCODE_GRID_DEGREES, stored in
+    the .npy's sidecar .json). A lookup binary-searches the 3x3 block of cells
+    around the point and takes the nearest OFFLINE_GEOCODE_AGREE_K records
+    among them; the nearest one is the answer if they all agree.
+"""
+
+import json
+import math
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from location_services import EARTH_RADIUS_MILES
+
+load_dotenv()
+
+OFFLINE_GEOCODE_DATASET = os.getenv("OFFLINE_GEOCODE_DATASET", "")
+OFFLINE_GEOCODE_GRID_DEGREES = float(os.getenv("OFFLINE_GEOCODE_GRID_DEGREES", "0.1"))
+# Farther than this from the nearest known place = low confidence, ask Google
+OFFLINE_GEOCODE_MAX_MILES = float(os.getenv("OFFLINE_GEOCODE_MAX_MILES", "2"))
+# This many nearest places must share city and state, else ask Google
+OFFLINE_GEOCODE_AGREE_K = int(os.getenv("OFFLINE_GEOCODE_AGREE_K", "3"))
+
+PLACE_DTYPE = np.dtype([
+    ("cell", np.int64),
+    ("lat", np.float32),
+    ("lng", np.float32),
+    ("country", "S2"),
+    ("state", "S8"),
+    ("zip", "S10"),
+    ("city", "S48"),
+])
+
+_geocoder = None
+
+_metrics = {
+    "lookups": 0,
+    "confident": 0,
+    "low_confidence": 0,
+    "total_us": 0.0,
+}
+
+
+def _cell_ids(lats, lngs, grid: float):
+    """Row-major grid cell id for each point (works on scalars and arrays)"""
+    rows = np.floor((np.asarray(lats, dtype=np.float64) + 90.0) / grid).astype(np.int64)
+    cols = np.floor((np.asarray(lngs, dtype=np.float64) + 180.0) / grid).astype(np.int64)
+    return rows * (int(math.ceil(360.0 / grid)) + 1) + cols
+
+
+def parse_places_tsv(path: str, grid: float = OFFLINE_GEOCODE_GRID_DEGREES) -> np.ndarray:
+    """Read a GeoNames postal-code file into a cell-sorted PLACE_DTYPE array"""
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 11 or not fields[9] or not fields[10]:
+                continue
+            rows.append((
+                0,
+                float(fields[9]),
+                float(fields[10]),
+                fields[0].encode("utf-8")[:2],
+                fields[4].encode("utf-8")[:8],
+                fields[1].encode("utf-8")[:10],
+                fields[2].encode("utf-8")[:48],
+            ))
+
+    places = np.array(rows, dtype=PLACE_DTYPE)
+    places["cell"] = _cell_ids(places["lat"], places["lng"], grid)
+    places.sort(order="cell", kind="stable")
+    return places
+
+
+def build_dataset(source_path: str, output_path: str, grid: float = OFFLINE_GEOCODE_GRID_DEGREES) -> int:
+    """Compile a GeoNames postal-code file into a memory-mappable .npy (+ .json sidecar)"""
+    places = parse_places_tsv(source_path, grid)
+    np.save(output_path, places)
+    with open(output_path + ".json", "w") as f:
+        json.dump({"grid_degrees": grid, "count": len(places), "source": os.path.basename(source_path)}, f)
+
+    print(f"[OFFLINE_GEOCODE] Wrote {len(places)} place(s) to {output_path}")
+    return len(places)
+
+
+class OfflineGeocoder:
+    """Nearest-place lookup over a cell-sorted, possibly memory-mapped, places array"""
+
+    def __init__(self, places: np.ndarray, grid: float):
+        self.places = places
+        self.grid = grid
+        self.row_width = int(math.ceil(360.0 / grid)) + 1
+
+        # Distinct cells and where each one starts; only the cell column is read
+        self.cells, self.starts = np.unique(places["cell"], return_index=True)
+        self.ends = np.append(self.starts[1:], len(places))
+
+        self.lat_r = np.radians(places["lat"].astype(np.float64))
+        self.lng_r = np.radians(places["lng"].astype(np.float64))
+
+    @classmethod
+    def load(cls, path: str) -> "OfflineGeocoder":
+        if path.endswith(".npy"):
+            with open(path + ".json") as f:
+                grid = json.load(f)["grid_degrees"]
+            return cls(np.load(path, mmap_mode="r"), grid)
+        return cls(parse_places_tsv(path), OFFLINE_GEOCODE_GRID_DEGREES)
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def _candidates(self, lat: float, lng: float) -> np.ndarray:
+        row = math.floor((lat + 90.0) / self.grid)
+        col = math.floor((lng + 180.0) / self.grid)
+        center = row * self.row_width + col
+
+        # The three rows of the 3x3 block are each one contiguous run of cells
+        ranges = []
+        for dr in (-1, 0, 1):
+            first = center + dr * self.row_width - 1
+            lo = int(np.searchsorted(self.cells, first, side="left"))
+            hi = int(np.searchsorted(self.cells, first + 2, side="right"))
+            if lo < hi:
+                ranges.append(np.arange(self.starts[lo], self.ends[hi - 1]))
+
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(ranges) if len(ranges) > 1 else ranges[0]
+
+    def nearest(self, lat: float, lng: float, k: int = 1) -> list[tuple[int, float]]:
+        """Indexes of the k nearest places in the surrounding cells and their distances in miles, closest first"""
+        candidates = self._candidates(lat, lng)
+        if not len(candidates) or k <= 0:
+            return []
+
+        lat_r, lng_r = math.radians(lat), math.radians(lng)
+        plat = self.lat_r[candidates]
+        a = (np.sin((plat - lat_r) / 2) ** 2 +
+             math.cos(lat_r) * np.cos(plat) * np.sin((self.lng_r[candidates] - lng_r) / 2) ** 2)
+        distances = 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        k = min(k, len(candidates))
+        if k < len(candidates):
+            best = np.argpartition(distances, k - 1)[:k]
+        else:
+            best = np.arange(len(candidates))
+        ordered = best[np.argsort(distances[best])]
+
+        return [(int(candidates[i]), float(distances[i])) for i in ordered]
+
+    def _components(self, index: int) -> dict:
+        place = self.places[index]
+        return {
+            "city": place["city"].decode("utf-8"),
+            "state": place["state"].decode("utf-8"),
+            "zip": place["zip"].decode("utf-8"),
+            "country": place["country"].decode("utf-8"),
+        }
+
+    def lookup(self, lat: float, lng: float) -> dict | None:
+        """
+        Reverse geocode to the nearest known place.
+
+        Confident only if that place is within OFFLINE_GEOCODE_MAX_MILES and
+        the OFFLINE_GEOCODE_AGREE_K nearest places all have its city and state;
+        a centroid across a city line can be nearer than the right one.
+
+        Returns:
+            dict: { "formatted_address", "components": { city, state, zip, country },
+                    "distance_miles", "confident" } or None if nothing is nearby
+        """
+        hits = self.nearest(lat, lng, OFFLINE_GEOCODE_AGREE_K)
+        if not hits:
+            return None
+
+        index, distance = hits[0]
+        components = self._components(index)
+        agree = all(
+            (other["city"], other["state"]) == (components["city"], components["state"])
+            for other in (self._components(i) for i, _ in hits[1:])
+        )
+        return {
+            "formatted_address": f"{components['city']}, {components['state']} {components['zip']}, {components['country']}",
+            "components": components,
+            "distance_miles": round(distance, 2),
+            "confident": distance <= OFFLINE_GEOCODE_MAX_MILES and agree,
+        }
+
+
+def load_offline_geocoder(path: str = None) -> OfflineGeocoder | None:
+    """
+    Load the places dataset (OFFLINE_GEOCODE_DATASET by default).
+    Call this once at app startup (from lifespan in main.py); without a
+    dataset every lookup falls back to Google.
+    """
+    global _geocoder
+
+    path = path or OFFLINE_GEOCODE_DATASET
+    if not path:
+        print("[OFFLINE_GEOCODE] No dataset configured, using Google only")
+        return None
+
+    try:
+        _geocoder = OfflineGeocoder.load(path)
+    except Exception as e:
+        print(f"[OFFLINE_GEOCODE] Could not load {path}: {e}")
+        _geocoder = None
+        return None
+
+    print(f"[OFFLINE_GEOCODE] Loaded {len(_geocoder)} place(s) from {path}")
+    return _geocoder
+
+
+def offline_reverse_geocode(lat: float, lng: float) -> dict | None:
+    """Confident local answer for a coordinate, or None (caller falls back to Google)"""
+    if _geocoder is None:
+        return None
+
+    started = time.perf_counter()
+    result = _geocoder.lookup(lat, lng)
+    _metrics["lookups"] += 1
+    _metrics["total_us"] += (time.perf_counter() - started) * 1e6
+
+    if result is None or not result["confident"]:
+        _metrics["low_confidence"] += 1
+        return None
+
+    _metrics["confident"] += 1
+    return result
+
+
+def offline_geocode_metrics() -> dict:
+    """Local hit rate and lookup latency for the /metrics endpoint"""
+    lookups = _metrics["lookups"]
+    return {
+        "places": len(_geocoder) if _geocoder is not None else 0,
+        "lookups": lookups,
+        "confident": _metrics["confident"],
+        "low_confidence": _metrics["low_confidence"],
+        "avg_lookup_us": round(_metrics["total_us"] / lookups, 1) if lookups else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) == 4 and sys.argv[1] == "build":
+        build_dataset(sys.argv[2], sys.argv[3])
+    else:
+        print("Usage: python offline_geocoder.py build <geonames.tsv> <output.npy>")
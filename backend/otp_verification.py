@@ -3,10 +3,12 @@
 import os
 import random
 import time
-import requests
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
-import plivo
+
+import http_client
+from notification_dispatcher import dispatch, DeliveryHandle, PRIORITY_OTP
+from phone_verifier import get_phone_verifier
 
 load_dotenv()
 
@@ -17,11 +19,6 @@ BREVO_API_KEY = os.getenv("BREVO_API_KEY")
 BREVO_FROM_EMAIL = os.getenv("BREVO_FROM_EMAIL")
 BREVO_FROM_NAME = os.getenv("BREVO_FROM_NAME")
 
-# Plivo Configuration
-PLIVO_AUTH_ID = os.getenv("PLIVO_AUTH_ID")
-PLIVO_AUTH_TOKEN = os.getenv("PLIVO_AUTH_TOKEN")
-PLIVO_VERIFY_APP_UUID = os.getenv("PLIVO_VERIFY_APP_UUID")
-
 # OTP Configuration
 OTP_EXPIRY_MINUTES_SMS = 4  # OTP expiry time in minutes
 OTP_EXPIRY_MINUTES_Email = 15  # OTP expiry time in minutes
@@ -36,9 +33,9 @@ def generate_session_id() -> int:
     return random.randint(100, 999)
 
 
-def send_email_otp(email: str, code: str, brand_name: str, user_name: str = "there") -> bool:
+def send_email_otp(email: str, code: str, brand_name: str, user_name: str = "there") -> DeliveryHandle:
     """
-    Send OTP code via email using Brevo
+    Send OTP code via email using Brevo (queued ahead of bulk notifications)
     
     Args:
         email: Recipient email address
@@ -47,11 +44,22 @@ def send_email_otp(email: str, code: str, brand_name: str, user_name: str = "the
         user_name: User's first name for personalization
         
     Returns:
-        bool: True if sent successfully, False otherwise
+        DeliveryHandle: Await it for True if sent successfully, False otherwise
     """
     
     print("send_email_otp function called...")
 
+    return dispatch(
+        "brevo",
+        lambda: _send_email_via_brevo(email, code, brand_name, user_name),
+        priority=PRIORITY_OTP,
+        description=f"Email OTP to {email}",
+        max_attempts=2,
+    )
+
+
+async def _send_email_via_brevo(email: str, code: str, brand_name: str, user_name: str) -> bool:
+
     try:
         if not BREVO_API_KEY:
             print("ERROR: BREVO_API_KEY not configured")
@@ -100,7 +108,7 @@ def send_email_otp(email: str, code: str, brand_name: str, user_name: str = "the
         }
         
         # Send email via Brevo API
-        response = requests.post(url, json=payload, headers=headers)
+        response = await http_client.post(url, json=payload, headers=headers, endpoint="brevo.send_email")
         
         if response.status_code == 201:
             print(f"Email OTP sent to {email} via Brevo: Status {response.status_code}")
@@ -115,37 +123,25 @@ def send_email_otp(email: str, code: str, brand_name: str, user_name: str = "the
 
 
 
-def create_phone_verify_session(phone: str) -> str | None:
+def create_phone_verify_session(phone: str) -> DeliveryHandle:
     """
     Create a Plivo Verify session which generates and sends OTP via SMS.
 
     Returns:
-        session_uuid (str) if successful, None if failed
+        DeliveryHandle: Await it for session_uuid (str) if successful, None if failed
     """
-    try:
-        if not PLIVO_AUTH_ID or not PLIVO_AUTH_TOKEN or not PLIVO_VERIFY_APP_UUID:
-            print("ERROR: Plivo Verify credentials not configured")
-            return None
-
-        client = plivo.RestClient(PLIVO_AUTH_ID, PLIVO_AUTH_TOKEN)
-
-        response = client.verify_session.create(
-            recipient=phone,
-            app_uuid=PLIVO_VERIFY_APP_UUID,
-            channel='sms'
-        )
-
-        session_uuid = response.session_uuid
-        print(f"Plivo Verify session created: {session_uuid}")
-        return session_uuid
-
-    except Exception as e:
-        print(f"Error creating Plivo Verify session: {e}")
-        return None
+    # Not retried: a timed-out attempt may still have sent a code
+    return dispatch(
+        "plivo",
+        lambda: get_phone_verifier().create_session(phone),
+        priority=PRIORITY_OTP,
+        description=f"SMS OTP to {phone}",
+        max_attempts=1,
+    )
 
 
 
-def validate_phone_otp(session_uuid: str, otp: str) -> tuple[bool, str]:
+async def validate_phone_otp(session_uuid: str, otp: str) -> tuple[bool, str]:
     """
     Validate OTP entered by user against the Plivo Verify session.
 
@@ -155,35 +151,7 @@ def validate_phone_otp(session_uuid: str, otp: str) -> tuple[bool, str]:
         (False, "expired") if session expired
         (False, "error") on unexpected failure
     """
-    try:
-        client = plivo.RestClient(PLIVO_AUTH_ID, PLIVO_AUTH_TOKEN)
-
-        response = client.verify_session.validate(
-            session_uuid=session_uuid,
-            otp=otp
-        )
-
-        print(f"Plivo Verify response: {response.message}")
-
-        if response.message and "validated" in response.message.lower():
-            return True, ""
-        else:
-            return False, "incorrect"
-
-    except plivo.exceptions.PlivoRestError as e:
-        error_msg = str(e).lower()
-        print(f"Plivo Verify error: {e}")
-
-        if "expired" in error_msg:
-            return False, "expired"
-        elif "invalid" in error_msg or "failed" in error_msg or "incorrect" in error_msg or "wrong" in error_msg:
-            return False, "incorrect"
-        else:
-            return False, "error"
-
-    except Exception as e:
-        print(f"Unexpected error validating OTP: {e}")
-        return False, "error"
+    return await get_phone_verifier().validate(session_uuid, otp)
 
 
 def is_otp_expired(timestamp: float, otp_channel: str) -> bool:
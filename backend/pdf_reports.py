@@ -0,0 +1,375 @@
+"""
+Applicant report PDF rendering.
+
+Reports are rendered in a process pool so reportlab layout never runs on the
+event loop (or competes for the GIL with it). Each worker builds a
+ReportTemplate once: page geometry, fonts, the static header/section/footer
+text and a word-width cache, so per candidate only the dynamic fields are
+measured and laid out.
+
+PDF_RENDER_MODE controls when reports are rendered:
+    eager - at submission, attached to the Xano record (default)
+    lazy  - on the first hiring-manager download (GET /reports/{session_id}/pdf);
+            Xano gets the download URL instead of the file
+
+Download URLs carry a per-report token (expiry + HMAC of the session id,
+keyed by REPORT_LINK_SECRET), never the API key.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache, partial
+from io import BytesIO
+
+from reportlab import rl_config
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from psycopg.types.json import Jsonb
+from dotenv import load_dotenv
+
+from db import get_pool
+
+load_dotenv()
+
+PDF_RENDER_MODE = os.getenv("PDF_RENDER_MODE", "eager")
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(os.cpu_count() or 1)))
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "http://localhost:8000")
+REPORT_LINK_SECRET = os.getenv("REPORT_LINK_SECRET", "")
+REPORT_LINK_TTL_DAYS = int(os.getenv("REPORT_LINK_TTL_DAYS", "30"))
+
+_executor: ProcessPoolExecutor | None = None
+_template = None
+
+# session_id -> in-flight render, so concurrent first downloads render once
+_rendering: dict = {}
+
+
+class ReportTemplate:
+    """Static layout shared by every report rendered in this process"""
+
+    def __init__(self):
+        # Binary Flate streams; the pure-Python ASCII85 pass was the
+        # single most expensive step of rendering a report
+        rl_config.useA85 = 0
+
+        self.width, self.height = letter
+        self.left = 1 * inch
+        self.text_width = self.width - 2 * inch
+
+        self.title = "Applicant Screening Report"
+        self.footer = "Confidential - For Internal Use Only"
+        self.sections = {
+            "info": "Applicant Information",
+            "score": "Screening Score",
+            "summary": "Hiring Manager Summary",
+            "answers": "Interview Responses",
+        }
+
+        self.space_width = stringWidth(" ", "Helvetica", 10)
+
+    @staticmethod
+    @lru_cache(maxsize=8192)
+    def word_width(word: str) -> float:
+        """Width of one summary word (Helvetica 10), cached across reports"""
+        return stringWidth(word, "Helvetica", 10)
+
+    def wrap(self, text: str) -> list[str]:
+        """Greedy word wrap to the text width, measuring each word once"""
+        lines = []
+        line = []
+        line_width = 0.0
+
+        for word in text.split():
+            width = self.word_width(word)
+            new_width = line_width + self.space_width + width if line else width
+            if new_width < self.text_width or not line:
+                line.append(word)
+                line_width = new_width
+            else:
+                lines.append(" ".join(line))
+                line = [word]
+                line_width = width
+
+        if line:
+            lines.append(" ".join(line))
+        return lines
+
+    def render(
+        self,
+        name: str,
+        email: str,
+        phone: str,
+        score: float,
+        total_score: float,
+        summary: str,
+        answers: dict,
+        status: str,
+    ) -> bytes:
+        c = canvas.Canvas(BytesIO(), pagesize=letter)
+        left, height = self.left, self.height
+
+        # Header
+        c.setFont("Helvetica-Bold", 20)
+        c.drawString(left, height - 1*inch, self.title)
+        c.setFont("Helvetica", 10)
+        c.drawString(left, height - 1.3*inch, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+
+        # Applicant info and score as one text block each
+        y = height - 2*inch
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(left, y, self.sections["info"])
+
+        y -= 0.3*inch
+        text = c.beginText(left, y)
+        text.setFont("Helvetica", 11, 0.25*inch)
+        text.textLines([f"Name: {name}", f"Email: {email}", f"Phone: {phone}"])
+        c.drawText(text)
+        y -= 0.5*inch
+
+        y -= 0.5*inch
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(left, y, self.sections["score"])
+
+        y -= 0.3*inch
+        percentage = (score / total_score * 100) if total_score > 0 else 0
+        c.setFont("Helvetica", 11)
+        c.drawString(left, y, f"Score: {score:.1f} / {total_score:.1f} ({percentage:.1f}%)")
+
+        y -= 0.25*inch
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(left, y, f"Status: {status.upper()}")
+
+        # Summary
+        y -= 0.5*inch
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(left, y, self.sections["summary"])
+
+        y -= 0.3*inch
+        summary_lines = self.wrap(summary)
+        if summary_lines:
+            text = c.beginText(left, y)
+            text.setFont("Helvetica", 10, 0.2*inch)
+            text.textLines(summary_lines)
+            c.drawText(text)
+        y -= 0.2*inch * len(summary_lines)
+
+        # Answers
+        y -= 0.3*inch
+        if y < 2*inch:  # New page if needed
+            c.showPage()
+            y = height - 1*inch
+
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(left, y, self.sections["answers"])
+        y -= 0.3*inch
+
+        for question, answer in answers.items():
+            if y < 1.5*inch:  # New page if needed
+                c.showPage()
+                y = height - 1*inch
+
+            c.setFont("Helvetica-Bold", 9)
+            c.drawString(left, y, f"Q: {question[:80]}...")  # Truncate long questions
+            y -= 0.2*inch
+
+            c.setFont("Helvetica", 9)
+            c.drawString(left + 0.2*inch, y, f"A: {answer[:80]}...")  # Truncate long answers
+            y -= 0.4*inch
+
+        # Footer
+        c.setFont("Helvetica", 8)
+        c.drawString(left, 0.5*inch, self.footer)
+
+        c.save()
+        return c.getpdfdata()
+
+
+def _init_worker() -> None:
+    """Process pool initializer: build the template once per worker"""
+    global _template
+    _template = ReportTemplate()
+
+
+def render_applicant_pdf(**fields) -> bytes:
+    """Render one report in the current process (fields as generate_applicant_pdf)"""
+    global _template
+    if _template is None:
+        _template = ReportTemplate()
+    return _template.render(**fields)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: the server process has threads and a running loop, don't fork it
+        _executor = ProcessPoolExecutor(
+            max_workers=PDF_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        print(f"[PDF] Render pool started ({PDF_RENDER_WORKERS} worker(s))")
+    return _executor
+
+
+def start_pdf_pool() -> None:
+    """Start the render workers up front (from lifespan in main.py)"""
+    if PDF_RENDER_MODE == "lazy" and not REPORT_LINK_SECRET:
+        raise ValueError("REPORT_LINK_SECRET must be set when PDF_RENDER_MODE=lazy")
+    _get_executor()
+
+
+async def render_applicant_pdf_async(**fields) -> bytes:
+    """Render in the process pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(render_applicant_pdf, **fields))
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the render workers on shutdown"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        print("[PDF] Render pool stopped")
+
+
+def _report_signature(session_id: str, expires: int) -> str:
+    return hmac.new(
+        REPORT_LINK_SECRET.encode(),
+        f"{session_id}:{expires}".encode(),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def report_download_url(session_id: str) -> str:
+    """Hiring-manager download link used in lazy mode (expires after REPORT_LINK_TTL_DAYS)"""
+    expires = int(time.time()) + REPORT_LINK_TTL_DAYS * 86400
+    token = f"{expires}.{_report_signature(session_id, expires)}"
+    return f"{PUBLIC_BASE_URL}/reports/{session_id}/pdf?token={token}"
+
+
+def verify_report_token(session_id: str, token: str) -> bool:
+    """True if token was issued for this report and hasn't expired"""
+    if not REPORT_LINK_SECRET:
+        return False
+
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _report_signature(session_id, int(expires)))
+
+
+async def setup_report_table() -> None:
+    """
+    Create the applicant_reports table if it doesn't exist.
+    Call this once at app startup (from lifespan in main.py).
+    """
+    async with get_pool().connection() as conn:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS applicant_reports (
+                session_id  TEXT        PRIMARY KEY,
+                fields      JSONB       NOT NULL,
+                pdf         BYTEA,
+                created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                rendered_at TIMESTAMPTZ
+            )
+        """)
+    print("[PDF] applicant_reports table ready")
+
+
+async def save_report_fields(session_id: str, fields: dict) -> None:
+    """Store the report inputs so the PDF can be rendered (again) on download"""
+    async with get_pool().connection() as conn:
+        await conn.execute("""
+            INSERT INTO applicant_reports (session_id, fields)
+            VALUES (%s, %s)
+            ON CONFLICT (session_id) DO UPDATE
+            SET fields = EXCLUDED.fields, pdf = NULL, rendered_at = NULL
+        """, (session_id, Jsonb(fields)))
+
+
+async def _render_and_store(session_id: str, fields: dict) -> bytes:
+    pdf = await render_applicant_pdf_async(**fields)
+
+    async with get_pool().connection() as conn:
+        await conn.execute("""
+            UPDATE applicant_reports SET pdf = %s, rendered_at = NOW()
+            WHERE session_id = %s
+        """, (pdf, session_id))
+
+    print(f"[PDF] Rendered report for {session_id} ({len(pdf)} bytes)")
+    return pdf
+
+
+async def get_report_pdf(session_id: str) -> bytes | None:
+    """
+    Return the stored PDF for a session, rendering it on first download.
+    Returns None if the session has no report.
+    """
+    async with get_pool().connection() as conn:
+        cur = await conn.execute(
+            "SELECT fields, pdf FROM applicant_reports WHERE session_id = %s",
+            (session_id,)
+        )
+        row = await cur.fetchone()
+
+    if row is None:
+        return None
+
+    fields, pdf = row
+    if pdf is not None:
+        return bytes(pdf)
+
+    task = _rendering.get(session_id)
+    if task is None:
+        task = asyncio.ensure_future(_render_and_store(session_id, fields))
+        _rendering[session_id] = task
+        task.add_done_callback(lambda _: _rendering.pop(session_id, None))
+
+    return await asyncio.shield(task)
+
+
+def _benchmark(count: int = 300) -> None:
+    """Print single-core and pool throughput (python pdf_reports.py [count])"""
+
+    fields = {
+        "name": "Jane Doe",
+        "email": "jane@example.com",
+        "phone": "+15555550100",
+        "score": 72.5,
+        "total_score": 100,
+        "summary": " ".join(["Strong customer service background and reliable weekend availability."] * 20),
+        "answers": {f"Screening question {i} about shifts and experience?": "Yes, two years at a busy store." for i in range(10)},
+        "status": "HR Manager Review",
+    }
+
+    render_applicant_pdf(**fields)
+    start = time.perf_counter()
+    for _ in range(count):
+        render_applicant_pdf(**fields)
+    print(f"[PDF] In-process: {count / (time.perf_counter() - start):.1f} PDFs/sec/core")
+
+    async def run_pool():
+        start_pdf_pool()
+        await render_applicant_pdf_async(**fields)
+        start = time.perf_counter()
+        await asyncio.gather(*[render_applicant_pdf_async(**fields) for _ in range(count)])
+        elapsed = time.perf_counter() - start
+        print(f"[PDF] Pool: {count / elapsed:.1f} PDFs/sec "
+              f"({count / elapsed / PDF_RENDER_WORKERS:.1f} per worker)")
+        shutdown_pdf_pool()
+
+    asyncio.run(run_pool())
+
+
+if __name__ == "__main__":
+    import sys
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
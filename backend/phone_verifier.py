@@ -0,0 +1,230 @@
+"""
+Phone verification (SMS OTP) clients.
+
+PlivoVerifier keeps a small pool of long-lived plivo.RestClient objects, each
+with its own requests session, so TLS connections are reused across
+verifications. The blocking SDK calls run on a dedicated thread pool of the
+same size, never on the event loop, and each call is bounded by
+PHONE_VERIFY_TIMEOUT_SECONDS.
+
+LocalVerifier is a drop-in stand-in for tests and load runs: no network,
+every code equal to PHONE_VERIFY_LOCAL_CODE validates.
+
+PHONE_VERIFY_BACKEND selects the implementation ("plivo" or "local");
+set_phone_verifier() swaps it at runtime.
+"""
+
+import asyncio
+import os
+import queue
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import plivo
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PLIVO_AUTH_ID = os.getenv("PLIVO_AUTH_ID")
+PLIVO_AUTH_TOKEN = os.getenv("PLIVO_AUTH_TOKEN")
+PLIVO_VERIFY_APP_UUID = os.getenv("PLIVO_VERIFY_APP_UUID")
+
+PHONE_VERIFY_BACKEND = os.getenv("PHONE_VERIFY_BACKEND", "plivo")
+PHONE_VERIFY_POOL_SIZE = int(os.getenv("PHONE_VERIFY_POOL_SIZE", "4"))
+PHONE_VERIFY_TIMEOUT_SECONDS = float(os.getenv("PHONE_VERIFY_TIMEOUT_SECONDS", "8"))
+PHONE_VERIFY_LOCAL_CODE = os.getenv("PHONE_VERIFY_LOCAL_CODE", "123456")
+PHONE_VERIFY_LOCAL_LATENCY_SECONDS = float(os.getenv("PHONE_VERIFY_LOCAL_LATENCY_SECONDS", "0"))
+
+LATENCY_SAMPLES = 512
+
+# operation -> counters and recent latencies
+_metrics: dict = {}
+
+
+def _record(operation: str, started: float, outcome: str) -> None:
+    stats = _metrics.get(operation)
+    if stats is None:
+        stats = {"calls": 0, "errors": 0, "timeouts": 0, "latencies": deque(maxlen=LATENCY_SAMPLES)}
+        _metrics[operation] = stats
+
+    stats["calls"] += 1
+    stats["latencies"].append((time.perf_counter() - started) * 1000)
+    if outcome == "timeout":
+        stats["timeouts"] += 1
+    elif outcome == "error":
+        stats["errors"] += 1
+
+
+class PlivoVerifier:
+    """Plivo Verify over a pool of reused RestClients"""
+
+    def __init__(self, pool_size: int = PHONE_VERIFY_POOL_SIZE, timeout: float = PHONE_VERIFY_TIMEOUT_SECONDS):
+        self.timeout = timeout
+        # Idle clients; at most one per executor thread is ever created
+        self._clients: queue.SimpleQueue = queue.SimpleQueue()
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="plivo")
+
+    def _with_client(self, fn):
+        """Run fn with an idle client (created lazily, the SDK validates credentials)"""
+        try:
+            client = self._clients.get_nowait()
+        except queue.Empty:
+            # The SDK's own HTTP timeout is a backstop for the asyncio one
+            client = plivo.RestClient(PLIVO_AUTH_ID, PLIVO_AUTH_TOKEN, timeout=self.timeout)
+        try:
+            return fn(client)
+        finally:
+            self._clients.put(client)
+
+    async def _call(self, operation: str, fn):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(self._executor, self._with_client, fn),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            _record(operation, started, "timeout")
+            raise
+        except Exception:
+            _record(operation, started, "error")
+            raise
+        _record(operation, started, "ok")
+        return result
+
+    async def create_session(self, phone: str) -> str | None:
+        if not PLIVO_AUTH_ID or not PLIVO_AUTH_TOKEN or not PLIVO_VERIFY_APP_UUID:
+            print("ERROR: Plivo Verify credentials not configured")
+            return None
+
+        try:
+            response = await self._call("create_session", lambda client: client.verify_session.create(
+                recipient=phone,
+                app_uuid=PLIVO_VERIFY_APP_UUID,
+                channel="sms",
+            ))
+        except asyncio.TimeoutError:
+            print(f"Plivo Verify session timed out after {self.timeout}s")
+            return None
+        except Exception as e:
+            print(f"Error creating Plivo Verify session: {e}")
+            return None
+
+        print(f"Plivo Verify session created: {response.session_uuid}")
+        return response.session_uuid
+
+    async def validate(self, session_uuid: str, otp: str) -> tuple[bool, str]:
+        try:
+            response = await self._call("validate", lambda client: client.verify_session.validate(
+                session_uuid=session_uuid,
+                otp=otp,
+            ))
+        except plivo.exceptions.PlivoRestError as e:
+            error_msg = str(e).lower()
+            print(f"Plivo Verify error: {e}")
+
+            if "expired" in error_msg:
+                return False, "expired"
+            elif "invalid" in error_msg or "failed" in error_msg or "incorrect" in error_msg or "wrong" in error_msg:
+                return False, "incorrect"
+            return False, "error"
+        except asyncio.TimeoutError:
+            print(f"Plivo Verify validation timed out after {self.timeout}s")
+            return False, "error"
+        except Exception as e:
+            print(f"Unexpected error validating OTP: {e}")
+            return False, "error"
+
+        print(f"Plivo Verify response: {response.message}")
+        if response.message and "validated" in response.message.lower():
+            return True, ""
+        return False, "incorrect"
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        while not self._clients.empty():
+            client = self._clients.get_nowait()
+            client.session.close()
+            client.multipart_session.close()
+
+
+class LocalVerifier:
+    """In-process stand-in: nothing is sent, PHONE_VERIFY_LOCAL_CODE always validates"""
+
+    def __init__(self, code: str = PHONE_VERIFY_LOCAL_CODE, latency: float = PHONE_VERIFY_LOCAL_LATENCY_SECONDS):
+        self.code = code
+        self.latency = latency
+        # session_uuid -> phone, for assertions in tests
+        self.sessions: dict = {}
+
+    async def create_session(self, phone: str) -> str | None:
+        started = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        session_uuid = f"local-{uuid.uuid4()}"
+        self.sessions[session_uuid] = phone
+        _record("create_session", started, "ok")
+        print(f"[PHONE_VERIFY] Local session {session_uuid} for {phone} (code {self.code})")
+        return session_uuid
+
+    async def validate(self, session_uuid: str, otp: str) -> tuple[bool, str]:
+        started = time.perf_counter()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        _record("validate", started, "ok")
+        if session_uuid not in self.sessions:
+            return False, "expired"
+        if otp != self.code:
+            return False, "incorrect"
+        return True, ""
+
+    def close(self) -> None:
+        self.sessions.clear()
+
+
+_verifier = None
+
+
+def get_phone_verifier():
+    """The active verifier, created from PHONE_VERIFY_BACKEND on first use"""
+    global _verifier
+    if _verifier is None:
+        _verifier = LocalVerifier() if PHONE_VERIFY_BACKEND == "local" else PlivoVerifier()
+        print(f"[PHONE_VERIFY] Using {type(_verifier).__name__}")
+    return _verifier
+
+
+def set_phone_verifier(verifier) -> None:
+    """Swap the verifier (tests, load runs); the previous one is closed"""
+    global _verifier
+    if _verifier is not None and _verifier is not verifier:
+        _verifier.close()
+    _verifier = verifier
+
+
+def close_phone_verifier() -> None:
+    """Release pooled clients and threads on shutdown"""
+    global _verifier
+    if _verifier is not None:
+        _verifier.close()
+        _verifier = None
+
+
+def phone_verify_metrics() -> dict:
+    """Per-operation call counts and latency for the /metrics endpoint"""
+    result = {"backend": type(_verifier).__name__ if _verifier is not None else None}
+    for operation, stats in _metrics.items():
+        samples = sorted(stats["latencies"])
+        result[operation] = {
+            "calls": stats["calls"],
+            "errors": stats["errors"],
+            "timeouts": stats["timeouts"],
+            "avg_ms": round(sum(samples) / len(samples), 1) if samples else 0.0,
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1) if samples else 0.0,
+        }
+    return result
@@ -0,0 +1,193 @@
+"""
+Cached, rate-limited front for the /places/* endpoints.
+
+Autocomplete results are cached per (session token, region). While the user
+keeps typing, a query that extends an earlier one is answered from that
+earlier result when it was complete (Google returned fewer than
+AUTOCOMPLETE_MAX_PREDICTIONS) and some predictions still match, so most
+keystrokes after the first few never reach Google.
+
+Google is called at most once per AUTOCOMPLETE_MIN_INTERVAL_SECONDS per
+session. A request inside the interval waits out the rest of it on the event
+loop; if a newer keystroke from the same session arrives meanwhile, the older
+request is answered from the cache and only the newest one goes to Google.
+
+Place details are cached by place_id (AsyncCache, single-flight).
+"""
+
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+from async_cache import AsyncCache
+from location_services import get_address_autocomplete, get_place_details
+
+load_dotenv()
+
+AUTOCOMPLETE_MIN_INTERVAL_SECONDS = float(os.getenv("AUTOCOMPLETE_MIN_INTERVAL_SECONDS", "0.3"))
+AUTOCOMPLETE_MAX_SESSIONS = int(os.getenv("AUTOCOMPLETE_MAX_SESSIONS", "2048"))
+AUTOCOMPLETE_QUERIES_PER_SESSION = int(os.getenv("AUTOCOMPLETE_QUERIES_PER_SESSION", "32"))
+AUTOCOMPLETE_SESSION_TTL_SECONDS = float(os.getenv("AUTOCOMPLETE_SESSION_TTL_SECONDS", "600"))
+
+# Google returns at most this many predictions; fewer means the list is complete
+AUTOCOMPLETE_MAX_PREDICTIONS = 5
+
+_WORD = re.compile(r"[\w#]+")
+
+# (session token, region) -> session dict, least recently used first
+_sessions: OrderedDict = OrderedDict()
+
+_place_details = AsyncCache(
+    "place_details",
+    max_size=int(os.getenv("PLACE_DETAILS_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("PLACE_DETAILS_TTL_SECONDS", "86400")),
+    negative_ttl=60,
+)
+
+_metrics = {
+    "requests": 0,
+    "exact_hits": 0,
+    "prefix_hits": 0,
+    "google_calls": 0,
+    "throttled": 0,
+    "superseded": 0,
+}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _matches(query: str, description: str) -> bool:
+    """Every query word is a word (the last one a word prefix) of the description"""
+    query_words = query.split()
+    if not query_words:
+        return True
+
+    words = _WORD.findall(description.lower())
+    *complete, last = query_words
+    return all(w in words for w in complete) and any(w.startswith(last) for w in words)
+
+
+def _get_session(key: tuple) -> dict:
+    now = time.monotonic()
+    session = _sessions.get(key)
+    if session is None or now - session["seen_at"] > AUTOCOMPLETE_SESSION_TTL_SECONDS:
+        session = {"results": OrderedDict(), "last_call": 0.0, "latest": 0, "seen_at": now}
+        _sessions[key] = session
+
+    session["seen_at"] = now
+    _sessions.move_to_end(key)
+    while len(_sessions) > AUTOCOMPLETE_MAX_SESSIONS:
+        _sessions.popitem(last=False)
+    return session
+
+
+def _from_cache(session: dict, query: str) -> list | None:
+    """Exact hit, or the filtered result of the longest complete cached prefix"""
+    results = session["results"]
+    if query in results:
+        _metrics["exact_hits"] += 1
+        results.move_to_end(query)
+        return results[query]
+
+    best = None
+    for prefix, predictions in results.items():
+        if (
+            query.startswith(prefix)
+            and len(predictions) < AUTOCOMPLETE_MAX_PREDICTIONS
+            and (best is None or len(prefix) > len(best))
+        ):
+            best = prefix
+
+    if best is None:
+        return None
+
+    filtered = [p for p in results[best] if _matches(query, p["description"])]
+    if not filtered:
+        # Google may still find something the shorter query didn't
+        return None
+
+    _metrics["prefix_hits"] += 1
+    return filtered
+
+
+def _closest_cached(session: dict, query: str) -> list:
+    """Best answer without calling Google (for superseded requests)"""
+    prefixes = [p for p in session["results"] if query.startswith(p)]
+    if not prefixes:
+        return []
+    predictions = session["results"][max(prefixes, key=len)]
+    return [p for p in predictions if _matches(query, p["description"])]
+
+
+async def autocomplete(input_text: str, session_token: str = "", region: str = "") -> list:
+    """
+    Address suggestions for one keystroke of the address widget.
+
+    Returns:
+        list: [ { "description": str, "place_id": str } ]
+    """
+    _metrics["requests"] += 1
+    query = _normalize(input_text)
+
+    if not session_token:
+        # No session to scope the cache or the rate limit to
+        _metrics["google_calls"] += 1
+        return await get_address_autocomplete(input_text, session_token, region)
+
+    session = _get_session((session_token, region))
+    cached = _from_cache(session, query)
+    if cached is not None:
+        return cached
+
+    session["latest"] += 1
+    ticket = session["latest"]
+
+    wait = session["last_call"] + AUTOCOMPLETE_MIN_INTERVAL_SECONDS - time.monotonic()
+    if wait > 0:
+        _metrics["throttled"] += 1
+        await asyncio.sleep(wait)
+
+        if session["latest"] != ticket:
+            # The user kept typing; the newer request will ask Google
+            _metrics["superseded"] += 1
+            return _closest_cached(session, query)
+
+        cached = _from_cache(session, query)
+        if cached is not None:
+            return cached
+
+    session["last_call"] = time.monotonic()
+    _metrics["google_calls"] += 1
+    predictions = await get_address_autocomplete(input_text, session_token, region)
+
+    results = session["results"]
+    results[query] = predictions
+    results.move_to_end(query)
+    while len(results) > AUTOCOMPLETE_QUERIES_PER_SESSION:
+        results.popitem(last=False)
+
+    return predictions
+
+
+async def place_details(place_id: str) -> dict | None:
+    """Structured address for a place_id, cached"""
+    return await _place_details.get_or_load(
+        place_id,
+        lambda: get_place_details(place_id),
+        is_negative=lambda details: details is None,
+    )
+
+
+def places_metrics() -> dict:
+    """Autocomplete cache / throttle counters for the /metrics endpoint"""
+    requests = _metrics["requests"]
+    return {
+        **_metrics,
+        "sessions": len(_sessions),
+        "google_call_ratio": round(_metrics["google_calls"] / requests, 3) if requests else 0.0,
+    }
@@ -0,0 +1,195 @@
+"""
+Nearest-store index for brands with many locations.
+
+Store coordinates are kept in NumPy arrays (radians, with cos(lat)
+precomputed), so one query evaluates the haversine distance to every store
+in a single vectorized pass and picks the K nearest with argpartition -
+microseconds for hundreds of stores.
+
+The index is rebuilt from the Xano job catalog after every catalog re-index:
+each open job's job_location is geocoded (through the geocode cache, so
+unchanged addresses cost nothing) and becomes one store entry pointing at
+that job. Jobs the catalog marks inactive or closed are left out.
+
+verify_location uses haversine_miles from here for its typed-vs-GPS distance.
+"""
+
+import asyncio
+import os
+import time
+from typing import NamedTuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from location_services import EARTH_RADIUS_MILES, geocode_address
+
+load_dotenv()
+
+STORE_GEOCODE_CONCURRENCY = int(os.getenv("STORE_GEOCODE_CONCURRENCY", "8"))
+NEAREST_STORES_DEFAULT_K = int(os.getenv("NEAREST_STORES_DEFAULT_K", "3"))
+# Catalog status values that count as an open location (jobs without a status do too)
+STORE_OPEN_STATUSES = {
+    status.strip().lower()
+    for status in os.getenv("STORE_OPEN_STATUSES", "open,active,published").split(",")
+    if status.strip()
+}
+
+
+def _haversine(lat_r, lng_r, lats_r, lngs_r, cos_lats):
+    a = (np.sin((lats_r - lat_r) / 2) ** 2 +
+         np.cos(lat_r) * cos_lats * np.sin((lngs_r - lng_r) / 2) ** 2)
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_miles(lat: float, lng: float, lats, lngs):
+    """Haversine distance in miles from (lat, lng) to each point of lats/lngs (degrees; scalars or arrays)"""
+    lats_r = np.radians(np.asarray(lats, dtype=np.float64))
+    return _haversine(np.radians(lat), np.radians(lng), lats_r,
+                      np.radians(np.asarray(lngs, dtype=np.float64)), np.cos(lats_r))
+
+
+def is_open_job(job: dict) -> bool:
+    """False for catalog jobs flagged inactive/closed or with a status outside STORE_OPEN_STATUSES"""
+    for flag in ("is_active", "active", "is_open"):
+        if flag in job and not job[flag]:
+            return False
+    status = job.get("status", job.get("job_status"))
+    return status is None or str(status).strip().lower() in STORE_OPEN_STATUSES
+
+
+class StoreLocation(NamedTuple):
+    """One open location (a job posting at a store address)"""
+    job_id: str
+    address: str
+    lat: float
+    lng: float
+
+
+class StoreLocationIndex:
+    """Immutable index over a set of store locations"""
+
+    def __init__(self, stores: list[StoreLocation]):
+        self.stores = list(stores)
+        lats = np.array([s.lat for s in self.stores], dtype=np.float64)
+        lngs = np.array([s.lng for s in self.stores], dtype=np.float64)
+
+        self._lat = np.radians(lats)
+        self._lng = np.radians(lngs)
+        self._cos_lat = np.cos(self._lat)
+
+    def __len__(self) -> int:
+        return len(self.stores)
+
+    def distances(self, lat: float, lng: float) -> np.ndarray:
+        """Haversine distance in miles from (lat, lng) to every store"""
+        return _haversine(np.radians(lat), np.radians(lng), self._lat, self._lng, self._cos_lat)
+
+    def nearest(self, lat: float, lng: float, k: int = NEAREST_STORES_DEFAULT_K) -> list[tuple[StoreLocation, float]]:
+        """The k nearest stores and their distances in miles, closest first"""
+        if not self.stores or k <= 0:
+            return []
+
+        distances = self.distances(lat, lng)
+        k = min(k, len(self.stores))
+        if k < len(self.stores):
+            candidates = np.argpartition(distances, k - 1)[:k]
+        else:
+            candidates = np.arange(len(self.stores))
+        ordered = candidates[np.argsort(distances[candidates])]
+
+        return [(self.stores[i], float(distances[i])) for i in ordered]
+
+
+# Swapped atomically on rebuild; readers never see a half-built index
+_index = StoreLocationIndex([])
+
+_metrics = {
+    "rebuilds": 0,
+    "ungeocodable": 0,
+    "closed_skipped": 0,
+    "last_rebuild_at": None,
+    "last_rebuild_ms": 0.0,
+    "queries": 0,
+}
+
+
+async def rebuild_store_index(jobs) -> int:
+    """
+    Geocode every open job's job_location and swap in a new index.
+
+    Args:
+        jobs: Job dicts from the Xano catalog (id, job_location)
+
+    Returns:
+        int: Number of stores indexed
+    """
+    global _index
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(STORE_GEOCODE_CONCURRENCY)
+
+    async def locate(job: dict) -> StoreLocation | None:
+        address = (job.get("job_location") or "").strip()
+        if not address:
+            return None
+
+        async with semaphore:
+            coords = await geocode_address(address)
+        if not coords:
+            _metrics["ungeocodable"] += 1
+            return None
+        return StoreLocation(str(job.get("id")), address, coords["lat"], coords["lng"])
+
+    open_jobs = [job for job in jobs if is_open_job(job)]
+    _metrics["closed_skipped"] = len(jobs) - len(open_jobs)
+
+    located = await asyncio.gather(*[locate(job) for job in open_jobs])
+    _index = StoreLocationIndex([store for store in located if store is not None])
+
+    _metrics["rebuilds"] += 1
+    _metrics["last_rebuild_at"] = time.time()
+    _metrics["last_rebuild_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    print(f"[STORES] Indexed {len(_index)} store location(s)")
+    return len(_index)
+
+
+def nearest_stores(lat: float, lng: float, k: int = NEAREST_STORES_DEFAULT_K) -> list[dict]:
+    """
+    Nearest open store locations to a point.
+
+    Returns:
+        list: [ { "job_id", "address", "lat", "lng", "distance_miles" } ], closest first
+    """
+    _metrics["queries"] += 1
+    return [
+        {**store._asdict(), "distance_miles": round(distance, 2)}
+        for store, distance in _index.nearest(lat, lng, k)
+    ]
+
+
+def store_index_metrics() -> dict:
+    """Index size and rebuild timing for the /metrics endpoint"""
+    return {**_metrics, "stores": len(_index)}
+
+
+def _benchmark(store_count: int = 500, queries: int = 10000) -> None:
+    """Print per-query latency on a synthetic set of stores (python store_locations.py)"""
+    rng = np.random.default_rng(0)
+    stores = [
+        StoreLocation(str(i), f"Store {i}", float(lat), float(lng))
+        for i, (lat, lng) in enumerate(zip(rng.uniform(25, 48, store_count), rng.uniform(-124, -67, store_count)))
+    ]
+    index = StoreLocationIndex(stores)
+
+    points = list(zip(rng.uniform(25, 48, queries), rng.uniform(-124, -67, queries)))
+    start = time.perf_counter()
+    for lat, lng in points:
+        index.nearest(lat, lng, 3)
+    elapsed = time.perf_counter() - start
+    print(f"[STORES] {store_count} stores: {elapsed / queries * 1e6:.1f} us per nearest-3 query")
+
+
+if __name__ == "__main__":
+    import sys
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
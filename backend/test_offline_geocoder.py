@@ -0,0 +1,49 @@
+"""Offline reverse geocoder against the bundled data/us_places_sample.tsv"""
+
+import os
+
+import pytest
+
+from offline_geocoder import OfflineGeocoder
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "us_places_sample.tsv")
+
+
+@pytest.fixture(scope="module")
+def geocoder():
+    return OfflineGeocoder.load(SAMPLE)
+
+
+def test_loads_every_place(geocoder):
+    assert len(geocoder) == 20
+
+
+def test_confident_inside_a_city(geocoder):
+    # Downtown Austin: the three nearest centroids are all Austin, TX
+    result = geocoder.lookup(30.2700, -97.7430)
+
+    assert result["confident"]
+    assert result["components"]["city"] == "Austin"
+    assert result["components"]["state"] == "TX"
+    assert result["components"]["zip"] == "78701"
+
+
+def test_not_confident_across_a_city_line(geocoder):
+    # Lower Manhattan: Jersey City's centroid is nearer than New York's
+    result = geocoder.lookup(40.7, -74.0)
+
+    assert result["components"]["city"] == "Jersey City"
+    assert not result["confident"]
+
+
+def test_not_confident_when_neighbours_disagree(geocoder):
+    # On New York's own centroid, but Jersey City is among the nearest places
+    result = geocoder.lookup(40.7484, -73.9967)
+
+    assert result["components"]["city"] == "New York"
+    assert result["distance_miles"] == 0
+    assert not result["confident"]
+
+
+def test_nothing_nearby(geocoder):
+    assert geocoder.lookup(44.0, -103.0) is None
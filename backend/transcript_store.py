@@ -0,0 +1,123 @@
+"""
+Append-only conversation transcript store.
+
+Every chat message is written once to conversation_events (session_id, seq,
+role, content, ts). The graph state only keeps transcript_seq as a cursor plus
+a short tail of messages the nodes still read; summary, export and replay
+read the transcript from this table.
+"""
+
+from langchain.schema import HumanMessage
+
+from db import get_pool
+
+# Messages kept in graph state after they have been written to the log
+TRANSCRIPT_STATE_WINDOW = 10
+
+
+async def setup_transcript_table() -> None:
+    """
+    Create the conversation_events table if it doesn't exist.
+    Call this once at app startup (from lifespan in main.py).
+    """
+    async with get_pool().connection() as conn:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversation_events (
+                session_id TEXT        NOT NULL,
+                seq        INTEGER     NOT NULL,
+                role       TEXT        NOT NULL,
+                content    TEXT        NOT NULL,
+                ts         TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (session_id, seq)
+            )
+        """)
+    print("[TRANSCRIPT] conversation_events table ready")
+
+
+def message_role(msg) -> str:
+    """Map a LangChain message to the transcript role ("user" or "ai")"""
+    return "user" if isinstance(msg, HumanMessage) else "ai"
+
+
+def unrecorded_messages(messages: list, transcript_seq: int) -> list:
+    """
+    Messages in graph state that are not in the log yet.
+
+    State always holds at most TRANSCRIPT_STATE_WINDOW already-logged
+    messages, at the front.
+    """
+    return messages[min(transcript_seq, TRANSCRIPT_STATE_WINDOW):]
+
+
+async def append_events(session_id: str, last_seq: int, messages: list) -> int:
+    """
+    Append messages to the log in one batched insert.
+
+    Args:
+        session_id: Cleo session id
+        last_seq: Sequence number of the last event already written (cursor)
+        messages: New LangChain messages, oldest first
+
+    Returns:
+        int: New cursor (sequence number of the last written event)
+    """
+    rows = []
+    for msg in messages:
+        last_seq += 1
+        rows.append((session_id, last_seq, message_role(msg), msg.content))
+
+    if not rows:
+        return last_seq
+
+    async with get_pool().connection() as conn:
+        async with conn.cursor() as cur:
+            # ON CONFLICT keeps a retried batch from duplicating events
+            await cur.executemany("""
+                INSERT INTO conversation_events (session_id, seq, role, content)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (session_id, seq) DO NOTHING
+            """, rows)
+
+    print(f"[TRANSCRIPT] Appended {len(rows)} event(s) for {session_id} (seq={last_seq})")
+    return last_seq
+
+
+async def read_transcript(session_id: str, after_seq: int = 0) -> list[dict]:
+    """
+    Read a session's transcript in order, optionally only events after a cursor (replay).
+
+    Returns:
+        list: [ { "seq": int, "role": str, "content": str, "ts": str } ]
+    """
+    async with get_pool().connection() as conn:
+        cur = await conn.execute("""
+            SELECT seq, role, content, ts
+            FROM conversation_events
+            WHERE session_id = %s AND seq > %s
+            ORDER BY seq
+        """, (session_id, after_seq))
+        rows = await cur.fetchall()
+
+    return [
+        {"seq": seq, "role": role, "content": content, "ts": ts.isoformat()}
+        for seq, role, content, ts in rows
+    ]
+
+
+async def full_transcript(session_id: str, messages: list, transcript_seq: int) -> list[dict]:
+    """
+    Logged transcript plus the state messages not written yet (e.g. the last
+    answer and score messages when called from inside the graph run).
+
+    Returns:
+        list: [ { "role": str, "content": str } ]
+    """
+    transcript = [
+        {"role": event["role"], "content": event["content"]}
+        for event in await read_transcript(session_id)
+    ]
+    transcript.extend(
+        {"role": message_role(msg), "content": msg.content}
+        for msg in unrecorded_messages(messages, transcript_seq)
+    )
+    return transcript
@@ -0,0 +1,102 @@
+"""Typed resume values for widget submissions (address, GPS, work experience, ID confirmation)"""
+
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class AddressInput(BaseModel):
+    """Structured address from the autocomplete widget (/places/details shape)"""
+    street: str = ""
+    city: str = ""
+    state: str = ""
+    zip: str = ""
+    full: str = ""
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+
+
+class GpsInput(BaseModel):
+    """GPS coordinates from the location button (lat/lng are null when skipped)"""
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    skipped: bool = False
+
+
+class WorkExperienceEntry(BaseModel):
+    """Single work experience row from the work experience widget"""
+    role: str = Field(..., min_length=1)
+    company: str = Field(..., min_length=1)
+    startDate: str = ""
+    endDate: str = ""
+
+
+class WorkExperienceInput(BaseModel):
+    """All work experiences submitted at once"""
+    experiences: List[WorkExperienceEntry]
+
+
+class IdVerifyConfirmation(BaseModel):
+    """User confirmed they finished ID verification; verified comes from the webhook result"""
+    verified: bool
+
+
+# WebSocket message type -> graph node waiting on that widget
+WIDGET_MESSAGE_TYPES = {
+    "address_data": "store_address",
+    "gps_data": "process_gps",
+    "work_experience_data": "store_work_experience",
+    "id_verify_confirmed": "process_id_result",
+}
+
+# Graph node waiting on a widget -> its WebSocket message type
+WIDGET_NODES = {node: message_type for message_type, node in WIDGET_MESSAGE_TYPES.items()}
+
+
+def parse_widget_input(message_type: str, data) -> dict:
+    """
+    Validate a widget payload once at the socket boundary.
+
+    Returns:
+        dict: Resume value for Command(resume=...)
+
+    Raises:
+        ValueError: If the payload does not match the widget schema
+    """
+    if message_type == "address_data":
+        return AddressInput.model_validate(data or {}).model_dump()
+
+    if message_type == "gps_data":
+        return GpsInput.model_validate(data or {}).model_dump()
+
+    if message_type == "work_experience_data":
+        # Older clients send a single experience instead of a list
+        experiences = data if isinstance(data, list) else [data]
+        return WorkExperienceInput.model_validate({"experiences": experiences}).model_dump()
+
+    if message_type == "id_verify_confirmed":
+        return IdVerifyConfirmation.model_validate(data or {}).model_dump()
+
+    raise ValueError(f"Unknown widget message type: {message_type}")
+
+
+def parse_typed_input(waiting_node: str, text: str) -> Optional[dict]:
+    """
+    Resume value for text typed while a widget is waiting
+
+    Only the address step accepts plain text (stored as the full address,
+    as before the widget); other widgets need their own submission.
+
+    Returns:
+        dict: Resume value for Command(resume=...), or None
+    """
+    if waiting_node == "store_address":
+        return AddressInput(full=text).model_dump()
+    return None
+
+
+def format_work_experience(experiences: list) -> str:
+    """Human-readable work experience line for the transcript"""
+    return ", ".join([
+        f"{exp['role']} at {exp['company']} ({exp['startDate']} to {exp['endDate']})"
+        for exp in experiences
+    ])
@@ -1,11 +1,15 @@
-import requests
+import asyncio
+import gzip
+import resource
+import shutil
+import sys
+import tempfile
+import tracemalloc
 from langchain_openai import ChatOpenAI
 from langchain.schema import HumanMessage
 import json
+import orjson
 
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
 from io import BytesIO
 from datetime import datetime
 
@@ -14,12 +18,71 @@ import os
 
 load_dotenv()
 
+# Send large conversations as a gzip file part (only if the Xano endpoint decodes it)
+XANO_GZIP_CONVERSATION = os.getenv("XANO_GZIP_CONVERSATION", "false").lower() == "true"
+XANO_GZIP_MIN_BYTES = int(os.getenv("XANO_GZIP_MIN_BYTES", "16384"))
+# File parts are spooled in memory up to this size, then to a temp file
+XANO_SPOOL_MAX_BYTES = int(os.getenv("XANO_SPOOL_MAX_BYTES", str(1024 * 1024)))
+# Trace Python allocations per submission (tracemalloc; for load tests, it
+# slows every allocation and overlapping submissions share the figure)
+XANO_TRACE_MEMORY = os.getenv("XANO_TRACE_MEMORY", "false").lower() == "true"
+
+_submission_metrics = {
+    "submissions": 0,
+    "payload_bytes_raw": 0,
+    "payload_bytes_sent": 0,
+    "max_payload_bytes": 0,
+    "gzipped_conversations": 0,
+    "last_submission_peak_kb": None,
+    "max_submission_peak_kb": None,
+}
+
+
+def _spool_conversation(conversation_history: list) -> tempfile.SpooledTemporaryFile:
+    """Compact JSON of the conversation written message by message, never as one bytes object"""
+    spool = tempfile.SpooledTemporaryFile(max_size=XANO_SPOOL_MAX_BYTES)
+    spool.write(b"[")
+    for i, message in enumerate(conversation_history):
+        if i:
+            spool.write(b",")
+        spool.write(orjson.dumps(message))
+    spool.write(b"]")
+    spool.seek(0)
+    return spool
+
+
+def _gzip_spool(source) -> tempfile.SpooledTemporaryFile:
+    spool = tempfile.SpooledTemporaryFile(max_size=XANO_SPOOL_MAX_BYTES)
+    with gzip.GzipFile(fileobj=spool, mode="wb", compresslevel=6) as gz:
+        shutil.copyfileobj(source, gz)
+    spool.seek(0)
+    return spool
+
+
+def _spool_bytes(data: bytes) -> tempfile.SpooledTemporaryFile:
+    spool = tempfile.SpooledTemporaryFile(max_size=XANO_SPOOL_MAX_BYTES)
+    spool.write(data)
+    spool.seek(0)
+    return spool
+
+
+def _size(fileobj) -> int:
+    return fileobj.seek(0, os.SEEK_END) - fileobj.seek(0)
+
 # from backend.otp_verification import generate_session_id
 from prompts1 import GENERATE_JOB_CONFIG_PROMPT
+from pdf_reports import (
+    PDF_RENDER_MODE,
+    render_applicant_pdf,
+    render_applicant_pdf_async,
+    report_download_url,
+)
+import http_client
+from async_cache import AsyncCache
 
 
 # ==========================================================================================================
-def send_applicant_to_xano(
+async def send_applicant_to_xano(
     name: str,
     email: str,
     phone: str,
@@ -52,36 +115,32 @@ def send_applicant_to_xano(
             'x-api-key': 'sk_test_51QxA9F7C2E8B4D1A6F9C3E7B2A',
         }
     
-    try:
-        # Determine status
-        status = "HR Manager Review" if score >= 50 else "Rejected"
-
-        # Format conversation as JSON string
-        conversation_json = json.dumps(conversation_history)
-
-        # Generate PDF (using summary from JSON report)
-        summary = json_report.get("fit_score", {}).get("explanation", "No summary available")
-                
-        # Generate PDF
-        pdf_buffer = generate_applicant_pdf(
-            name=name,
-            email=email,
-            phone=phone,
-            score=score,
-            total_score=total_score,
-            summary=summary,
-            answers=answers,
-            status=status
-        )
-        
-        # Prepare form data
-        
-        files = {
-            'Report_pdf': ('applicant_report.pdf', pdf_buffer, 'application/pdf')
-        }
+    files = {}
+    if XANO_TRACE_MEMORY:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        traced_before = tracemalloc.get_traced_memory()[0]
 
-        # Convert JSON report to string
-        profile_summary_json = json.dumps(json_report, indent=2)
+    try:
+        report_fields = applicant_report_fields(name, email, phone, score, total_score, json_report, answers)
+        status = report_fields["status"]
+
+        # Compact JSON (orjson, no indentation)
+        conversation = _spool_conversation(conversation_history)
+        conversation_bytes = _size(conversation)
+        profile_summary_json = orjson.dumps(json_report).decode()
+
+        # Prepare form data. File parts are spooled (to disk past XANO_SPOOL_MAX_BYTES)
+        # and httpx reads them in chunks while sending, so the multipart body is
+        # streamed rather than built in memory.
+        if PDF_RENDER_MODE == "eager":
+            # Rendered in the PDF process pool
+            pdf_bytes = await render_applicant_pdf_async(**report_fields)
+            files['Report_pdf'] = ('applicant_report.pdf', _spool_bytes(pdf_bytes), 'application/pdf')
+            del pdf_bytes
+
+        payload_bytes_raw = sum(_size(f[1]) for f in files.values()) + conversation_bytes + len(profile_summary_json.encode())
         
         data = {
             'Name': name,
@@ -89,19 +148,40 @@ def send_applicant_to_xano(
             'Phone': phone,
             'Age': age,
             'Score': int(score),
-            'Report_pdf': ('applicant_report.pdf', pdf_buffer, 'application/pdf'),
             'job_id': JOB_ID,
             'company_id': COMPANY_ID,
             'Status': status,
             'session_id': 100,
             'ProfileSummary': profile_summary_json,
             'my_session_id': session_id,
-            'ConversationHistory': conversation_json,
             
         }
 
-        # Send POST request
-        response = requests.post(XANO_API_URL, data=data, headers=headers)
+        if XANO_GZIP_CONVERSATION and conversation_bytes >= XANO_GZIP_MIN_BYTES:
+            files['ConversationHistory_gz'] = ('conversation_history.json.gz', _gzip_spool(conversation), 'application/gzip')
+            conversation.close()
+            data['ConversationHistory_encoding'] = 'gzip'
+            _submission_metrics["gzipped_conversations"] += 1
+        else:
+            # A plain form field, so it has to be in memory
+            data['ConversationHistory'] = conversation.read().decode()
+            conversation.close()
+
+        if PDF_RENDER_MODE == "lazy":
+            # Rendered on the first hiring-manager download
+            data['Report_url'] = report_download_url(session_id)
+
+        payload_bytes_sent = sum(len(str(v).encode()) for v in data.values()) + sum(_size(f[1]) for f in files.values())
+        _submission_metrics["submissions"] += 1
+        _submission_metrics["payload_bytes_raw"] += payload_bytes_raw
+        _submission_metrics["payload_bytes_sent"] += payload_bytes_sent
+        _submission_metrics["max_payload_bytes"] = max(_submission_metrics["max_payload_bytes"], payload_bytes_sent)
+        print(f"Xano payload for {session_id}: {payload_bytes_sent} bytes (raw {payload_bytes_raw})")
+
+        # Send POST request (upload latency is tracked by http_client)
+        response = await http_client.post(
+            XANO_API_URL, data=data, files=files or None, headers=headers, endpoint="xano.candidate_new_api"
+        )
         
         if response.status_code == 200:
             print(f"Successfully sent applicant {name} to XANO")
@@ -109,7 +189,7 @@ def send_applicant_to_xano(
                 print(f"   Response: {response.json()}")
             except:
                 print(f"   Response: {response.text}")
-                return True
+            return True
 
         else:
             print(f"Failed to send to XANO: {response.status_code}")
@@ -122,6 +202,53 @@ def send_applicant_to_xano(
             traceback.print_exc()
             return False
 
+    finally:
+        for _, fileobj, _ in files.values():
+            fileobj.close()
+        if XANO_TRACE_MEMORY:
+            peak_kb = round((tracemalloc.get_traced_memory()[1] - traced_before) / 1024, 1)
+            _submission_metrics["last_submission_peak_kb"] = peak_kb
+            _submission_metrics["max_submission_peak_kb"] = max(_submission_metrics["max_submission_peak_kb"] or 0, peak_kb)
+
+
+def xano_submission_metrics() -> dict:
+    """
+    Payload sizes, per-submission allocation peak (with XANO_TRACE_MEMORY)
+    and the process-lifetime peak RSS for the /metrics endpoint
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    submissions = _submission_metrics["submissions"]
+    return {
+        **_submission_metrics,
+        "avg_payload_bytes": round(_submission_metrics["payload_bytes_sent"] / submissions) if submissions else 0,
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "process_peak_rss_mb": round(peak_rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+    }
+
+
+def applicant_report_fields(
+    name: str,
+    email: str,
+    phone: str,
+    score: float,
+    total_score: float,
+    json_report: dict,
+    answers: dict,
+) -> dict:
+    """
+    Inputs for the applicant PDF report (status from score, summary from the JSON report)
+    """
+    return {
+        "name": name,
+        "email": email,
+        "phone": phone,
+        "score": score,
+        "total_score": total_score,
+        "summary": json_report.get("fit_score", {}).get("explanation", "No summary available"),
+        "answers": answers,
+        "status": "HR Manager Review" if score >= 50 else "Rejected",
+    }
+
 
 def generate_applicant_pdf(
     name: str,
@@ -134,113 +261,21 @@ def generate_applicant_pdf(
     status: str
 ) -> BytesIO:
     """
-    Generate PDF report for applicant
+    Generate PDF report for applicant (in this process; see pdf_reports for the pool)
     
     Returns:
         BytesIO: PDF file buffer
     """
-    
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
-    # Title
-    c.setFont("Helvetica-Bold", 20)
-    c.drawString(1*inch, height - 1*inch, "Applicant Screening Report")
-    
-    # Date
-    c.setFont("Helvetica", 10)
-    c.drawString(1*inch, height - 1.3*inch, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    
-    # Applicant Info
-    y = height - 2*inch
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(1*inch, y, "Applicant Information")
-    
-    y -= 0.3*inch
-    c.setFont("Helvetica", 11)
-    c.drawString(1*inch, y, f"Name: {name}")
-    
-    y -= 0.25*inch
-    c.drawString(1*inch, y, f"Email: {email}")
-    
-    y -= 0.25*inch
-    c.drawString(1*inch, y, f"Phone: {phone}")
-    
-    # Score
-    y -= 0.5*inch
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(1*inch, y, "Screening Score")
-    
-    y -= 0.3*inch
-    c.setFont("Helvetica", 11)
-    percentage = (score / total_score * 100) if total_score > 0 else 0
-    c.drawString(1*inch, y, f"Score: {score:.1f} / {total_score:.1f} ({percentage:.1f}%)")
-    
-    y -= 0.25*inch
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(1*inch, y, f"Status: {status.upper()}")
-    
-    # Summary
-    y -= 0.5*inch
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(1*inch, y, "Hiring Manager Summary")
-    
-    y -= 0.3*inch
-    c.setFont("Helvetica", 10)
-    
-    # Wrap text
-    summary_lines = []
-    words = summary.split()
-    line = ""
-    for word in words:
-        test_line = line + " " + word if line else word
-        if c.stringWidth(test_line, "Helvetica", 10) < (width - 2*inch):
-            line = test_line
-        else:
-            summary_lines.append(line)
-            line = word
-    if line:
-        summary_lines.append(line)
-    
-    for line in summary_lines:
-        c.drawString(1*inch, y, line)
-        y -= 0.2*inch
-    
-    # Answers
-    y -= 0.3*inch
-    if y < 2*inch:  # New page if needed
-        c.showPage()
-        y = height - 1*inch
-    
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(1*inch, y, "Interview Responses")
-    
-    y -= 0.3*inch
-    c.setFont("Helvetica", 9)
-    
-    for question, answer in answers.items():
-        if y < 1.5*inch:  # New page if needed
-            c.showPage()
-            y = height - 1*inch
-        
-        # Question
-        c.setFont("Helvetica-Bold", 9)
-        c.drawString(1*inch, y, f"Q: {question[:80]}...")  # Truncate long questions
-        y -= 0.2*inch
-        
-        # Answer
-        c.setFont("Helvetica", 9)
-        c.drawString(1.2*inch, y, f"A: {answer[:80]}...")  # Truncate long answers
-        y -= 0.4*inch
-    
-    # Footer
-    c.setFont("Helvetica", 8)
-    c.drawString(1*inch, 0.5*inch, "Confidential - For Internal Use Only")
-    
-    c.save()
-    buffer.seek(0)
-    return buffer
+    return BytesIO(render_applicant_pdf(
+        name=name,
+        email=email,
+        phone=phone,
+        score=score,
+        total_score=total_score,
+        summary=summary,
+        answers=answers,
+        status=status,
+    ))
 
 
 # ================================Fetch jobs and generate configs dynamically=====================================
@@ -250,28 +285,29 @@ llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3, model_kwargs={"response_f
 # XANO Configuration
 XANO_BASE_URL = "https://xoho-w3ng-km3o.n7e.xano.io/api:L-QNLSmb"
 
-# In-memory cache for generated job configs
-JOB_CONFIGS = {}
+# Generated job configs: bounded, expiring, one generation per job at a time.
+# Fallback configs are cached briefly so failed jobs are retried.
+JOB_CONFIGS = AsyncCache(
+    "generated_job_configs",
+    max_size=int(os.getenv("JOB_CONFIG_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("JOB_CONFIG_CACHE_TTL_SECONDS", "3600")),
+    negative_ttl=float(os.getenv("JOB_CONFIG_CACHE_NEGATIVE_TTL_SECONDS", "60")),
+)
 
 
-def fetch_job_from_xano(job_id: str) -> dict:
+async def fetch_job_from_xano(job_id: str) -> dict:
     """
-    Fetch job details from XANO by job_id   
+    Fetch job details from XANO by job_id (cached, see job_catalog.fetch_job)
     Returns:
         dict: Job data from XANO
     """
-    
+    from job_catalog import fetch_job
+
     try:
-        url = f"{XANO_BASE_URL}/job/{job_id}"
-        response = requests.get(url)
-        
-        if response.status_code == 200:
-            job_data = response.json()
+        job_data = await fetch_job(job_id)
+        if job_data:
             print(f"Successfully fetched job: {job_data.get('job_title', 'Unknown')}")
-            return job_data
-        else:
-            print(f"Failed to fetch job: {response.status_code} - {response.text}")
-            return None
+        return job_data
             
     except Exception as e:
         print(f"Error fetching job from XANO: {e}")
@@ -334,20 +370,26 @@ def get_fallback_config() -> dict:
     }
 
 
-def get_or_generate_job_config(job_id: str) -> dict:
+async def get_or_generate_job_config(job_id: str) -> dict:
     """
     Get job config from cache or generate new one from XANO  
     Returns:
         dict: Job configuration with knockout_questions, questions, scoring_model
     """
     
-    # Check cache first
-    if job_id in JOB_CONFIGS:
-        print(f"Using cached config for job_id: {job_id}")
-        return JOB_CONFIGS[job_id]
-    
+    # Concurrent misses for the same job share one fetch + generation
+    return await JOB_CONFIGS.get_or_load(
+        job_id,
+        lambda: _generate_job_config(job_id),
+        is_negative=lambda config: config == get_fallback_config(),
+    )
+
+
+async def _generate_job_config(job_id: str) -> dict:
+    """Fetch the job from XANO and generate its config (cache loader)"""
+
     # Fetch job from XANO
-    job_data = fetch_job_from_xano(job_id)
+    job_data = await fetch_job_from_xano(job_id)
     
     if not job_data:
         print(f"Could not fetch job, using fallback config")
@@ -363,12 +405,7 @@ def get_or_generate_job_config(job_id: str) -> dict:
         return get_fallback_config()
     
     # Generate config using LLM
-    config = generate_job_config_from_description(job_description, job_title)
-    
-    # Cache the result
-    JOB_CONFIGS[job_id] = config
-    
-    return config
+    return await asyncio.to_thread(generate_job_config_from_description, job_description, job_title)
 
 
 
@@ -385,8 +422,6 @@ def generate_questions_config(eligibility_criteria: str, screening_questions: st
     }
     """
 
-    json_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3, model_kwargs={"response_format": {"type": "json_object"}})
-
     prompt = f"""
     You are an expert screening assistant.
     Convert the given Eligibility Criteria and Screening Questions into a JSON object 
@@ -410,7 +445,7 @@ def generate_questions_config(eligibility_criteria: str, screening_questions: st
     {screening_questions}
     """
 
-    response = json_llm.invoke([HumanMessage(content=prompt)])
+    response = llm.invoke([HumanMessage(content=prompt)])
 
     print(response.content)
     
@@ -427,23 +462,8 @@ def generate_questions_config(eligibility_criteria: str, screening_questions: st
 
 
 
-def get_job_details_by_id(job_id):
-    
-    XANO_API_URL = "https://xoho-w3ng-km3o.n7e.xano.io/api:L-QNLSmb/get_all_job_"
-    response = requests.get(f"{XANO_API_URL}")
+async def get_job_details_by_id(job_id):
+    """Questions config for a job, from the indexed job catalog"""
+    from job_catalog import get_questions_config
 
-    if response.status_code == 200:
-        
-        jobs_data = response.json()
-        print("Successfully Fetched jobs data:")
-        
-        for job in jobs_data:
-            if job.get("id") == job_id:
-                print("Successfully found Job")
-                eligibility_criteria = job.get("Eligibility_Criteria")
-                screening_questions = job.get("Screening_Questions")
-        
-        questions_config = generate_questions_config(eligibility_criteria, screening_questions)
-        return questions_config     
-    else:
-        return None
\ No newline at end of file
+    return await get_questions_config(job_id)
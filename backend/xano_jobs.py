@@ -1,9 +1,8 @@
-import requests
 import json
 import asyncio
+import hashlib
 import sys
-from psycopg import AsyncConnection
-from psycopg.rows import dict_row
+import time
 from dotenv import load_dotenv
 import os
 
@@ -12,71 +11,17 @@ from prompts1 import GENERATE_JOB_CONFIG_PROMPT
 from langchain.schema import HumanMessage
 from langchain_openai import ChatOpenAI
 
-load_dotenv()
-
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3, model_kwargs={"response_format": {"type": "json_object"}})
-
-
-async def save_job_config_to_db(job_id: str, config: dict):
-    """Save job config to PostgreSQL database"""
-    connection_string = os.getenv("POSTGRES_CONNECTION_STRING")
-    
-    async with await AsyncConnection.connect(
-        connection_string,
-        autocommit=True,
-        row_factory=dict_row
-    ) as conn:
-        # Create table if not exists
-        await conn.execute("""
-            CREATE TABLE IF NOT EXISTS job_configs (
-                job_id TEXT PRIMARY KEY,
-                config JSONB NOT NULL,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Insert or update config
-        await conn.execute("""
-            INSERT INTO job_configs (job_id, config, updated_at)
-            VALUES (%s, %s, CURRENT_TIMESTAMP)
-            ON CONFLICT (job_id) 
-            DO UPDATE SET config = EXCLUDED.config, updated_at = CURRENT_TIMESTAMP
-        """, (job_id, json.dumps(config)))
-        
-        print(f"Saved job config for job_id: {job_id}")
+import http_client
+from db import get_pool, open_pool, close_pool
+from job_config_registry import setup_job_config_table
 
+load_dotenv()
 
-async def read_job_config_from_db(job_id: str = None):
-    """Read job config(s) from PostgreSQL database"""
-    connection_string = os.getenv("POSTGRES_CONNECTION_STRING")
-    
-    async with await AsyncConnection.connect(
-        connection_string,
-        autocommit=True,
-        row_factory=dict_row
-    ) as conn:
-        if job_id:
-            # Read specific job config
-            result = await conn.execute("""
-                SELECT config FROM job_configs WHERE job_id = %s
-            """, (job_id,))
-            
-            row = await result.fetchone()
-            if row:
-                return row['config']
-            return None
-        else:
-            # Read all job configs
-            result = await conn.execute("""
-                SELECT job_id, config FROM job_configs
-            """)
-            
-            configs = {}
-            async for row in result:
-                configs[row['job_id']] = row['config']
-            
-            return configs
+# LLM calls in flight during a sync, and rows per upsert batch
+JOB_SYNC_CONCURRENCY = int(os.getenv("JOB_SYNC_CONCURRENCY", "8"))
+JOB_SYNC_BATCH_SIZE = int(os.getenv("JOB_SYNC_BATCH_SIZE", "25"))
 
+llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3, model_kwargs={"response_format": {"type": "json_object"}})
 
 
 def generate_job_config_from_description(job_description: str, job_title: str, job_location: str) -> dict:
@@ -115,43 +60,138 @@ def generate_job_config_from_description(job_description: str, job_title: str, j
     
 
 
-async def get_all_jobs():    
-    
-    """Fetch all jobs from Xano, generate configs, and save to DB"""
-    
-    XANO_API_URL = "https://xoho-w3ng-km3o.n7e.xano.io/api:L-QNLSmb/All_Jobs"
-    response = requests.get(f"{XANO_API_URL}")
+def job_content_hash(job_title: str, job_description: str, job_location: str) -> str:
+    """Hash of the fields a job config is generated from"""
+    content = json.dumps([job_title or "", job_description or "", job_location or ""])
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
-    if response.status_code == 200:
-        
-        jobs_data = response.json()
-        # print("Successfully Fetched jobs data: ", jobs_data)
-        print("Successfully Fetched jobs data...")
-        print(f"Total jobs fetched: {len(jobs_data)}")
-        
-        for job in jobs_data:
-            
-            job_id = job.get("id")
-            job_title = job.get("job_title")
-            job_description = job.get("job_description")
-            job_location = job.get("job_location")
 
-            config = generate_job_config_from_description(job_description, job_title, job_location)
+async def read_job_config_hashes(conn) -> dict:
+    """job_id -> content_hash for every stored config"""
+    cur = await conn.execute("SELECT job_id, content_hash FROM job_configs")
+    return {job_id: content_hash for job_id, content_hash in await cur.fetchall()}
 
-           # Save to database
-            await save_job_config_to_db(job_id, config)
-        
-        return config     
-    
-    else:
+
+async def upsert_job_configs(conn, rows: list) -> None:
+    """Insert or update (job_id, config, content_hash) rows in one batch"""
+    async with conn.cursor() as cur:
+        await cur.executemany("""
+            INSERT INTO job_configs (job_id, config, content_hash, updated_at)
+            VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (job_id)
+            DO UPDATE SET config = EXCLUDED.config,
+                          content_hash = EXCLUDED.content_hash,
+                          updated_at = CURRENT_TIMESTAMP
+        """, [(job_id, json.dumps(config), content_hash) for job_id, config, content_hash in rows])
+
+
+async def get_all_jobs(force: bool = False) -> dict | None:
+    """
+    Fetch all jobs from Xano, generate configs for new or changed jobs, and save to DB.
+
+    Jobs whose title/description/location hash matches the stored config are
+    skipped (unless force=True). LLM generation runs JOB_SYNC_CONCURRENCY at a
+    time without holding a DB connection; once it finishes, results are
+    upserted in batches of JOB_SYNC_BATCH_SIZE over one pooled connection.
+
+    Returns:
+        dict: Sync summary, or None if the Xano fetch failed
+    """
+    started = time.perf_counter()
+
+    XANO_API_URL = "https://xoho-w3ng-km3o.n7e.xano.io/api:L-QNLSmb/All_Jobs"
+    response = await http_client.get(f"{XANO_API_URL}", endpoint="xano.All_Jobs")
+
+    if response.status_code != 200:
+        print(f"Failed to fetch jobs: {response.status_code} - {response.text}")
         return None
 
+    jobs_data = response.json()
+    print("Successfully Fetched jobs data...")
+    print(f"Total jobs fetched: {len(jobs_data)}")
+
+    summary = {
+        "fetched": len(jobs_data),
+        "unchanged": 0,
+        "generated": 0,
+        "fallbacks": 0,
+        "saved": 0,
+    }
+    fallback_config = get_fallback_config()
+    semaphore = asyncio.Semaphore(JOB_SYNC_CONCURRENCY)
+
+    async def generate(job_id, job_title, job_description, job_location, content_hash):
+        async with semaphore:
+            config = await asyncio.to_thread(
+                generate_job_config_from_description, job_description, job_title, job_location
+            )
+        # Fallbacks are saved without a hash so the next sync retries them
+        if config == fallback_config:
+            return job_id, config, None
+        return job_id, config, content_hash
+
+    async with get_pool().connection() as conn:
+        stored_hashes = await read_job_config_hashes(conn)
+
+    tasks = []
+    for job in jobs_data:
+        job_id = str(job.get("id"))
+        job_title = job.get("job_title")
+        job_description = job.get("job_description")
+        job_location = job.get("job_location")
+
+        content_hash = job_content_hash(job_title, job_description, job_location)
+        if not force and stored_hashes.get(job_id) == content_hash:
+            summary["unchanged"] += 1
+            continue
+
+        tasks.append(asyncio.create_task(
+            generate(job_id, job_title, job_description, job_location, content_hash)
+        ))
+
+    print(f"[JOB_SYNC] {summary['unchanged']} unchanged, generating {len(tasks)} config(s)")
+
+    rows = []
+    for task in asyncio.as_completed(tasks):
+        job_id, config, content_hash = await task
+        summary["generated"] += 1
+        if content_hash is None:
+            summary["fallbacks"] += 1
+        rows.append((job_id, config, content_hash))
+
+        if summary["generated"] % JOB_SYNC_BATCH_SIZE == 0 or summary["generated"] == len(tasks):
+            elapsed = time.perf_counter() - started
+            print(f"[JOB_SYNC] {summary['generated']}/{len(tasks)} generated "
+                  f"({summary['generated'] / elapsed:.2f} jobs/s)")
+
+    if rows:
+        async with get_pool().connection() as conn:
+            for i in range(0, len(rows), JOB_SYNC_BATCH_SIZE):
+                batch = rows[i:i + JOB_SYNC_BATCH_SIZE]
+                await upsert_job_configs(conn, batch)
+                summary["saved"] += len(batch)
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_seconds"] = round(elapsed, 1)
+    summary["jobs_per_second"] = round(summary["generated"] / elapsed, 2) if elapsed else 0.0
+
+    print(f"[JOB_SYNC] Done: {summary}")
+    return summary
+
+
+async def sync_jobs(force: bool = False) -> dict | None:
+    """Run get_all_jobs as a standalone script (own pool and HTTP clients)"""
+    await open_pool()
+    try:
+        await setup_job_config_table()
+        return await get_all_jobs(force=force)
+    finally:
+        await close_pool()
+        await http_client.close_clients()
+
 
 if __name__ == "__main__":
     if sys.platform == 'win32':
         asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
     
-    asyncio.run(get_all_jobs())
- 
-    # print("Read job config from DB:", asyncio.run(read_job_config_from_db()))
-    # print("Read job config from DB:", asyncio.run(read_job_config_from_db("b44fbf2b-8f12-49c0-8e91-3b564f98e7c1")))
\ No newline at end of file
+    asyncio.run(sync_jobs(force="--force" in sys.argv))
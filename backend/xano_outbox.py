@@ -0,0 +1,265 @@
+"""
+Durable outbox for Xano applicant submissions.
+
+summary_node writes one idempotency-keyed row to xano_outbox instead of
+posting to Xano inline. A background worker (started from lifespan in main.py)
+claims due rows in batches with FOR UPDATE SKIP LOCKED, sends them with
+bounded concurrency (async HTTP, PDFs rendered in the pdf_reports pool),
+retries failures with exponential backoff and moves rows that keep failing to the dead-letter status.
+
+Claiming a row pushes its next_attempt_at out by XANO_OUTBOX_LEASE_SECONDS, so
+rows held by a worker that died are picked up again once the lease expires.
+Delivery is at-least-once; the Xano record carries my_session_id for dedupe.
+"""
+
+import asyncio
+import os
+import time
+from psycopg.types.json import Jsonb
+from dotenv import load_dotenv
+
+from db import get_pool
+from xano import send_applicant_to_xano
+
+load_dotenv()
+
+XANO_OUTBOX_CONCURRENCY = int(os.getenv("XANO_OUTBOX_CONCURRENCY", "4"))
+XANO_OUTBOX_BATCH_SIZE = int(os.getenv("XANO_OUTBOX_BATCH_SIZE", "20"))
+XANO_OUTBOX_MAX_ATTEMPTS = int(os.getenv("XANO_OUTBOX_MAX_ATTEMPTS", "8"))
+XANO_OUTBOX_POLL_SECONDS = float(os.getenv("XANO_OUTBOX_POLL_SECONDS", "5"))
+XANO_OUTBOX_LEASE_SECONDS = int(os.getenv("XANO_OUTBOX_LEASE_SECONDS", "300"))
+XANO_OUTBOX_BACKOFF_BASE_SECONDS = int(os.getenv("XANO_OUTBOX_BACKOFF_BASE_SECONDS", "10"))
+XANO_OUTBOX_BACKOFF_MAX_SECONDS = int(os.getenv("XANO_OUTBOX_BACKOFF_MAX_SECONDS", "3600"))
+
+# Set by enqueue so the worker doesn't wait for the next poll
+_wakeup = asyncio.Event()
+
+_metrics = {
+    "enqueued": 0,
+    "duplicates": 0,
+    "sent": 0,
+    "failed_attempts": 0,
+    "dead_lettered": 0,
+    "batches": 0,
+    "started_at": time.time(),
+}
+
+
+async def setup_outbox_table() -> None:
+    """
+    Create the xano_outbox table if it doesn't exist.
+    Call this once at app startup (from lifespan in main.py).
+    """
+    async with get_pool().connection() as conn:
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS xano_outbox (
+                id              BIGSERIAL   PRIMARY KEY,
+                idempotency_key TEXT        NOT NULL UNIQUE,
+                payload         JSONB       NOT NULL,
+                status          TEXT        NOT NULL DEFAULT 'pending',
+                attempts        INTEGER     NOT NULL DEFAULT 0,
+                next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                last_error      TEXT,
+                created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                sent_at         TIMESTAMPTZ
+            )
+        """)
+        await conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_xano_outbox_due
+                ON xano_outbox(next_attempt_at) WHERE status = 'pending'
+        """)
+    print("[XANO_OUTBOX] xano_outbox table ready")
+
+
+async def enqueue_applicant_submission(idempotency_key: str, payload: dict) -> bool:
+    """
+    Store an applicant submission for delivery to Xano.
+
+    Args:
+        idempotency_key: One key per application (re-enqueueing it is a no-op)
+        payload: Keyword arguments for xano.send_applicant_to_xano (JSON-serializable)
+
+    Returns:
+        bool: True if a new row was written, False if the key was already queued
+    """
+    async with get_pool().connection() as conn:
+        cur = await conn.execute("""
+            INSERT INTO xano_outbox (idempotency_key, payload)
+            VALUES (%s, %s)
+            ON CONFLICT (idempotency_key) DO NOTHING
+        """, (idempotency_key, Jsonb(payload)))
+        inserted = cur.rowcount == 1
+
+    if inserted:
+        _metrics["enqueued"] += 1
+        _wakeup.set()
+        print(f"[XANO_OUTBOX] Enqueued {idempotency_key}")
+    else:
+        _metrics["duplicates"] += 1
+        print(f"[XANO_OUTBOX] {idempotency_key} already queued, skipping")
+
+    return inserted
+
+
+def backoff_seconds(attempts: int) -> int:
+    """Exponential backoff after the given number of failed attempts"""
+    return min(XANO_OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), XANO_OUTBOX_BACKOFF_MAX_SECONDS)
+
+
+async def _claim_batch() -> list:
+    """Lease up to XANO_OUTBOX_BATCH_SIZE due rows in one statement"""
+    async with get_pool().connection() as conn:
+        cur = await conn.execute("""
+            UPDATE xano_outbox
+            SET attempts = attempts + 1,
+                next_attempt_at = NOW() + make_interval(secs => %s)
+            WHERE id IN (
+                SELECT id FROM xano_outbox
+                WHERE status = 'pending' AND next_attempt_at <= NOW()
+                ORDER BY next_attempt_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, idempotency_key, payload, attempts
+        """, (XANO_OUTBOX_LEASE_SECONDS, XANO_OUTBOX_BATCH_SIZE))
+        return await cur.fetchall()
+
+
+async def _deliver(row, semaphore: asyncio.Semaphore) -> tuple:
+    """Send one row; returns (id, attempts, error or None)"""
+    outbox_id, idempotency_key, payload, attempts = row
+
+    async with semaphore:
+        try:
+            ok = await send_applicant_to_xano(**payload)
+            error = None if ok else "Xano rejected the submission"
+        except Exception as e:
+            error = str(e)
+
+    if error:
+        print(f"[XANO_OUTBOX] {idempotency_key} attempt {attempts} failed: {error}")
+    return outbox_id, attempts, error
+
+
+async def _record_results(results: list) -> None:
+    """Write the outcome of a batch back in one round trip per status"""
+    sent = [(outbox_id,) for outbox_id, _, error in results if error is None]
+    retry = []
+    dead = []
+
+    for outbox_id, attempts, error in results:
+        if error is None:
+            continue
+        if attempts >= XANO_OUTBOX_MAX_ATTEMPTS:
+            dead.append((error, outbox_id))
+        else:
+            retry.append((backoff_seconds(attempts), error, outbox_id))
+
+    async with get_pool().connection() as conn:
+        async with conn.cursor() as cur:
+            if sent:
+                await cur.executemany("""
+                    UPDATE xano_outbox
+                    SET status = 'sent', sent_at = NOW(), last_error = NULL
+                    WHERE id = %s
+                """, sent)
+            if retry:
+                await cur.executemany("""
+                    UPDATE xano_outbox
+                    SET next_attempt_at = NOW() + make_interval(secs => %s), last_error = %s
+                    WHERE id = %s
+                """, retry)
+            if dead:
+                await cur.executemany("""
+                    UPDATE xano_outbox
+                    SET status = 'dead', last_error = %s
+                    WHERE id = %s
+                """, dead)
+
+    _metrics["sent"] += len(sent)
+    _metrics["failed_attempts"] += len(retry) + len(dead)
+    _metrics["dead_lettered"] += len(dead)
+
+    if dead:
+        print(f"[XANO_OUTBOX] Dead-lettered {len(dead)} submission(s)")
+
+
+async def drain_outbox() -> int:
+    """
+    Deliver every due row, batch by batch.
+    Returns the number of rows processed.
+    """
+    semaphore = asyncio.Semaphore(XANO_OUTBOX_CONCURRENCY)
+    processed = 0
+
+    while True:
+        rows = await _claim_batch()
+        if not rows:
+            return processed
+
+        _metrics["batches"] += 1
+        results = await asyncio.gather(*[_deliver(row, semaphore) for row in rows])
+        await _record_results(results)
+        processed += len(rows)
+
+
+async def run_outbox_worker() -> None:
+    """Background task: drain on enqueue, and every XANO_OUTBOX_POLL_SECONDS for retries"""
+    print("[XANO_OUTBOX] Worker started")
+
+    while True:
+        try:
+            _wakeup.clear()
+            processed = await drain_outbox()
+            if processed:
+                print(f"[XANO_OUTBOX] Processed {processed} submission(s)")
+        except asyncio.CancelledError:
+            print("[XANO_OUTBOX] Worker cancelled")
+            raise
+        except Exception as e:
+            print(f"[XANO_OUTBOX] Worker error: {e}")
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=XANO_OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def requeue_dead_letters() -> int:
+    """Move dead-lettered rows back to pending with a fresh attempt budget"""
+    async with get_pool().connection() as conn:
+        cur = await conn.execute("""
+            UPDATE xano_outbox
+            SET status = 'pending', attempts = 0, next_attempt_at = NOW()
+            WHERE status = 'dead'
+        """)
+        count = cur.rowcount
+
+    if count:
+        _wakeup.set()
+    print(f"[XANO_OUTBOX] Requeued {count} dead-lettered submission(s)")
+    return count
+
+
+async def outbox_metrics() -> dict:
+    """Queue depth, age and throughput for the /metrics endpoint"""
+    async with get_pool().connection() as conn:
+        cur = await conn.execute("""
+            SELECT
+                COUNT(*) FILTER (WHERE status = 'pending'),
+                COUNT(*) FILTER (WHERE status = 'dead'),
+                EXTRACT(EPOCH FROM NOW() - MIN(created_at) FILTER (WHERE status = 'pending')),
+                COUNT(*) FILTER (WHERE status = 'sent' AND sent_at > NOW() - INTERVAL '5 minutes')
+            FROM xano_outbox
+        """)
+        depth, dead, oldest_age, sent_last_5m = await cur.fetchone()
+
+    uptime = time.time() - _metrics["started_at"]
+    return {
+        **_metrics,
+        "queue_depth": depth,
+        "dead_letter_depth": dead,
+        "oldest_pending_age_seconds": round(float(oldest_age), 1) if oldest_age is not None else 0.0,
+        "sent_per_minute_5m": round(sent_last_5m / 5, 2),
+        "sent_per_minute_uptime": round(_metrics["sent"] / (uptime / 60), 2) if uptime > 0 else 0.0,
+    }